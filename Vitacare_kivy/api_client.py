@@ -1,14 +1,67 @@
-"""Shared helpers for making authenticated API requests with automatic token refresh."""
+"""Shared HTTP client for the app: authenticated requests with automatic
+token refresh, a pooled keep-alive session and background execution.
+
+Access tokens are renewed by ``tokens`` (a ``TokenManager``) shortly before
+the ``exp`` claim says they lapse, so requests rarely meet a ``401``.  When
+several requests need a new token at once only one refresh call is made and
+every waiter gets its result.
+
+Screens should not call ``requests`` directly.  ``request_async`` (or
+``run_async`` for other blocking work) runs the call on a small worker pool
+and hands the result back on the Kivy main thread through
+``Clock.schedule_once``.  Work started for a screen is cancelled when the
+screen is left, so late responses never touch widgets that are gone.
+
+Every backend URL is built with ``api_url`` from ``API_BASE_URL``
+(``VITACARE_API_URL`` in the environment, ``http://127.0.0.1:8000`` by
+default).
+"""
 
 from __future__ import annotations
 
-from typing import Optional, Tuple, Dict, Any
+import base64
+import json
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Tuple, Dict, Any, Callable
 
 import requests
+from requests.adapters import HTTPAdapter
+from kivy.clock import Clock
 from kivy.logger import Logger
 from kivymd.app import MDApp
 
-TOKEN_REFRESH_ENDPOINT = "http://127.0.0.1:8000/api/users/token/refresh/"
+API_BASE_URL = os.environ.get("VITACARE_API_URL", "http://127.0.0.1:8000").rstrip("/")
+DEFAULT_TIMEOUT = 10  # seconds
+API_WORKERS = 4
+REFRESH_MARGIN = 30  # seconds before expiry at which access tokens are renewed
+
+
+def api_url(path: str) -> str:
+    """Absolute backend URL for ``path`` (e.g. ``"/api/users/me/"``)."""
+    return f"{API_BASE_URL}/{path.lstrip('/')}"
+
+
+TOKEN_REFRESH_ENDPOINT = api_url("/api/users/token/refresh/")
+
+# One keep-alive connection pool shared by every screen and worker thread.
+session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=API_WORKERS * 2)
+session.mount("http://", _adapter)
+session.mount("https://", _adapter)
+
+_executor = ThreadPoolExecutor(max_workers=API_WORKERS, thread_name_prefix="api")
+
+# GET responses that carried an ETag, keyed by URL, query params and user, so
+# repeat screen visits can revalidate with If-None-Match instead of
+# re-downloading the whole list.
+RESPONSE_CACHE_SIZE = 64
+_response_cache: "OrderedDict[Tuple[str, str, str], Tuple[str, requests.Response]]" = OrderedDict()
+_response_cache_lock = threading.Lock()
 
 
 def _get_running_app():
@@ -18,14 +71,76 @@ def _get_running_app():
         return None
 
 
-def refresh_access_token(manager) -> Optional[str]:
-    """Attempt to refresh the access token using the stored refresh token."""
-    refresh_token = getattr(manager, "refresh_token", None)
-    if not refresh_token:
+def _token_claims(token: Optional[str]) -> Dict[str, Any]:
+    """Return the payload of a JWT without verifying it (empty if unreadable)."""
+    if not token:
+        return {}
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+    except (IndexError, ValueError):
+        return {}
+    return claims if isinstance(claims, dict) else {}
+
+
+def _token_subject(token: Optional[str]) -> str:
+    """Return the ``user_id`` claim of a JWT without verifying it."""
+    return str(_token_claims(token).get("user_id", ""))
+
+
+def _token_expiry(token: Optional[str]) -> Optional[float]:
+    """Return the ``exp`` claim of a JWT as a Unix timestamp, if present."""
+    try:
+        return float(_token_claims(token)["exp"])
+    except (KeyError, TypeError, ValueError):
         return None
 
+
+def _cache_key(url: str, params: Any, token: Optional[str]) -> Tuple[str, str, str]:
+    if isinstance(params, dict):
+        params = sorted(params.items())
+    return url, repr(params), _token_subject(token)
+
+
+def clear_response_cache() -> None:
+    with _response_cache_lock:
+        _response_cache.clear()
+
+
+def _send(method: str, url: str, headers: Dict[str, str], **kwargs: Any) -> requests.Response:
+    """Issue a request, revalidating cached GET responses by ETag."""
+    key = None
+    if method == "GET":
+        token = headers.get("Authorization", "").replace("Bearer ", "", 1)
+        key = _cache_key(url, kwargs.get("params"), token)
+        with _response_cache_lock:
+            cached = _response_cache.get(key)
+        if cached:
+            headers = dict(headers, **{"If-None-Match": cached[0]})
+
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    response = session.request(method, url, headers=headers, **kwargs)
+
+    if key is None:
+        return response
+    with _response_cache_lock:
+        if response.status_code == 304 and key in _response_cache:
+            _response_cache.move_to_end(key)
+            return _response_cache[key][1]
+        etag = response.headers.get("ETag")
+        if response.status_code == 200 and etag:
+            _response_cache[key] = (etag, response)
+            _response_cache.move_to_end(key)
+            while len(_response_cache) > RESPONSE_CACHE_SIZE:
+                _response_cache.popitem(last=False)
+    return response
+
+
+def _fetch_access_token(manager, refresh_token: str) -> Optional[str]:
+    """Exchange ``refresh_token`` for a new access token and store it."""
     try:
-        response = requests.post(
+        response = session.post(
             TOKEN_REFRESH_ENDPOINT,
             json={"refresh": refresh_token},
             timeout=10,
@@ -41,11 +156,13 @@ def refresh_access_token(manager) -> Optional[str]:
         if response.status_code in (401, 403):
             for attr in ("access_token", "refresh_token"):
                 if hasattr(manager, attr):
-                    delattr(manager, attr)
+                    setattr(manager, attr, None)
         return None
 
-    data = response.json()
-    new_access = data.get("access")
+    try:
+        new_access = response.json().get("access")
+    except ValueError:
+        new_access = None
     if not new_access:
         Logger.warning("APIClient: refresh response missing access token")
         return None
@@ -59,6 +176,86 @@ def refresh_access_token(manager) -> Optional[str]:
     return new_access
 
 
+class TokenManager:
+    """Hands out access tokens, renewing them before they expire.
+
+    A token is renewed once it is within ``margin`` seconds of its ``exp``
+    claim.  Refreshes are single-flight per refresh token: the first caller
+    makes the request and concurrent callers block on the same ``Future``
+    instead of sending their own.
+    """
+
+    def __init__(self, margin: float = REFRESH_MARGIN, clock: Callable[[], float] = time.time):
+        self.margin = margin
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+
+    def expiring(self, token: Optional[str]) -> bool:
+        """True if ``token`` is missing or lapses within ``margin`` seconds.
+        Tokens without an ``exp`` claim are trusted until the server refuses them."""
+        if not token:
+            return True
+        expiry = _token_expiry(token)
+        return expiry is not None and expiry - self._clock() <= self.margin
+
+    def access_token(self, manager) -> Optional[str]:
+        """A usable access token for ``manager``, refreshed first if it is
+        about to expire.  Falls back to the current token while it is still
+        valid if the refresh fails (e.g. the network is down)."""
+        token = getattr(manager, "access_token", None)
+        if not self.expiring(token):
+            return token
+        new_token = self.refresh(manager, stale=token)
+        if new_token:
+            return new_token
+        expiry = _token_expiry(token)
+        if token and expiry is not None and expiry > self._clock():
+            return token
+        return None
+
+    def refresh(self, manager, stale: Optional[str] = None) -> Optional[str]:
+        """Replace ``stale`` with a new access token.
+
+        If another thread already replaced it the newer token is returned
+        without a request; if a refresh is in flight the caller waits for it.
+        """
+        with self._lock:
+            current = getattr(manager, "access_token", None)
+            if current and current != stale and not self.expiring(current):
+                return current
+            refresh_token = getattr(manager, "refresh_token", None)
+            if not refresh_token:
+                return None
+            future = self._inflight.get(refresh_token)
+            leader = future is None
+            if leader:
+                future = self._inflight[refresh_token] = Future()
+
+        if not leader:
+            return future.result()
+
+        try:
+            new_token = _fetch_access_token(manager, refresh_token)
+        except BaseException as exc:
+            with self._lock:
+                self._inflight.pop(refresh_token, None)
+            future.set_exception(exc)
+            raise
+        with self._lock:
+            self._inflight.pop(refresh_token, None)
+        future.set_result(new_token)
+        return new_token
+
+
+tokens = TokenManager()
+
+
+def refresh_access_token(manager) -> Optional[str]:
+    """Attempt to refresh the access token using the stored refresh token."""
+    return tokens.refresh(manager, stale=getattr(manager, "access_token", None))
+
+
 def authenticated_request(
     method: str,
     url: str,
@@ -71,6 +268,13 @@ def authenticated_request(
     """
     Perform an HTTP request that automatically attempts to refresh expired tokens.
 
+    Tokens close to expiry are renewed before sending; a ``401`` triggers
+    one more refresh and a single retry.
+
+    GET responses carrying an ETag are kept in a small local cache and
+    revalidated with ``If-None-Match``; a ``304`` hands back the cached
+    response, so callers always see a normal ``200``.
+
     Returns:
         Tuple of (response, error). If `response` is None, `error` contains a string
         describing the issue. When a response is returned the caller should inspect
@@ -78,42 +282,142 @@ def authenticated_request(
     """
     request_headers: Dict[str, str] = dict(headers or {})
 
+    token = None
     if require_auth:
-        token = getattr(manager, "access_token", None)
-        if token:
-            request_headers.setdefault("Authorization", f"Bearer {token}")
-        else:
-            new_token = refresh_access_token(manager)
-            if new_token:
-                request_headers.setdefault("Authorization", f"Bearer {new_token}")
-            else:
-                return None, "authentication_required"
+        token = tokens.access_token(manager)
+        if not token:
+            return None, "authentication_required"
+        request_headers.setdefault("Authorization", f"Bearer {token}")
 
     try:
-        response = requests.request(
-            method.upper(),
-            url,
-            headers=request_headers,
-            **kwargs,
-        )
+        response = _send(method.upper(), url, request_headers, **kwargs)
     except requests.RequestException as exc:
         return None, str(exc)
 
     if not require_auth or response.status_code != 401:
         return response, None
 
-    new_token = refresh_access_token(manager)
+    new_token = tokens.refresh(manager, stale=token)
     if not new_token:
         return response, "token_refresh_failed"
 
     request_headers["Authorization"] = f"Bearer {new_token}"
     try:
-        retry_response = requests.request(
-            method.upper(),
-            url,
-            headers=request_headers,
-            **kwargs,
-        )
+        retry_response = _send(method.upper(), url, request_headers, **kwargs)
         return retry_response, None
     except requests.RequestException as exc:
         return None, str(exc)
+
+
+class Task:
+    """Handle for work started with ``run_async``."""
+
+    def __init__(self, owner=None):
+        self.cancelled = False
+        self.future = None
+        self._owner = weakref.ref(owner) if owner is not None else None
+
+    def cancel(self) -> None:
+        """Drop the result; queued work is not started at all.  A request
+        that is already on the wire finishes, but its callbacks never run."""
+        self.cancelled = True
+        if self.future is not None:
+            self.future.cancel()
+
+
+# Pending tasks per owner (usually a Screen), cancelled when it is left.
+_pending: "weakref.WeakKeyDictionary[Any, set]" = weakref.WeakKeyDictionary()
+_bound_owners: "weakref.WeakSet[Any]" = weakref.WeakSet()
+_pending_lock = threading.Lock()
+
+
+def cancel_pending(owner) -> None:
+    """Cancel every task started for ``owner``."""
+    with _pending_lock:
+        tasks = _pending.pop(owner, set())
+    for task in tasks:
+        task.cancel()
+
+
+def _track(owner, task: Task) -> None:
+    with _pending_lock:
+        _pending.setdefault(owner, set()).add(task)
+        first = owner not in _bound_owners
+        _bound_owners.add(owner)
+    if first and hasattr(owner, "bind"):
+        try:
+            owner.bind(on_leave=lambda *_: cancel_pending(owner))
+        except Exception:  # owner has no on_leave event (not a Screen)
+            pass
+
+
+def _untrack(owner, task: Task) -> None:
+    with _pending_lock:
+        tasks = _pending.get(owner)
+        if tasks is not None:
+            tasks.discard(task)
+
+
+def run_async(
+    func: Callable[..., Any],
+    *args: Any,
+    on_result: Optional[Callable[[Any], None]] = None,
+    on_error: Optional[Callable[[Exception], None]] = None,
+    owner=None,
+    **kwargs: Any,
+) -> Task:
+    """Run ``func(*args, **kwargs)`` on the API worker pool.
+
+    ``on_result(value)`` or ``on_error(exception)`` is called on the Kivy
+    main thread unless the task was cancelled first.  Passing the screen as
+    ``owner`` cancels the task when the screen is left.
+    """
+    task = Task(owner)
+    if owner is not None:
+        _track(owner, task)
+
+    def deliver(callback, value):
+        def call(dt):
+            if owner is not None:
+                _untrack(owner, task)
+            if not task.cancelled and callback is not None:
+                callback(value)
+        Clock.schedule_once(call)
+
+    def work():
+        if task.cancelled:
+            return
+        try:
+            value = func(*args, **kwargs)
+        except Exception as exc:  # delivered to on_error
+            if on_error is None:
+                Logger.exception(f"APIClient: background task failed: {exc}")
+            deliver(on_error, exc)
+        else:
+            deliver(on_result, value)
+
+    task.future = _executor.submit(work)
+    return task
+
+
+def request_async(
+    method: str,
+    url: str,
+    manager,
+    on_result: Callable[[Optional[requests.Response], Optional[str]], None],
+    *,
+    owner=None,
+    **kwargs: Any,
+) -> Task:
+    """``authenticated_request`` on the worker pool.
+
+    ``on_result(response, error)`` receives the same pair as the
+    synchronous call, on the main thread.
+    """
+    return run_async(
+        authenticated_request, method, url, manager,
+        on_result=lambda pair: on_result(*pair),
+        on_error=lambda exc: on_result(None, str(exc)),
+        owner=owner,
+        **kwargs,
+    )
@@ -0,0 +1,226 @@
+"""Frame-time benchmark for the virtualized appointment and chat lists.
+
+Usage::
+
+    python benchmark_lists.py                  # 1k and 10k rows
+    python benchmark_lists.py --rows 500 5000 --frames 240
+    python benchmark_lists.py --legacy         # also time one widget per row
+
+For every list and row count the benchmark fills the list (timed), then
+scrolls it from top to bottom over ``--frames`` frames and reports the
+frame times.  Frame pacing is uncapped (no vsync, ``maxfps`` 0) so the
+numbers reflect the work per frame rather than the display refresh rate.
+
+``--legacy`` measures the layout the screens used before: a ``ScrollView``
+holding a widget tree per item.  Its build time grows with the row count,
+so it is skipped above ``LEGACY_MAX_ROWS`` rows.
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+from statistics import mean
+
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+
+from kivy.config import Config
+
+Config.set("graphics", "maxfps", "0")
+Config.set("graphics", "vsync", "0")
+Config.set("graphics", "width", "1200")
+Config.set("graphics", "height", "800")
+
+from kivy.clock import Clock
+from kivy.lang import Builder
+from kivy.metrics import dp
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.gridlayout import GridLayout
+from kivy.uix.label import Label
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.uix.scrollview import ScrollView
+from kivymd.app import MDApp
+from kivymd.uix.button import MDRaisedButton
+
+BASE_DIR = Path(__file__).parent.absolute()
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from recycle_lists import OwnedRecycleView, appointment_rows, message_rows  # noqa: E402
+from screens.chat import MessageBubble  # noqa: E402
+
+DEFAULT_ROWS = (1000, 10000)
+DEFAULT_FRAMES = 120
+LEGACY_MAX_ROWS = 2000
+
+
+def fake_appointments(count):
+    return [
+        {
+            "id": index,
+            "date": f"2030-{index % 12 + 1:02d}-{index % 28 + 1:02d}",
+            "time": f"{6 + index % 14:02d}:00:00",
+            "status": "booked",
+            "patient_email": f"patient{index}@example.com",
+            "patient_name": f"Patient {index}",
+        }
+        for index in range(count)
+    ]
+
+
+def fake_messages(count):
+    text = "Please remember to take the medication twice a day after meals."
+    return [
+        (f"m{index:08d}", {
+            "sender": "Doctor" if index % 2 else "Patient",
+            "message": text[: 10 + index % len(text)],
+            "timestamp": index,
+        })
+        for index in range(count)
+    ]
+
+
+class _Owner:
+    """Stands in for the screen the rows call back into."""
+
+    def __getattr__(self, name):
+        return lambda *args: None
+
+
+def recycled_appointments(count):
+    view = OwnedRecycleView(owner=_Owner(), viewclass="AppointmentRow")
+    layout = RecycleBoxLayout(
+        orientation="vertical", default_size=(None, 120), default_size_hint=(1, None),
+        size_hint_y=None, spacing=dp(12),
+    )
+    layout.bind(minimum_height=layout.setter("height"))
+    view.add_widget(layout)
+    view.data = appointment_rows(fake_appointments(count))
+    return view
+
+
+def recycled_chat(count):
+    view = OwnedRecycleView(viewclass="MessageBubble")
+    layout = RecycleBoxLayout(
+        orientation="vertical", default_size_hint=(1, None), size_hint_y=None, spacing=dp(8),
+    )
+    layout.bind(minimum_height=layout.setter("height"))
+    view.add_widget(layout)
+    view.data = message_rows(fake_messages(count), "Patient", lambda ts: "just now")
+    return view
+
+
+def _legacy_scroll(spacing):
+    view = ScrollView()
+    container = GridLayout(cols=1, size_hint_y=None, spacing=spacing)
+    container.bind(minimum_height=container.setter("height"))
+    view.add_widget(container)
+    return view, container
+
+
+def legacy_appointments(count):
+    view, container = _legacy_scroll(dp(12))
+    for row in appointment_rows(fake_appointments(count)):
+        box = BoxLayout(orientation="vertical", size_hint_y=None, height=120, padding=6)
+        box.add_widget(Label(text=row["when"], color=(0, 0, 0, 1)))
+        box.add_widget(Label(text=row["patient_label"], color=(0, 0, 0, 1)))
+        buttons = BoxLayout(size_hint_y=None, height=dp(44), spacing=dp(8))
+        for text in ("Details", "Chat", "Video"):
+            buttons.add_widget(MDRaisedButton(text=text, size_hint=(1, 1), elevation=0))
+        box.add_widget(buttons)
+        container.add_widget(box)
+    return view
+
+
+def legacy_chat(count):
+    view, container = _legacy_scroll(dp(8))
+    for row in message_rows(fake_messages(count), "Patient", lambda ts: "just now"):
+        bubble = MessageBubble(**{k: v for k, v in row.items() if k != "height"})
+        bubble.bind(natural_height=bubble.setter("height"))
+        container.add_widget(bubble)
+    return view
+
+
+SCENARIOS = {
+    "appointments": (recycled_appointments, legacy_appointments),
+    "chat": (recycled_chat, legacy_chat),
+}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class ListBenchmarkApp(MDApp):
+    def __init__(self, rows, frames, legacy, **kwargs):
+        super().__init__(**kwargs)
+        self.plan = []
+        for name, (recycled, old) in SCENARIOS.items():
+            for count in rows:
+                self.plan.append((name, "recycled", count, recycled))
+                if legacy and count <= LEGACY_MAX_ROWS:
+                    self.plan.append((name, "legacy", count, old))
+        self.frames = frames
+        self.results = []
+
+    def build(self):
+        Builder.load_file(str(BASE_DIR / "kv" / "recycle_lists.kv"))
+        Builder.load_file(str(BASE_DIR / "kv" / "message_bubble.kv"))
+        self.root_box = BoxLayout()
+        Clock.schedule_once(lambda dt: self.next_scenario(), 0.5)
+        return self.root_box
+
+    def next_scenario(self):
+        self.root_box.clear_widgets()
+        if not self.plan:
+            self.report()
+            self.stop()
+            return
+        name, kind, count, factory = self.plan.pop(0)
+        started = time.perf_counter()
+        view = factory(count)
+        self.root_box.add_widget(view)
+        build_ms = (time.perf_counter() - started) * 1000
+        self.measure(view, (name, kind, count, build_ms))
+
+    def measure(self, view, label):
+        times = []
+        state = {"frame": -2, "last": None}  # two warm-up frames for the first layout
+
+        def step(dt):
+            now = time.perf_counter()
+            if state["frame"] >= 0:
+                times.append((now - state["last"]) * 1000)
+            state["last"] = now
+            state["frame"] += 1
+            if state["frame"] > self.frames:
+                self.results.append(label + (times,))
+                Clock.schedule_once(lambda dt: self.next_scenario(), 0)
+                return False
+            view.scroll_y = max(0.0, 1 - max(0, state["frame"]) / self.frames)
+
+        Clock.schedule_interval(step, 0)
+
+    def report(self):
+        print(f"{'list':<13}{'kind':<10}{'rows':>7}{'build ms':>10}{'mean ms':>9}{'p95 ms':>8}{'max ms':>8}")
+        for name, kind, count, build_ms, times in self.results:
+            print(
+                f"{name:<13}{kind:<10}{count:>7}{build_ms:>10.1f}"
+                f"{mean(times):>9.2f}{percentile(times, 0.95):>8.2f}{max(times):>8.2f}"
+            )
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=list(DEFAULT_ROWS))
+    parser.add_argument("--frames", type=int, default=DEFAULT_FRAMES)
+    parser.add_argument("--legacy", action="store_true", help="also time one widget per row")
+    args = parser.parse_args(argv)
+    ListBenchmarkApp(args.rows, args.frames, args.legacy).run()
+
+
+if __name__ == "__main__":
+    main()
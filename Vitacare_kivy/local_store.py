@@ -0,0 +1,366 @@
+"""Offline-first local copy of the signed-in user's records.
+
+Appointments, prescriptions, consultations and chat messages live in a
+SQLite file under the app's ``user_data_dir``.  Screens render straight from
+``LocalStore`` when they are entered, so switching screens never waits on
+the network and saved records stay readable without a connection.
+
+``SyncWorker`` reconciles the store with the server in the background.  It
+uses the ``?since=`` sync endpoints, so each pass downloads only rows that
+changed plus tombstones for deleted ones, and fires ``on_synced`` on the
+main thread for every resource that actually changed.
+
+Rows are scoped by owner (the signed-in user's id) so a shared device never
+shows one account's records to another.  Tokens are never written here or
+anywhere else on disk; a session lasts as long as the process.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from kivy.clock import Clock
+from kivy.event import EventDispatcher
+from kivy.logger import Logger
+from kivy.properties import BooleanProperty, StringProperty
+
+from api_client import api_url, authenticated_request, run_async
+
+SYNC_INTERVAL = 60  # seconds between background passes
+SYNC_MAX_PAGES = 20  # per resource and pass; the rest follows next pass
+
+# name -> (sync endpoint, fields forming the sort key, oldest first)
+RESOURCES: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "appointments": ("/api/appointments/sync/", ("date", "time", "id")),
+    "prescriptions": ("/api/medical/prescriptions/sync/", ("date_issued", "created_at", "id")),
+    "consultations": ("/api/medical/consultations/sync/", ("date", "created_at", "id")),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    owner TEXT NOT NULL,
+    resource TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    sort_key TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (owner, resource, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS records_sort ON records (owner, resource, sort_key);
+CREATE TABLE IF NOT EXISTS sync_state (
+    owner TEXT NOT NULL,
+    resource TEXT NOT NULL,
+    since TEXT NOT NULL,
+    PRIMARY KEY (owner, resource)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS messages (
+    owner TEXT NOT NULL,
+    chat_id TEXT NOT NULL,
+    key TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (owner, chat_id, key)
+) WITHOUT ROWID;
+"""
+
+
+def _sort_key(row: Dict[str, Any], fields: Iterable[str]) -> str:
+    # ISO dates and times sort correctly as text; ids are zero-padded.
+    parts = []
+    for field in fields:
+        value = row.get(field)
+        parts.append(f"{value:012d}" if isinstance(value, int) else str(value or ""))
+    return "\x1f".join(parts)
+
+
+class LocalStore:
+    """Thread-safe SQLite store; one connection shared under a lock."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _write(self, statements: Iterable[Tuple[str, Any]]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in statements:
+                    if isinstance(params, list):
+                        self._conn.executemany(sql, params)
+                    else:
+                        self._conn.execute(sql, params or ())
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _read(self, sql: str, params: Tuple[Any, ...]) -> List[Tuple[Any, ...]]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    # -- synced records ---------------------------------------------------
+
+    def records(self, owner, resource: str, *, newest_first: bool = False) -> List[Dict[str, Any]]:
+        order = "DESC" if newest_first else "ASC"
+        rows = self._read(
+            f"SELECT data FROM records WHERE owner = ? AND resource = ? ORDER BY sort_key {order}",
+            (str(owner), resource),
+        )
+        return [json.loads(data) for data, in rows]
+
+    def since(self, owner, resource: str) -> Optional[str]:
+        """The ``since`` value to send next, or None before the first sync."""
+        rows = self._read(
+            "SELECT since FROM sync_state WHERE owner = ? AND resource = ?", (str(owner), resource)
+        )
+        return rows[0][0] if rows else None
+
+    def apply(self, owner, resource: str, changed: List[Dict[str, Any]], deleted: List[int], since: str) -> None:
+        """Upsert ``changed``, drop ``deleted`` and move ``since`` in one transaction."""
+        owner = str(owner)
+        fields = RESOURCES[resource][1]
+        self._write([
+            (
+                "INSERT OR REPLACE INTO records (owner, resource, id, sort_key, data) VALUES (?, ?, ?, ?, ?)",
+                [(owner, resource, row["id"], _sort_key(row, fields), json.dumps(row)) for row in changed],
+            ),
+            (
+                "DELETE FROM records WHERE owner = ? AND resource = ? AND id = ?",
+                [(owner, resource, object_id) for object_id in deleted],
+            ),
+            (
+                "INSERT OR REPLACE INTO sync_state (owner, resource, since) VALUES (?, ?, ?)",
+                (owner, resource, since),
+            ),
+        ])
+
+    # -- chat messages ----------------------------------------------------
+
+    def messages(self, owner, chat_id: str, limit: Optional[int] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """``(key, message)`` pairs oldest first, in key order like Firebase's
+        ``orderBy="$key"``; with ``limit`` only the newest ones."""
+        if limit is None:
+            rows = self._read(
+                "SELECT key, data FROM messages WHERE owner = ? AND chat_id = ? ORDER BY key",
+                (str(owner), chat_id),
+            )
+        else:
+            rows = self._read(
+                "SELECT key, data FROM messages WHERE owner = ? AND chat_id = ? "
+                "ORDER BY key DESC LIMIT ?",
+                (str(owner), chat_id, limit),
+            )
+            rows.reverse()
+        return [(key, json.loads(data)) for key, data in rows]
+
+    def save_messages(self, owner, chat_id: str, messages: Dict[str, Dict[str, Any]]) -> None:
+        if not messages:
+            return
+        owner = str(owner)
+        self._write([(
+            "INSERT OR REPLACE INTO messages (owner, chat_id, key, timestamp, data) VALUES (?, ?, ?, ?, ?)",
+            [
+                (owner, chat_id, key, float(message.get("timestamp") or 0), json.dumps(message))
+                for key, message in messages.items()
+                if isinstance(message, dict)
+            ],
+        )])
+
+    def clear(self, owner=None) -> None:
+        """Forget everything stored for ``owner`` (or for everyone)."""
+        tables = ("records", "sync_state", "messages")
+        if owner is None:
+            self._write([(f"DELETE FROM {table}", None) for table in tables])
+        else:
+            self._write([(f"DELETE FROM {table} WHERE owner = ?", (str(owner),)) for table in tables])
+
+
+class SyncError(Exception):
+    pass
+
+
+class SyncWorker(EventDispatcher):
+    """Background reconciliation of ``LocalStore`` with the server.
+
+    Events (main thread):
+        ``on_synced(resource)`` after a pass changed ``resource`` locally.
+        ``on_sync_failed(resource, error)`` when a resource could not be
+        synced; ``error`` is ``"authentication_required"`` or a message.
+    """
+
+    __events__ = ("on_synced", "on_sync_failed")
+
+    online = BooleanProperty(True)
+    syncing = BooleanProperty(False)
+    owner = StringProperty("")
+
+    def __init__(self, store: LocalStore, manager, interval: float = SYNC_INTERVAL, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+        self.manager = manager
+        self.interval = interval
+        self._event = None
+        self._task = None
+        self._queued = set()
+
+    def start(self, owner) -> None:
+        """Begin syncing for ``owner`` now and every ``interval`` seconds."""
+        self.stop()
+        self.owner = str(owner)
+        self._event = Clock.schedule_interval(lambda dt: self.sync_now(), self.interval)
+        self.sync_now()
+
+    def stop(self) -> None:
+        if self._event is not None:
+            self._event.cancel()
+            self._event = None
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._queued.clear()
+        self.syncing = False
+        self.owner = ""
+
+    def sync_now(self, *resources: str) -> None:
+        """Sync ``resources`` (default: all).  A request made while a pass is
+        running is queued and runs as soon as it finishes."""
+        if not self.owner:
+            return
+        wanted = set(resources or RESOURCES)
+        if self._task is not None:
+            self._queued |= wanted
+            return
+        self.syncing = True
+        owner = self.owner
+        self._task = run_async(
+            self._sync, owner, sorted(wanted),
+            on_result=lambda outcome: self._finished(owner, outcome),
+            on_error=lambda exc: self._finished(owner, ([], {name: str(exc) for name in wanted})),
+        )
+
+    def _sync(self, owner: str, resources: List[str]):
+        """Worker thread: returns ``(changed_resources, {resource: error})``."""
+        changed, failed = [], {}
+        for name in resources:
+            try:
+                if self._sync_resource(owner, name):
+                    changed.append(name)
+            except SyncError as exc:
+                failed[name] = str(exc)
+        return changed, failed
+
+    def _sync_resource(self, owner: str, name: str) -> bool:
+        path, _ = RESOURCES[name]
+        touched = False
+        for _page in range(SYNC_MAX_PAGES):
+            since = self.store.since(owner, name)
+            response, error = authenticated_request(
+                "GET", api_url(path), self.manager,
+                params={"since": since} if since else None,
+            )
+            if response is None:
+                raise SyncError(error or "network error")
+            if response.status_code in (401, 403):
+                raise SyncError("authentication_required")
+            if response.status_code != 200:
+                raise SyncError(f"server returned {response.status_code}")
+            data = response.json()
+            changed, deleted = data.get("changed") or [], data.get("deleted") or []
+            self.store.apply(owner, name, changed, deleted, data["since"])
+            touched = touched or bool(changed or deleted) or since is None
+            if not data.get("has_more"):
+                break
+        return touched
+
+    def _finished(self, owner: str, outcome) -> None:
+        self._task = None
+        self.syncing = False
+        if owner != self.owner:  # signed out or switched account meanwhile
+            return
+        changed, failed = outcome
+        self.online = not any(error != "authentication_required" for error in failed.values())
+        for name, error in failed.items():
+            Logger.info(f"LocalStore: sync of {name} failed: {error}")
+            self.dispatch("on_sync_failed", name, error)
+        for name in changed:
+            self.dispatch("on_synced", name)
+        if self._queued:
+            queued, self._queued = self._queued, set()
+            self.sync_now(*queued)
+
+    def on_synced(self, resource):
+        pass
+
+    def on_sync_failed(self, resource, error):
+        pass
+
+
+class SyncedScreenMixin:
+    """For screens listing one synced ``resource``.
+
+    Renders from the store on entry, asks for a sync, and renders again
+    whenever the worker changes the resource.  Screens must implement
+    ``render_records(records)`` and ``show_sync_error(error, has_records)``;
+    a class that misses either fails when it is defined.
+    """
+
+    resource = ""
+    newest_first = False
+    HOOKS = ("render_records", "show_sync_error")
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        missing = [name for name in cls.HOOKS if getattr(cls, name) is getattr(SyncedScreenMixin, name)]
+        if missing:
+            raise TypeError(f"{cls.__name__} must implement {', '.join(missing)}")
+
+    def on_pre_enter(self, *args):
+        super().on_pre_enter(*args)
+        manager = self.manager
+        if manager.store is None or not manager.user_id:
+            self.show_sync_error("authentication_required", has_records=False)
+            return
+        manager.sync.bind(on_synced=self._on_synced, on_sync_failed=self._on_sync_failed)
+        self.render_records(self.stored_records())
+        manager.sync.sync_now(self.resource)
+
+    def on_leave(self, *args):
+        super().on_leave(*args)
+        if self.manager.sync is not None:
+            self.manager.sync.unbind(on_synced=self._on_synced, on_sync_failed=self._on_sync_failed)
+
+    def refresh(self) -> None:
+        """Ask for a sync now (e.g. from a refresh button)."""
+        if self.manager.sync is not None:
+            self.manager.sync.sync_now(self.resource)
+
+    def stored_records(self) -> List[Dict[str, Any]]:
+        return self.manager.store.records(self.manager.user_id, self.resource, newest_first=self.newest_first)
+
+    def synced_once(self) -> bool:
+        """False until the first sync for this user has completed."""
+        return self.manager.store.since(self.manager.user_id, self.resource) is not None
+
+    def _on_synced(self, worker, resource):
+        if resource == self.resource:
+            self.render_records(self.stored_records())
+
+    def _on_sync_failed(self, worker, resource, error):
+        if resource == self.resource:
+            self.show_sync_error(error, has_records=bool(self.stored_records()))
+
+    def render_records(self, records: List[Dict[str, Any]]) -> None:
+        """Show ``records``, already in display order."""
+
+    def show_sync_error(self, error: str, has_records: bool) -> None:
+        """Report a failed sync; ``has_records`` if stored ones are shown."""
@@ -18,6 +18,7 @@ logger = logging.getLogger(__name__)
 # Third-party imports
 from kivy.config import Config
 from kivy.lang import Builder
+from kivy.properties import DictProperty, ObjectProperty, StringProperty
 from kivy.uix.screenmanager import ScreenManager, NoTransition, Screen
 from kivymd.app import MDApp
 
@@ -44,6 +45,8 @@ for directory in [ASSETS_DIR, KV_DIR]:
         logger.error(f"Failed to create directory {directory}: {e}")
         sys.exit(1)
 
+from local_store import LocalStore, SyncWorker
+
 # Lazy load screens to improve startup time
 def get_screen_imports() -> Dict[str, Type[Screen]]:
     """Dynamically import and return screen classes."""
@@ -103,6 +106,7 @@ def load_kv_files() -> bool:
         "appointment_detail.kv",
         "doctor_add_prescription.kv",
         "doctor_add_consultation.kv",
+        "recycle_lists.kv",
         "message_bubble.kv",
         "chat.kv",
         "video_call.kv",
@@ -123,6 +127,61 @@ def load_kv_files() -> bool:
     
     return success
 
+class VitaCareScreenManager(ScreenManager):
+    """Screen manager carrying the session shared by every screen.
+
+    Tokens live only in memory for the lifetime of the process.  Records
+    are read from ``store`` and kept current by ``sync`` (see
+    ``local_store``).
+    """
+    # Session
+    access_token = ObjectProperty(None, allownone=True)
+    refresh_token = ObjectProperty(None, allownone=True)
+    user_id = StringProperty("")
+    role = StringProperty("")
+    doctor_email = ObjectProperty(None, allownone=True)
+    doctor_name = ObjectProperty(None, allownone=True)
+
+    # Navigation context handed from one screen to the next
+    active_chat_context = DictProperty({})
+    current_appointment_id = ObjectProperty(None, allownone=True)
+    current_appointment_doctor = ObjectProperty(None, allownone=True)
+    current_patient_id = ObjectProperty(None, allownone=True)
+    current_patient_email = ObjectProperty(None, allownone=True)
+    current_patient_name = ObjectProperty(None, allownone=True)
+    appointment_data = ObjectProperty(None, allownone=True)
+    video_previous = ObjectProperty(None, allownone=True)
+
+    store = ObjectProperty(None, allownone=True)
+    sync = ObjectProperty(None, allownone=True)
+
+    SESSION_PROPERTIES = (
+        'access_token', 'refresh_token', 'user_id', 'role', 'doctor_email', 'doctor_name',
+        'active_chat_context', 'current_appointment_id', 'current_appointment_doctor',
+        'current_patient_id', 'current_patient_email', 'current_patient_name',
+        'appointment_data', 'video_previous',
+    )
+
+    def sign_in(self, access_token, refresh_token, user_id, role, **identity):
+        """Start a session and begin syncing the user's records."""
+        self.sign_out()
+        self.access_token = access_token
+        self.refresh_token = refresh_token
+        self.user_id = str(user_id or "")
+        self.role = role or ""
+        for name, value in identity.items():
+            setattr(self, name, value)
+        if self.sync is not None and self.user_id:
+            self.sync.start(self.user_id)
+
+    def sign_out(self):
+        """End the session; saved records stay for the next sign-in."""
+        if self.sync is not None:
+            self.sync.stop()
+        for name in self.SESSION_PROPERTIES:
+            setattr(self, name, self.property(name).defaultvalue)
+
+
 class VitaCareApp(MDApp):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -155,7 +214,8 @@ class VitaCareApp(MDApp):
                 logger.warning("Some KV files failed to load, the app may not work as expected")
             
             # Initialize screen manager
-            self.screen_manager = ScreenManager(transition=NoTransition())
+            self.screen_manager = VitaCareScreenManager(transition=NoTransition())
+            self._open_local_store()
             
             # Load screens dynamically
             screen_classes = get_screen_imports()
@@ -194,10 +254,23 @@ class VitaCareApp(MDApp):
         except Exception as e:
             logger.error(f"Failed to switch to screen {screen_name}: {e}")
     
+    def _open_local_store(self) -> None:
+        """Attach the offline store and its background sync worker."""
+        try:
+            store = LocalStore(Path(self.user_data_dir) / 'vitacare_local.sqlite3')
+        except Exception as e:
+            logger.error(f"Failed to open local store: {e}", exc_info=True)
+            return
+        self.screen_manager.store = store
+        self.screen_manager.sync = SyncWorker(store, self.screen_manager)
+
     def on_stop(self):
         """Clean up resources when the application stops."""
         logger.info("Application is shutting down")
-        # Add any cleanup code here
+        if self.screen_manager is not None:
+            self.screen_manager.sign_out()
+            if self.screen_manager.store is not None:
+                self.screen_manager.store.close()
 
 def main():
     """Main entry point for the application."""
@@ -0,0 +1,149 @@
+"""Virtualized lists for the appointment, record and chat screens.
+
+Each list is a ``RecycleView``: a screen hands it plain ``data`` dicts built
+by the adapter functions below, and Kivy creates only the rows that fit in
+the viewport, reusing them while scrolling.  Drawing a list of 10k
+appointments therefore costs about the same as drawing ten.
+
+Rows of varying height carry a ``height`` in their data so the layout never
+has to build off-screen rows to measure them.  Chat bubbles start from an
+estimate and write back their measured height once their text is laid out.
+The kv rules live in ``kv/recycle_lists.kv``.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from kivy.metrics import dp
+from kivy.properties import NumericProperty, ObjectProperty, StringProperty
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+
+# Characters that fit on one line of a chat bubble (320dp wide, 14sp) and
+# of a record row (the 400dp history cards).
+BUBBLE_LINE_CHARS = 36
+RECORD_LINE_CHARS = 44
+
+
+def wrapped_lines(text: str, line_chars: int) -> int:
+    """Lines ``text`` takes once wrapped at roughly ``line_chars``."""
+    return sum(max(1, math.ceil(len(line) / line_chars)) for line in (text or "").split("\n"))
+
+
+class OwnedRecycleView(RecycleView):
+    """``RecycleView`` whose rows call back into ``owner`` (their screen)."""
+    owner = ObjectProperty(None, allownone=True)
+
+    def scroll_to_end(self, *args) -> None:
+        if self.data:
+            self.scroll_y = 0
+
+
+class RowBehavior(RecycleDataViewBehavior):
+    """Remembers the view and data index a recycled row is showing."""
+    rv = None
+    index = None
+
+    def refresh_view_attrs(self, rv, index, data):
+        self.rv, self.index = rv, index
+        return super().refresh_view_attrs(rv, index, data)
+
+    @property
+    def owner(self):
+        return getattr(self.rv, "owner", None)
+
+
+class AppointmentRow(RowBehavior, BoxLayout):
+    appointment_id = ObjectProperty(None, allownone=True)
+    when = StringProperty("")
+    patient_label = StringProperty("")
+    patient_name = StringProperty("")
+    patient_email = StringProperty("")
+
+    def open_detail(self):
+        self.owner.open_appointment_detail(self.appointment_id)
+
+    def open_chat(self):
+        self.owner.open_chat(self.appointment_id, self.patient_name or None, self.patient_email)
+
+    def open_video(self):
+        self.owner.open_video(self.appointment_id)
+
+
+class RecordRow(RowBehavior, BoxLayout):
+    """A prescription or consultation as a block of text lines."""
+    text = StringProperty("")
+
+
+class MeasuredRowBehavior(RowBehavior):
+    """For rows whose height depends on their content: once laid out, the
+    measured ``natural_height`` replaces the estimate in the data."""
+    natural_height = NumericProperty(0)
+
+    def on_natural_height(self, instance, value):
+        rv, index = self.rv, self.index
+        if rv is None or index is None or index >= len(rv.data) or value <= 0:
+            return
+        entry = rv.data[index]
+        if abs(entry.get("height", 0) - value) > 1:
+            rv.data[index] = dict(entry, height=value)
+
+
+# -- data adapters ----------------------------------------------------------
+
+def appointment_rows(records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Data for ``AppointmentRow``: booked appointments in store order."""
+    return [
+        {
+            "appointment_id": a["id"],
+            "when": f"{a['date']} {a['time']}",
+            "patient_label": f"Patient: {a.get('patient_email') or ''}",
+            "patient_name": a.get("patient_name") or "",
+            "patient_email": a.get("patient_email") or "",
+        }
+        for a in records
+        if a.get("status") == "booked"
+    ]
+
+
+def record_rows(records: Iterable[Dict[str, Any]], describe: Callable[[Dict[str, Any]], List[str]]) -> List[Dict[str, Any]]:
+    """Data for ``RecordRow``; ``describe(record)`` returns its text lines."""
+    rows = []
+    for record in records:
+        text = "\n".join(describe(record))
+        rows.append({"text": text, "height": dp(20) * wrapped_lines(text, RECORD_LINE_CHARS) + dp(20)})
+    return rows
+
+
+def bubble_height(text: str, with_sender: bool) -> float:
+    """Estimated height of a ``MessageBubble`` before it is laid out."""
+    # message lines, time line, bubble padding, row padding
+    height = dp(20) * wrapped_lines(text, BUBBLE_LINE_CHARS) + dp(16) + dp(20) + dp(8)
+    if with_sender:
+        height += dp(18)
+    return height
+
+
+def message_row(key: str, message: Dict[str, Any], current_user: str,
+                format_timestamp: Callable[[Any], str]) -> Dict[str, Any]:
+    """Data for one ``MessageBubble``."""
+    sender = message.get("sender", "Unknown")
+    text = message.get("message", "")
+    is_me = sender == current_user
+    return {
+        "key": key,
+        "message": text,
+        "sender": sender,
+        "time": format_timestamp(message.get("timestamp", 0)),
+        "is_me": 1 if is_me else 0,
+        "height": bubble_height(text, with_sender=not is_me and bool(sender)),
+    }
+
+
+def message_rows(messages: Iterable[Tuple[str, Dict[str, Any]]], current_user: str,
+                 format_timestamp: Callable[[Any], str]) -> List[Dict[str, Any]]:
+    """Data for ``MessageBubble`` from ``(key, message)`` pairs, oldest first."""
+    return [message_row(key, message, current_user, format_timestamp) for key, message in messages]
@@ -1,7 +1,8 @@
 from kivy.uix.screenmanager import Screen
 from kivy.uix.popup import Popup
 from kivy.uix.label import Label
-import requests
+
+from api_client import api_url, request_async
 
 class AppointmentDetailScreen(Screen):
     def on_pre_enter(self):
@@ -15,16 +16,22 @@ class AppointmentDetailScreen(Screen):
         if not appt_id:
             self.ids.detail_label.text = "No appointment selected."
             return
-        doctor_email = getattr(self.manager, 'doctor_email', '')
-        resp = requests.get(f"http://127.0.0.1:8000/api/appointments/doctor-list/?email={doctor_email}")
-        if resp.status_code == 200:
-            for a in resp.json().get('appointments', []):
-                if a['appointment_id'] == appt_id:
-                    self.ids.detail_label.text = f"Date: {a['date']}\nTime: {a['time']}\nPatient: {a['patient_email']}\nReason: {a['reason']}"
-                    self.manager.current_patient_id = a['patient_id']
-                    self.manager.current_patient_email = a['patient_email']
-                    self.manager.current_patient_name = a.get('patient_name')
-                    return
+        self.ids.detail_label.text = "Loading..."
+        request_async(
+            "GET", api_url("/api/appointments/detail/"), self.manager, self._on_detail,
+            owner=self, require_auth=False, params={'id': appt_id}
+        )
+
+    def _on_detail(self, resp, error):
+        if resp is None:
+            self.ids.detail_label.text = f"Failed to load appointment: {error}"
+        elif resp.status_code == 200:
+            a = resp.json()
+            self.ids.detail_label.text = f"Date: {a['date']}\nTime: {a['time']}\nPatient: {a['patient_email']}\nReason: {a['reason'] or 'N/A'}"
+            self.manager.current_patient_id = a['patient_id']
+            self.manager.current_patient_email = a['patient_email']
+            self.manager.current_patient_name = a.get('patient_name')
+        elif resp.status_code == 404:
             self.ids.detail_label.text = "Appointment not found."
         else:
             self.ids.detail_label.text = "Failed to load appointment."
@@ -34,10 +41,15 @@ class AppointmentDetailScreen(Screen):
         if not appt_id:
             self.show_popup("No appointment selected.")
             return
-        token = getattr(self.manager, 'access_token', None)
-        headers = {"Authorization": f"Bearer {token}"} if token else {}
-        resp = requests.post(f"http://127.0.0.1:8000/api/appointments/complete/{appt_id}/", headers=headers)
-        if resp.status_code == 200:
+        request_async(
+            "POST", api_url(f"/api/appointments/complete/{appt_id}/"), self.manager, self._on_completed,
+            owner=self
+        )
+
+    def _on_completed(self, resp, error):
+        if resp is None:
+            self.show_popup(f"Error: {error}")
+        elif resp.status_code == 200:
             self.show_popup("Appointment marked complete.")
             self.manager.current = 'doctor_view_appointments'
         else:
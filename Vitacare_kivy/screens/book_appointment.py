@@ -6,11 +6,50 @@ from kivymd.uix.button import MDFlatButton
 import requests
 import stripe
 
+from api_client import api_url, authenticated_request, run_async, session
+
+DIRECTORY_URL = api_url("/api/users/doctors/")
+
+
 class BookAppointmentScreen(Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         # Initialize Stripe with your existing API key
         stripe.api_key = ""
+        # Doctor directory keyed by email, revalidated with its ETag
+        self.doctor_directory = {}
+        self.directory_etag = None
+
+    def on_enter(self):
+        self.load_directory()
+
+    def load_directory(self):
+        """Refresh the doctor directory in the background."""
+        run_async(self.fetch_directory, owner=self)
+
+    def fetch_directory(self):
+        """Fetch the doctor directory, or confirm the cached copy is current
+        (blocking; call from a worker)."""
+        headers = {"If-None-Match": self.directory_etag} if self.directory_etag else {}
+        try:
+            response = session.get(DIRECTORY_URL, headers=headers, timeout=10)
+        except requests.exceptions.RequestException as e:
+            print(f"Could not load doctor directory: {e}")
+            return
+        if response.status_code == 200:
+            self.doctor_directory = {
+                doctor["email"]: doctor for doctor in response.json().get("doctors", [])
+            }
+            self.directory_etag = response.headers.get("ETag")
+
+    def resolve_doctor_id(self, email):
+        """Doctor id for ``email`` from the local directory; reloads it once
+        if the doctor is unknown (e.g. newly registered).  Blocking."""
+        email = email.strip().lower()
+        if email not in self.doctor_directory:
+            self.fetch_directory()
+        doctor = self.doctor_directory.get(email)
+        return doctor["id"] if doctor else None
 
     def show_popup(self, message):
         popup = Popup(title="Appointment Info",
@@ -85,47 +124,50 @@ class BookAppointmentScreen(Screen):
             self.show_popup("Doctor email is required.")
             return
 
-        try:
-            # First process payment
-            # You might want to get patient email/name from your user data
-            payment_success = self.process_payment(
-                customer_email="patient@example.com",  # Replace with actual patient email
-                customer_name="Patient Name"  # Replace with actual patient name
-            )
-            
-            if not payment_success:
-                self.show_popup("Payment processing failed. Please try again.")
-                return
-
-            # Continue with original appointment booking logic
-            url_id = f"http://127.0.0.1:8000/api/users/doctor-id/?email={email}"
-            response_id = requests.get(url_id)
-            if response_id.status_code != 200:
-                self.show_popup("Doctor not found.")
-                return
-            doctor_id = response_id.json().get("doctor_id")
-
-            url_book = "http://127.0.0.1:8000/api/appointments/book/"
-            headers = {
-                "Authorization": f"Bearer {self.manager.access_token}",
-                "Content-Type": "application/json"
-            }
-            data = {"doctor": doctor_id}
-            if date:
-                data["date"] = date
-            if time:
-                data["time"] = time
-            if reason:
-                data["reason"] = reason
-
-            response_book = requests.post(url_book, json=data, headers=headers)
-            if response_book.status_code == 201:
-                res = response_book.json()
-                msg = f"✅ Appointment booked successfully!\nSuggested time: {res.get('suggested_time')}\nPayment processed successfully!"
-                self.show_popup(msg)
-                self.ids.appointment_status.text = f"Next available: {res.get('suggested_time')}"
-            else:
-                error = response_book.json()
-                self.show_popup(f"❌ Error: {error}")
-        except Exception as e:
-            self.show_popup(f"Error: {str(e)}")
+        self.ids.appointment_status.text = "Booking..."
+        run_async(
+            self._book, email, date, time, reason,
+            on_result=self._on_booked,
+            on_error=lambda e: self.show_popup(f"Error: {str(e)}"),
+        )
+
+    def _book(self, email, date, time, reason):
+        """Pay and book (runs on a worker).  Returns ``(message, suggested_time)``."""
+        # First process payment
+        # You might want to get patient email/name from your user data
+        payment_success = self.process_payment(
+            customer_email="patient@example.com",  # Replace with actual patient email
+            customer_name="Patient Name"  # Replace with actual patient name
+        )
+
+        if not payment_success:
+            return "Payment processing failed. Please try again.", None
+
+        # Continue with original appointment booking logic
+        doctor_id = self.resolve_doctor_id(email)
+        if doctor_id is None:
+            return "Doctor not found.", None
+
+        data = {"doctor": doctor_id}
+        if date:
+            data["date"] = date
+        if time:
+            data["time"] = time
+        if reason:
+            data["reason"] = reason
+
+        response_book, error = authenticated_request(
+            "POST", api_url("/api/appointments/book/"), self.manager, json=data
+        )
+        if response_book is None:
+            return f"❌ Error: {error}", None
+        if response_book.status_code == 201:
+            res = response_book.json()
+            msg = f"✅ Appointment booked successfully!\nSuggested time: {res.get('suggested_time')}\nPayment processed successfully!"
+            return msg, res.get('suggested_time')
+        return f"❌ Error: {response_book.json()}", None
+
+    def _on_booked(self, result):
+        message, suggested_time = result
+        self.show_popup(message)
+        self.ids.appointment_status.text = f"Next available: {suggested_time}" if suggested_time else ""
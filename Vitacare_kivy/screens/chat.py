@@ -1,9 +1,8 @@
 import json
 import time
+from collections import OrderedDict
 from typing import Dict
 
-import requests
-from kivy.animation import Animation
 from kivy.clock import Clock
 from kivy.metrics import dp
 from kivy.properties import DictProperty, NumericProperty, StringProperty
@@ -11,8 +10,13 @@ from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.screenmanager import Screen
 from kivymd.app import MDApp
 
+from api_client import run_async, session
+from recycle_lists import MeasuredRowBehavior, message_row
 
-class MessageBubble(BoxLayout):
+
+class MessageBubble(MeasuredRowBehavior, BoxLayout):
+    """A chat message; instances are recycled by the messages view."""
+    key = StringProperty('')
     message = StringProperty('')
     sender = StringProperty('')
     time = StringProperty('')
@@ -24,17 +28,25 @@ class MessageBubble(BoxLayout):
         self.size_hint = (1, None)
         self.padding = [dp(8), dp(4), dp(8), dp(4)]
         self.spacing = dp(8)
-        
-        # Add animation for new messages
-        anim = Animation(opacity=1, duration=0.3)
-        anim.start(self)
-        self.opacity = 0
 
 
 class BaseChatScreen(Screen):
+    """Chat for one appointment, polled from Firebase.
+
+    Rendering is incremental: the screen remembers the newest message key
+    (Firebase push keys sort chronologically) and each poll asks only for
+    messages from that key on, appending just the new bubbles.  Every
+    ``RECHECK_EVERY`` polls a window of ``MESSAGE_LIMIT`` messages is read
+    again so edits are picked up in place; successive rechecks walk back
+    through the buffer from the newest message, one window at a time, so
+    an edit to any message shown is seen within a few rechecks.  At most
+    ``MESSAGE_BUFFER`` messages are kept; the oldest drop off the top.
+    """
     FIREBASE_DB_URL = "https://vitacare-chat-default-rtdb.firebaseio.com/"
     POLL_INTERVAL = 3  # seconds
-    last_message_count = 0
+    MESSAGE_LIMIT = 50  # messages read on entry and on each recheck
+    MESSAGE_BUFFER = 500
+    RECHECK_EVERY = 10  # polls
     DEFAULT_HEADER_TITLE = "Chat"
     DEFAULT_BACK_SCREEN = "welcome"
     USER_ROLE = "user"
@@ -47,6 +59,12 @@ class BaseChatScreen(Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self._refresh_event = None
+        self._poll_task = None
+        # key -> displayed fields, oldest first; mirrors messages_view.data
+        self._buffer = OrderedDict()
+        self._polls = 0
+        # The next recheck reads the window ending at this key; None is the newest
+        self._recheck_before = None
 
     def on_pre_enter(self, *args):
         super().on_pre_enter(*args)
@@ -57,8 +75,13 @@ class BaseChatScreen(Screen):
             self.show_status("No conversation selected", is_error=True)
             return
 
-        self.show_status("Loading messages...")
-        self.last_message_count = 0
+        # Show the saved conversation at once; the poll brings it up to date.
+        self.reset_messages()
+        cached = self._stored_messages()
+        if cached:
+            self.merge_messages(cached)
+        else:
+            self.show_status("Loading messages...")
         self.load_messages()
         self._refresh_event = Clock.schedule_interval(
             lambda dt: self.load_messages(),
@@ -98,14 +121,31 @@ class BaseChatScreen(Screen):
         self.header_title = header
         self.back_screen = raw_context.get('back_screen', self.DEFAULT_BACK_SCREEN)
 
-    def get_chat_url(self):
-        """Return Firebase path for current appointment"""
+    def get_chat_id(self):
         appointment_id = self.context.get('appointment_id')
         if not appointment_id:
             return None
-        chat_id = self.context.get('chat_id') or f"appointment_{appointment_id}"
+        return self.context.get('chat_id') or f"appointment_{appointment_id}"
+
+    def get_chat_url(self):
+        """Return Firebase path for current appointment"""
+        chat_id = self.get_chat_id()
+        if not chat_id:
+            return None
         return f"{self.FIREBASE_DB_URL}/chats/{chat_id}/messages.json"
 
+    def _stored_messages(self):
+        """The last ``MESSAGE_LIMIT`` messages saved locally for this chat."""
+        store, owner, chat_id = self.manager.store, self.manager.user_id, self.get_chat_id()
+        if store is None or not owner or not chat_id:
+            return []
+        return store.messages(owner, chat_id, limit=self.MESSAGE_LIMIT)
+
+    @property
+    def last_key(self):
+        """Key of the newest message shown, or None."""
+        return next(reversed(self._buffer), None)
+
     def show_status(self, message, is_error=False):
         """Show status message in the status bar"""
         status_label = self.ids.get('status_label')
@@ -124,56 +164,125 @@ class BaseChatScreen(Screen):
             status_label.text = ""
 
     def load_messages(self):
-        """Fetch messages from Firebase"""
-        try:
-            url = self.get_chat_url()
-            if not url:
-                self.show_status("Chat not available", is_error=True)
-                return
-            response = requests.get(f"{url}?orderBy=\"$key\"&limitToLast=50")
-            
-            if response.status_code == 200 and response.json():
-                messages = response.json()
-                
-                # Only update if we have new messages
-                if len(messages) != self.last_message_count:
-                    self.last_message_count = len(messages)
-                    self.display_messages(messages)
-                    
-        except Exception as e:
-            self.show_status(f"Error loading chat: {str(e)}", is_error=True)
-    
-    def display_messages(self, messages):
-        """Display messages in the chat area"""
-        container = self.ids.messages_container
-        container.clear_widgets()
-        
-        # Get current user name to identify own messages
+        """Fetch messages from Firebase in the background"""
+        url = self.get_chat_url()
+        if not url:
+            self.show_status("Chat not available", is_error=True)
+            return
+        # Skip this poll if the previous one has not answered yet
+        if self._poll_task is not None and not self._poll_task.future.done():
+            return
+
+        store, owner, chat_id = self.manager.store, self.manager.user_id, self.get_chat_id()
+        params = {"orderBy": '"$key"'}
+        last_key = self.last_key
+        recheck = last_key is None or self._polls % self.RECHECK_EVERY == 0
+        if recheck:
+            params["limitToLast"] = self.MESSAGE_LIMIT
+            if last_key is not None and self._recheck_before is not None:
+                params["endAt"] = json.dumps(self._recheck_before)
+        else:
+            # startAt is inclusive; the known message is skipped when merging
+            params["startAt"] = json.dumps(last_key)
+        self._polls += 1
+
+        def fetch():
+            response = session.get(url, params=params, timeout=10)
+            messages = response.json() if response.status_code == 200 else None
+            if not isinstance(messages, dict):
+                return []
+            if store is not None and owner:
+                store.save_messages(owner, chat_id, messages)
+            return list(messages.items())
+
+        def fetched(messages):
+            self.merge_messages(messages)
+            if recheck:
+                self._advance_recheck(messages)
+
+        self._poll_task = run_async(
+            fetch,
+            on_result=fetched,
+            on_error=lambda e: self.show_status(f"Error loading chat: {str(e)}", is_error=True),
+            owner=self,
+        )
+
+    def reset_messages(self):
+        """Forget the displayed conversation (e.g. when switching chats)."""
+        self._buffer.clear()
+        self._polls = 0
+        self._recheck_before = None
+        self.ids.messages_view.data = []
+
+    def _advance_recheck(self, messages):
+        """Point the next recheck at the window before ``messages``.
+
+        Once a window reaches the oldest message kept, the next recheck
+        starts again from the newest.
+        """
+        oldest = min((key for key, _ in messages), default=None)
+        first_key = next(iter(self._buffer), None)
+        if len(messages) < self.MESSAGE_LIMIT or first_key is None or oldest <= first_key:
+            self._recheck_before = None
+        else:
+            # endAt is inclusive, so windows overlap by one message
+            self._recheck_before = oldest
+
+    def merge_messages(self, messages):
+        """Merge ``(key, message)`` pairs into the view.
+
+        Messages newer than the last one shown are appended; known ones are
+        updated in place only if their content changed.  Messages older than
+        the first one kept are ignored: they are outside the buffer.  Cost is
+        proportional to the number of pairs, not to the conversation length.
+        """
         current_user = self._get_current_user_name(default="User")
-        
-        # Sort messages by timestamp
-        sorted_msgs = sorted(messages.values(), 
-                           key=lambda m: m.get('timestamp', 0))
-        
-        for msg in sorted_msgs:
-            sender = msg.get('sender', 'Unknown')
-            text = msg.get('message', '')
-            timestamp = msg.get('timestamp', 0)
-            is_me = sender == current_user
-            
-            # Create and add message bubble
-            bubble = MessageBubble(
-                message=text,
-                sender=sender,
-                time=self.format_timestamp(timestamp),
-                is_me=1 if is_me else 0
-            )
-            
-            # Add message to container
-            container.add_widget(bubble)
-        
-        # Scroll to bottom after adding messages
-        Clock.schedule_once(self.scroll_to_bottom, 0.1)
+        view = self.ids.messages_view
+        last_key = self.last_key
+        first_key = next(iter(self._buffer), None)
+        appended, edited, out_of_order = [], {}, False
+
+        for key, msg in sorted((item for item in messages if isinstance(item[1], dict)), key=lambda item: item[0]):
+            row = message_row(key, msg, current_user, self.format_timestamp)
+            fields = (row['message'], row['sender'], row['time'], row['is_me'])
+            known = self._buffer.get(key)
+            if known is not None:
+                if known != fields:
+                    self._buffer[key] = fields
+                    edited[key] = row
+            elif last_key is None or key > last_key:
+                self._buffer[key] = fields
+                appended.append(row)
+                last_key = key
+            elif key > first_key:
+                # A late message between ones already shown
+                self._buffer[key] = fields
+                edited[key] = row
+                out_of_order = True
+
+        if out_of_order:
+            self._buffer = OrderedDict(sorted(self._buffer.items()))
+            rows = {entry['key']: entry for entry in view.data}
+            rows.update(edited)
+            rows.update((row['key'], row) for row in appended)
+            view.data = [rows[key] for key in self._buffer]
+        else:
+            if edited:
+                for index, entry in enumerate(view.data):
+                    if entry['key'] in edited:
+                        view.data[index] = edited[entry['key']]
+            if appended:
+                view.data.extend(appended)
+
+        overflow = len(self._buffer) - self.MESSAGE_BUFFER
+        if overflow > 0:
+            for _ in range(overflow):
+                self._buffer.popitem(last=False)
+            del view.data[:overflow]
+
+        if appended:
+            # Scroll to bottom after adding messages
+            Clock.schedule_once(self.scroll_to_bottom, 0.1)
     
     def format_timestamp(self, timestamp):
         """Format timestamp for display"""
@@ -182,9 +291,7 @@ class BaseChatScreen(Screen):
     
     def scroll_to_bottom(self, *args):
         """Scroll the chat to the bottom"""
-        scroll_view = self.ids.scroll_view
-        if scroll_view.height < scroll_view.children[0].height:
-            scroll_view.scroll_y = 0
+        self.ids.messages_view.scroll_to_end()
 
     def send_message(self):
         """Send a message to Firebase"""
@@ -211,18 +318,23 @@ class BaseChatScreen(Screen):
             "role": self.USER_ROLE
         }
         
-        try:
-            # Send message to Firebase
-            response = requests.post(url, data=json.dumps(data))
+        def sent(response):
             if response.status_code != 200:
                 self.show_status("Failed to send message. Please try again.", is_error=True)
                 # Re-enable the message in the input field
                 self.ids.message_input.text = message
-        except Exception as e:
+            else:
+                # Show it without waiting for the next poll
+                self.load_messages()
+
+        def failed(e):
             self.show_status(f"Error: {str(e)}", is_error=True)
             # Re-enable the message in the input field
             self.ids.message_input.text = message
 
+        # Send message to Firebase
+        run_async(session.post, url, data=json.dumps(data), timeout=10, on_result=sent, on_error=failed)
+
     def _get_current_user_name(self, default=""):
         app = MDApp.get_running_app()
         if not app:
@@ -1,7 +1,7 @@
 from kivy.uix.screenmanager import Screen
 from kivy.uix.popup import Popup
 from kivy.uix.label import Label
-import requests
+from api_client import api_url, request_async
 
 class DoctorAddPrescriptionScreen(Screen):
     def on_pre_enter(self):
@@ -21,8 +21,6 @@ class DoctorAddPrescriptionScreen(Screen):
 
     def add_prescription(self):
         manager = getattr(self, "manager", None)
-        token = getattr(manager, "access_token", None) if manager else None
-        headers = {"Authorization": f"Bearer {token}"} if token else {}
         appointment_id = getattr(manager, "current_appointment_id", None) if manager else None
         doctor_email = getattr(manager, "doctor_email", None) if manager else None
         patient_id = getattr(manager, "current_patient_id", None) if manager else None
@@ -52,17 +50,23 @@ class DoctorAddPrescriptionScreen(Screen):
             "notes": notes
         }
 
-        try:
-            resp = requests.post("http://127.0.0.1:8000/api/medical/prescriptions/create/", json=data, headers=headers, timeout=8)
-            if resp.status_code in (200, 201):
+        def saved(resp, error):
+            if resp is None:
+                self.show_popup(f"Network error: {error}")
+            elif resp.status_code in (200, 201):
                 self.show_popup("Prescription saved.")
-                if manager:
-                    manager.current = "doctor_view_appointments"
+                if manager.sync is not None:
+                    manager.sync.sync_now("prescriptions")
+                manager.current = "doctor_view_appointments"
             else:
                 try:
                     err = resp.json()
                 except Exception:
                     err = resp.text
                 self.show_popup(f"Failed: {err}")
-        except Exception as e:
-            self.show_popup(f"Network error: {e}")
\ No newline at end of file
+
+        # Sent with the session's token, refreshed first if it has expired
+        request_async(
+            "POST", api_url("/api/medical/prescriptions/create/"), manager, saved,
+            owner=self, json=data, timeout=8,
+        )
@@ -8,9 +8,10 @@ from kivymd.uix.boxlayout import MDBoxLayout
 from kivymd.uix.label import MDLabel
 from kivymd.uix.button import MDRaisedButton
 from kivymd.uix.menu import MDDropdownMenu
-import requests
 import logging
 
+from api_client import api_url, authenticated_request, run_async
+
 logger = logging.getLogger(__name__)
 
 
@@ -59,7 +60,7 @@ class DoctorHomeScreen(Screen):
 
     def on_pre_enter(self):
         # Set welcome message with doctor's name
-        doctor_name = getattr(self.manager, "doctor_name", "Doctor")
+        doctor_name = self.manager.doctor_name or "Doctor"
         if hasattr(self.ids, 'welcome_label'):
             self.ids.welcome_label.text = f"Welcome, Dr. {doctor_name}"
         else:
@@ -138,9 +139,7 @@ class DoctorHomeScreen(Screen):
     def logout(self, *args):
         """Handle logout process."""
         # Clear all tokens and user data
-        for attr in ['access_token', 'refresh_token', 'doctor_id', 'doctor_email', 'doctor_name']:
-            if hasattr(self.manager, attr):
-                delattr(self.manager, attr)
+        self.manager.sign_out()
         
         # Clear any stored credentials in the login screen
         if 'doctor_login' in self.manager.screen_names:
@@ -175,32 +174,37 @@ class DoctorHomeScreen(Screen):
             return
 
         token = getattr(self.manager, "access_token", None)
-        headers = {"Authorization": f"Bearer {token}"} if token else {}
         email = getattr(self.manager, "doctor_email", "")
 
         if not email:
             self.show_error("No email found. Please log in again.")
             return
 
-        try:
-            # Clear existing widgets except the first one (title)
-            appointment_container = self.ids.appointment_container
-            appointment_container.clear_widgets()
+        self.ids.appointment_container.clear_widgets()
 
+        def fetch():
             # Try both endpoints for backward compatibility
-            urls = [
-                f"http://127.0.0.1:8000/api/appointments/doctor-list/?email={email}",
-                f"http://127.0.0.1:8000/api/appointments/doctor-appointments/?email={email}",
-            ]
-
             response = None
-            for url in urls:
-                try:
-                    response = requests.get(url, headers=headers, timeout=10)
-                    if response.status_code == 200:
-                        break
-                except:
-                    continue
+            for url in (api_url("/api/appointments/doctor-list/"), api_url("/api/appointments/doctor-appointments/")):
+                response, _ = authenticated_request(
+                    "GET", url, self.manager, require_auth=bool(token), params={"email": email, "scope": "upcoming"}
+                )
+                if response is not None and response.status_code in (200, 204):
+                    break
+            return response
+
+        run_async(
+            fetch,
+            on_result=self._show_appointments,
+            on_error=lambda exc: self.show_error(f"Error loading appointments: {str(exc)}"),
+            owner=self,
+        )
+
+    def _show_appointments(self, response):
+        """Render the doctor-list response (runs on the main thread)."""
+        try:
+            appointment_container = self.ids.appointment_container
+            appointment_container.clear_widgets()
 
             if not response:
                 self.show_error("Failed to reach appointments service. Please try again later.")
@@ -456,7 +460,7 @@ class DoctorHomeScreen(Screen):
         self.manager.current = "video_call"
 
     def logout(self):
-        self.manager.access_token = None
+        self.manager.sign_out()
         self.manager.current = "doctor_login"
 
     def go_home(self):
@@ -13,6 +13,7 @@ from kivymd.uix.card import MDCard
 from kivymd.uix.floatlayout import MDFloatLayout
 from kivy.properties import StringProperty, BooleanProperty
 from kivy.core.window import Window
+from api_client import api_url, request_async, run_async, session
 
 class DoctorLoginScreen(Screen):
     # Properties for dynamic content
@@ -107,17 +108,21 @@ class DoctorLoginScreen(Screen):
         # Start loading animation
         self.start_loading()
 
-        try:
-            url = "http://127.0.0.1:8000/api/users/doctor/login/"
-            data = {
-                "email": email,
-                "license": license_num,
-                "password": password
-            }
-            
-            # Add timeout for security
-            response = requests.post(url, json=data, timeout=10)
+        data = {
+            "email": email,
+            "license": license_num,
+            "password": password
+        }
+        # The request runs on a worker so the UI keeps drawing meanwhile
+        run_async(
+            session.post, api_url("/api/users/doctor/login/"), json=data, timeout=10,
+            on_result=lambda response: self.on_login_response(response, license_num),
+            on_error=self.on_login_error,
+            owner=self,
+        )
 
+    def on_login_response(self, response, license_num):
+        try:
             if response.status_code == 200:
                 result = response.json()
                 access_token = result.get("access")
@@ -128,17 +133,19 @@ class DoctorLoginScreen(Screen):
                     self.show_popup("Authentication Failed", "No access token received")
                     return
 
-                # Store tokens in manager
-                self.manager.access_token = access_token
-                self.manager.refresh_token = refresh_token
-                
                 # Get doctor data from response
-                doctor_data = result.get('doctor', {})
+                doctor_data = result.get('profile') or result.get('doctor', {})
                 doctor_email = doctor_data.get('email', '')
                 doctor_name = doctor_data.get('name', 'Dr. User')
-                
-                # Store doctor email in manager
-                self.manager.doctor_email = doctor_email
+
+                # Start the session; tokens stay in memory only
+                self.manager.sign_in(
+                    access_token, refresh_token,
+                    user_id=(result.get('user') or {}).get('id'),
+                    role='doctor',
+                    doctor_email=doctor_email,
+                    doctor_name=doctor_name,
+                )
                 
                 # Store user data in app instance for global access
                 app = MDApp.get_running_app()
@@ -147,6 +154,8 @@ class DoctorLoginScreen(Screen):
                     'name': doctor_name,
                     'role': 'doctor',
                     'license_number': license_num,
+                    'profile': doctor_data,
+                    'active_appointment': result.get('active_appointment'),
                     'access_token': access_token
                 }
 
@@ -183,22 +192,21 @@ class DoctorLoginScreen(Screen):
                     self.show_popup("Not Found", "Doctor account not found. Please check your credentials.")
                 else:
                     self.show_popup("Server Error", f"Please try again later. (Code: {response.status_code})")
+        except Exception as e:
+            self.on_login_error(e)
 
-        except requests.exceptions.Timeout:
-            self.stop_loading()
+    def on_login_error(self, error):
+        self.stop_loading()
+        if isinstance(error, requests.exceptions.Timeout):
             self.show_popup("Timeout", "Connection timeout. Please try again.")
-        except requests.exceptions.ConnectionError:
-            self.stop_loading()
+        elif isinstance(error, requests.exceptions.ConnectionError):
             self.show_popup("Network Error", "Cannot connect to server. Please check your internet connection.")
-        except requests.exceptions.RequestException as e:
-            self.stop_loading()
-            self.show_popup("Network Issue", f"Network error: {str(e)}")
-        except KeyError as e:
-            self.stop_loading()
-            self.show_popup("Data Error", f"Invalid response format: Missing {str(e)}")
-        except Exception as e:
-            self.stop_loading()
-            self.show_popup("Unexpected Error", f"An unexpected error occurred: {str(e)}")
+        elif isinstance(error, requests.exceptions.RequestException):
+            self.show_popup("Network Issue", f"Network error: {str(error)}")
+        elif isinstance(error, KeyError):
+            self.show_popup("Data Error", f"Invalid response format: Missing {str(error)}")
+        else:
+            self.show_popup("Unexpected Error", f"An unexpected error occurred: {str(error)}")
 
     def on_back_press(self):
         """Handle back button press"""
@@ -206,25 +214,18 @@ class DoctorLoginScreen(Screen):
 
     def attempt_auto_login(self):
         """Optional: Attempt auto-login if tokens exist"""
-        if hasattr(self.manager, 'access_token') and self.manager.access_token:
-            try:
-                headers = {
-                    "Authorization": f"Bearer {self.manager.access_token}",
-                    "Content-Type": "application/json"
-                }
-                response = requests.get(
-                    "http://127.0.0.1:8000/api/users/me/", 
-                    headers=headers,
-                    timeout=5
-                )
-                if response.status_code == 200:
-                    user_data = response.json()
-                    if user_data.get('role') == 'doctor':
-                        self.manager.current = 'doctor_home'
-            except:
+        if not getattr(self.manager, 'access_token', None):
+            return
+
+        def checked(response, error):
+            if response is not None and response.status_code == 200:
+                if response.json().get('role') == 'doctor':
+                    self.manager.current = 'doctor_home'
+            elif response is not None and response.status_code in (401, 403):
                 # Clear invalid tokens
-                self.manager.access_token = None
-                self.manager.refresh_token = None
+                self.manager.sign_out()
+
+        request_async("GET", api_url("/api/users/me/"), self.manager, checked, owner=self, timeout=5)
 
     def on_enter(self):
         """Called when screen is entered"""
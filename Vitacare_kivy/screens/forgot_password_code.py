@@ -2,7 +2,7 @@ from kivy.uix.screenmanager import Screen
 from kivymd.uix.boxlayout import MDBoxLayout
 from kivymd.toast import toast
 from kivy.app import App
-import requests
+from api_client import api_url, run_async, session
 
 class ForgotPasswordCodeScreen(Screen):
     """Screen for verifying the password reset code."""
@@ -35,16 +35,16 @@ class ForgotPasswordCodeScreen(Screen):
             toast("Please enter a valid 5-digit code.")
             return
 
-        try:
-            response = requests.post(
-                "http://127.0.0.1:8000/api/users/verify-code/",
-                json={'email': email, 'code': code},
-                timeout=5
-            )
+        def verified(response):
             if response.status_code == 200:
                 toast("Code verified! Please reset your password.")
                 self.manager.current = 'reset_password'
             else:
                 toast("Invalid or expired code.")
-        except requests.exceptions.RequestException as e:
-            toast(f"Error verifying code: {e}")
\ No newline at end of file
+
+        run_async(
+            session.post, api_url("/api/users/verify-code/"), json={'email': email, 'code': code}, timeout=5,
+            on_result=verified,
+            on_error=lambda e: toast(f"Error verifying code: {e}"),
+            owner=self,
+        )
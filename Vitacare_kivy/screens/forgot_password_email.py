@@ -2,7 +2,7 @@ from kivy.uix.screenmanager import Screen
 from kivymd.uix.boxlayout import MDBoxLayout
 from kivymd.toast import toast
 from kivy.app import App
-import requests
+from api_client import api_url, run_async, session
 
 class ForgotPasswordEmailScreen(Screen):
     """Screen for requesting a password reset code via email."""
@@ -27,12 +27,7 @@ class ForgotPasswordEmailScreen(Screen):
             toast("Email is required.")
             return
 
-        try:
-            response = requests.post(
-                "http://127.0.0.1:8000/api/users/forgot-password/",
-                json={"email": email},
-                timeout=5
-            )
+        def sent(response):
             if response.status_code == 200:
                 data = response.json()
                 if data.get("redirect") == "signup":
@@ -44,5 +39,10 @@ class ForgotPasswordEmailScreen(Screen):
                     self.manager.current = "forgot_password_code"
             else:
                 toast(f"Failed to send reset code: {response.text}")
-        except requests.exceptions.RequestException as e:
-            toast(f"Network error: {e}")
\ No newline at end of file
+
+        run_async(
+            session.post, api_url("/api/users/forgot-password/"), json={"email": email}, timeout=5,
+            on_result=sent,
+            on_error=lambda e: toast(f"Network error: {e}"),
+            owner=self,
+        )
@@ -1,14 +1,20 @@
 from kivy.uix.screenmanager import Screen
 from kivy.uix.label import Label
 from kivy.clock import Clock
-import requests
 import json
 from kivy.properties import StringProperty, ObjectProperty
 from kivymd.app import MDApp
 from kivymd.uix.dialog import MDDialog
 from kivymd.uix.button import MDFlatButton
 
+from api_client import api_url, request_async
+
+TIMELINE_PAGE_SIZE = 20
+
+
 class PatientHomeScreen(Screen):
+    timeline_entries = []
+    timeline_cursor = None
 
     def on_pre_enter(self, *args):
         """Called when screen is about to be shown"""
@@ -80,9 +86,7 @@ class PatientHomeScreen(Screen):
     def logout(self, *args):
         """Perform the actual logout process"""
         # Clear all tokens and user data
-        for attr in ['access_token', 'refresh_token', 'user_id', 'patient_name', 'patient_email']:
-            if hasattr(self.manager, attr):
-                delattr(self.manager, attr)
+        self.manager.sign_out()
         
         # Clear any stored credentials in the login screen
         if 'patient_login' in self.manager.screen_names:
@@ -208,24 +212,33 @@ class PatientHomeScreen(Screen):
                         delattr(app, attr)
 
             if manager:
-                for attr in ('current_appointment_id', 'current_appointment_doctor'):
-                    if hasattr(manager, attr):
-                        delattr(manager, attr)
+                manager.current_appointment_id = None
+                manager.current_appointment_doctor = None
 
     def load_appointment(self):
-        """Fetch latest appointment for logged-in patient"""
+        """Fetch the patient's timeline and latest appointment in one request"""
         token = getattr(self.manager, 'access_token', None)
         if not token:
             self.ids.appointment_label.text = "You are not logged in."
             return
 
-        headers = {"Authorization": f"Bearer {token}"}
-        url = "http://127.0.0.1:8000/api/appointments/my-latest/"
+        request_async(
+            "GET", api_url("/api/medical/timeline/"), self.manager, self._on_timeline,
+            owner=self, params={"limit": TIMELINE_PAGE_SIZE}
+        )
 
+    def _on_timeline(self, response, error):
+        """Show the first timeline page (runs on the main thread)."""
         try:
-            response = requests.get(url, headers=headers)
+            if response is None:
+                self._set_current_appointment(None)
+                self.ids.appointment_label.text = f"Failed to load appointments: {error}"
+                return
             if response.status_code == 200:
-                data = response.json() or {}
+                payload = response.json() or {}
+                self.timeline_entries = payload.get("entries", [])
+                self.timeline_cursor = payload.get("next_cursor")
+                data = payload.get("latest_appointment") or {}
                 appointment_id = data.get("appointment_id") or data.get("id")
                 doctor = data.get("doctor_name") or data.get("doctor")
                 date = data.get("date")
@@ -8,7 +8,7 @@ from kivymd.app import MDApp
 from kivymd.uix.dialog import MDDialog
 from kivymd.uix.button import MDFlatButton
 
-from api_client import authenticated_request
+from api_client import api_url, request_async, run_async, session
 
 class PatientLoginScreen(Screen):
     def clear_fields(self):
@@ -17,6 +17,7 @@ class PatientLoginScreen(Screen):
         
     def on_pre_enter(self):
         self.clear_fields()
+        self.set_busy(False)
     
     def on_back_press(self):
         self.manager.current = 'welcome'
@@ -61,129 +62,128 @@ class PatientLoginScreen(Screen):
         salt = "vitacare_client_salt"
         return hashlib.sha256((password + salt).encode()).hexdigest()
 
-    def login_user(self):
-        # Get reference to the login button
+    def set_busy(self, busy):
+        """Disable the login button while a request is in flight."""
         login_button = self.ids.get('login_button')
-        
-        def reset_login_button():
-            if login_button:
-                login_button.disabled = False
-                login_button.text = 'Login'
-        
-        def complete_login(dt):
-            try:
-                # Get input values
-                email = self.ids.email_input.text.strip().lower()
-                password = self.ids.password_input.text.strip()
-
-                # Validate inputs
-                is_valid, message = self.validate_inputs(email, password)
-                if not is_valid:
-                    self.show_popup(message)
-                    reset_login_button()
-                    return
-                
-                # Make API request to login
-                url = "http://127.0.0.1:8000/api/users/login/"
-                data = {
-                    "email": email,
-                    "password": password  # Note: In production, ensure this is using HTTPS
-                }
-
-                response = requests.post(url, json=data, timeout=10)
-                response.raise_for_status()
-
-                result = response.json()
-                access_token = result.get('access')
-                refresh_token = result.get('refresh')
-                user_info = result.get('user') or {}
-
-                if not access_token:
-                    raise ValueError("No access token received")
-
-                # Store tokens in manager
-                self.manager.access_token = access_token
-                self.manager.refresh_token = refresh_token
-
-                # Store user info
-                app = MDApp.get_running_app()
-                app.current_user = {
-                    'email': email,
-                    'first_name': user_info.get('first_name', ''),
-                    'role': user_info.get('role', 'patient'),
-                    'access_token': access_token
-                }
-                
-                # Clear sensitive data from form
-                self.clear_fields()
-                
-                # Navigate to patient home
-                self.manager.current = 'patient_home'
-                
-                # Update welcome message after a short delay
-                def update_label(dt):
-                    try:
-                        patient_home_screen = self.manager.get_screen('patient_home')
-                        if hasattr(patient_home_screen, 'ids') and 'welcome_label' in patient_home_screen.ids:
-                            patient_home_screen.ids.welcome_label.text = f"Welcome, {app.current_user.get('first_name', '')}!"
-                    except Exception as e:
-                        print(f"Error updating welcome label: {e}")
-                    finally:
-                        reset_login_button()
-
-                Clock.schedule_once(update_label, 0.5)
-
-            except requests.exceptions.HTTPError as e:
-                if e.response.status_code == 401:
-                    self.show_popup("Invalid email or password.")
-                elif e.response.status_code == 400:
-                    try:
-                        error_data = e.response.json()
-                        self.show_popup(f"Login error: {error_data.get('detail', 'Invalid request')}")
-                    except Exception:
-                        self.show_popup("Invalid request format.")
-                else:
-                    self.show_popup(f"Server error: {e.response.status_code}")
-            except requests.exceptions.Timeout:
-                self.show_popup("Connection timeout. Please try again.")
-            except requests.exceptions.ConnectionError:
-                self.show_popup("Network error. Please check your connection.")
-            except requests.exceptions.RequestException as e:
-                self.show_popup(f"Network error: {str(e)}")
-            except Exception as e:
-                self.show_popup(f"An error occurred: {str(e)}")
-            finally:
-                reset_login_button()
-        
+        if login_button:
+            login_button.disabled = busy
+            login_button.text = 'Logging in...' if busy else 'Login'
+
+    def login_user(self):
+        email = self.ids.email_input.text.strip().lower()
+        password = self.ids.password_input.text.strip()
+
+        # Validate inputs
+        is_valid, message = self.validate_inputs(email, password)
+        if not is_valid:
+            self.show_popup(message)
+            return
+
+        # Disable the login button to prevent multiple submissions
+        self.set_busy(True)
+        data = {
+            "email": email,
+            "password": password  # Note: In production, ensure this is using HTTPS
+        }
+        # The request runs on a worker so the UI keeps drawing meanwhile
+        run_async(
+            session.post, api_url("/api/users/login/"), json=data, timeout=10,
+            on_result=lambda response: self.on_login_response(response, email),
+            on_error=self.on_login_error,
+            owner=self,
+        )
+
+    def on_login_response(self, response, email):
         try:
-            # Disable the login button to prevent multiple submissions
-            if login_button:
-                login_button.disabled = True
-                login_button.text = 'Logging in...'
-            
-            # Schedule the login to run in the next frame to prevent UI freeze
-            Clock.schedule_once(complete_login, 0.1)
-            
+            response.raise_for_status()
+
+            result = response.json()
+            access_token = result.get('access')
+            refresh_token = result.get('refresh')
+            user_info = result.get('user') or {}
+
+            if not access_token:
+                raise ValueError("No access token received")
+
+            # Start the session; tokens stay in memory only
+            self.manager.sign_in(
+                access_token, refresh_token,
+                user_id=user_info.get('id'),
+                role=result.get('role') or user_info.get('role', 'patient'),
+            )
+
+            # Store user info
+            app = MDApp.get_running_app()
+            app.current_user = {
+                'email': email,
+                'first_name': user_info.get('first_name', ''),
+                'role': result.get('role') or user_info.get('role', 'patient'),
+                'profile': result.get('profile') or user_info,
+                'access_token': access_token
+            }
+            # The login response includes the active appointment, so the
+            # home screen can show it before its own refresh completes.
+            active = result.get('active_appointment') or {}
+            if active.get('appointment_id'):
+                app.current_user['current_appointment_id'] = active['appointment_id']
+                app.current_user['current_appointment_doctor'] = active.get('doctor_name', '')
+
+            # Clear sensitive data from form
+            self.clear_fields()
+
+            # Navigate to patient home
+            self.manager.current = 'patient_home'
+
+            # Update welcome message after a short delay
+            def update_label(dt):
+                try:
+                    patient_home_screen = self.manager.get_screen('patient_home')
+                    if hasattr(patient_home_screen, 'ids') and 'welcome_label' in patient_home_screen.ids:
+                        patient_home_screen.ids.welcome_label.text = f"Welcome, {app.current_user.get('first_name', '')}!"
+                except Exception as e:
+                    print(f"Error updating welcome label: {e}")
+
+            Clock.schedule_once(update_label, 0.5)
         except Exception as e:
-            self.show_popup(f"Error during login: {str(e)}")
-            reset_login_button()
+            self.on_login_error(e)
+        finally:
+            self.set_busy(False)
+
+    def on_login_error(self, error):
+        self.set_busy(False)
+        if isinstance(error, requests.exceptions.HTTPError):
+            if error.response.status_code == 401:
+                self.show_popup("Invalid email or password.")
+            elif error.response.status_code == 400:
+                try:
+                    error_data = error.response.json()
+                    self.show_popup(f"Login error: {error_data.get('detail', 'Invalid request')}")
+                except Exception:
+                    self.show_popup("Invalid request format.")
+            else:
+                self.show_popup(f"Server error: {error.response.status_code}")
+        elif isinstance(error, requests.exceptions.Timeout):
+            self.show_popup("Connection timeout. Please try again.")
+        elif isinstance(error, requests.exceptions.ConnectionError):
+            self.show_popup("Network error. Please check your connection.")
+        elif isinstance(error, requests.exceptions.RequestException):
+            self.show_popup(f"Network error: {str(error)}")
+        else:
+            self.show_popup(f"An error occurred: {str(error)}")
 
     def attempt_auto_login(self):
         """Optional: Attempt auto-login if tokens exist"""
-        if hasattr(self.manager, 'access_token') and self.manager.access_token:
-            try:
-                headers = {"Authorization": f"Bearer {self.manager.access_token}"}
-                response = requests.get(
-                    "http://127.0.0.1:8000/api/users/me/", 
-                    headers=headers,
-                    timeout=5
-                )
-                if response.status_code == 200:
-                    self.manager.current = 'patient_home'
-            except:
+        if not getattr(self.manager, 'access_token', None):
+            return
+
+        def checked(response, error):
+            if response is not None and response.status_code == 200:
+                self.manager.current = 'patient_home'
+            elif response is not None and response.status_code in (401, 403):
                 # Clear invalid tokens
-                self.manager.access_token = None
-                self.manager.refresh_token = None
+                self.manager.sign_out()
+
+        request_async("GET", api_url("/api/users/me/"), self.manager, checked, owner=self, timeout=5)
 
     def on_enter(self):
         """Called when screen is entered"""
@@ -1,15 +1,15 @@
 from kivy.uix.screenmanager import Screen
-from kivy.uix.label import Label
 from kivymd.app import MDApp
 from kivymd.uix.dialog import MDDialog
 from kivymd.uix.button import MDFlatButton
 
-from api_client import authenticated_request
+from local_store import SyncedScreenMixin
+from recycle_lists import record_rows
 
-class PatientPrescriptionsScreen(Screen):
-    def on_pre_enter(self, *args):
-        self.ids.prescription_list.text = "Loading..."
-        self.load_prescriptions()
+class PatientPrescriptionsScreen(SyncedScreenMixin, Screen):
+    """Prescriptions from the local store, refreshed by the sync worker."""
+    resource = "prescriptions"
+    newest_first = True
 
     def show_popup(self, message, title='Info', button_text='OK'):
         """Show a styled dialog with the given message"""
@@ -27,60 +27,43 @@ class PatientPrescriptionsScreen(Screen):
         )
         dialog.open()
 
-    def load_prescriptions(self):
-        response, error = authenticated_request(
-            "GET",
-            "http://127.0.0.1:8000/api/medical/prescriptions/my/",
-            self.manager,
-            timeout=8,
-        )
+    def render_records(self, items):
+        self.ids.prescription_list.data = record_rows(items, self.describe)
+        if items:
+            self.ids.prescription_status.text = ""
+        else:
+            self.ids.prescription_status.text = "No prescriptions yet." if self.synced_once() else "Loading..."
 
-        if response is None:
-            if error == "authentication_required":
-                self.ids.prescription_list.text = "Please log in to view prescriptions."
-            else:
-                self.ids.prescription_list.text = f"Network error: {error}"
-            return
+    @staticmethod
+    def describe(p):
+        """Text lines shown for one prescription."""
+        doctor_display = p.get("doctor_name")
+        doctor_raw = p.get("doctor")
+        if not doctor_display:
+            doctor_display = f"Doctor #{doctor_raw}" if doctor_raw else "Doctor"
 
-        if response.status_code == 200:
-            try:
-                data = response.json()
-                items = data if isinstance(data, list) else data.get("prescriptions") or data
-                if not items:
-                    self.ids.prescription_list.text = "No prescriptions yet."
-                    return
-                lines = []
-                for p in items:
-                    doctor_display = p.get("doctor_name")
-                    doctor_raw = p.get("doctor")
-                    if not doctor_display:
-                        if isinstance(doctor_raw, dict):
-                            doctor_display = doctor_raw.get("full_name") or doctor_raw.get("email")
-                        elif doctor_raw:
-                            doctor_display = f"Doctor #{doctor_raw}"
-                        else:
-                            doctor_display = "Doctor"
+        med = p.get("medication") or "N/A"
+        dosage = p.get("dosage") or "N/A"
+        notes = p.get("notes", "")
+        date = p.get("date_issued", "")
 
-                    med = p.get("medication") or p.get("medicine") or p.get("medication_name", "N/A")
-                    dosage = p.get("dosage", "N/A")
-                    notes = p.get("notes", "")
-                    date = p.get("date_issued") or p.get("date", "")
+        detail_lines = [
+            f"Doctor: {doctor_display}",
+            f"Medicine: {med}",
+            f"Dosage: {dosage}",
+        ]
+        if date:
+            detail_lines.append(f"Date: {date}")
+        if notes:
+            detail_lines.append(f"Notes: {notes}")
 
-                    detail_lines = [
-                        f"Doctor: {doctor_display}",
-                        f"Medicine: {med}",
-                        f"Dosage: {dosage}",
-                    ]
-                    if date:
-                        detail_lines.append(f"Date: {date}")
-                    if notes:
-                        detail_lines.append(f"Notes: {notes}")
+        return detail_lines
 
-                    lines.append("\n".join(detail_lines))
-                self.ids.prescription_list.text = "\n\n".join(lines)
-            except Exception as exc:
-                self.ids.prescription_list.text = f"Failed to parse prescriptions: {exc}"
-        elif response.status_code in (401, 403):
-            self.ids.prescription_list.text = "Session expired. Please log in again."
+    def show_sync_error(self, error, has_records):
+        if has_records:
+            # Keep showing the saved copy; it is refreshed on the next pass.
+            return
+        if error == "authentication_required":
+            self.ids.prescription_status.text = "Please log in to view prescriptions."
         else:
-            self.ids.prescription_list.text = f"Failed to load: {response.status_code}"
\ No newline at end of file
+            self.ids.prescription_status.text = f"Offline and nothing saved yet: {error}"
@@ -1,7 +1,7 @@
 from kivy.uix.screenmanager import Screen
 from kivymd.toast import toast
 from kivy.app import App
-import requests
+from api_client import api_url, run_async, session
 
 class ResetPasswordScreen(Screen):
     def on_back_press(self):
@@ -31,16 +31,17 @@ class ResetPasswordScreen(Screen):
             self.manager.current = "forgot_password_email"
             return
 
-        try:
-            response = requests.post(
-                "http://127.0.0.1:8000/api/users/reset-password/",
-                json={"email": email, "new_password": new_pass, "confirm_password": confirm_pass},
-                timeout=5
-            )
+        def done(response):
             if response.status_code == 200:
                 toast("Password reset successful. Please login.")
                 self.manager.current = "patient_login"
             else:
                 toast(f"Failed to reset password: {response.text}")
-        except requests.exceptions.RequestException as e:
-            toast(f"Network error: {e}")
\ No newline at end of file
+
+        run_async(
+            session.post, api_url("/api/users/reset-password/"),
+            json={"email": email, "new_password": new_pass, "confirm_password": confirm_pass}, timeout=5,
+            on_result=done,
+            on_error=lambda e: toast(f"Network error: {e}"),
+            owner=self,
+        )
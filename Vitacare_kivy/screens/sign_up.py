@@ -5,6 +5,7 @@ import json
 from kivymd.app import MDApp
 from kivymd.uix.dialog import MDDialog
 from kivymd.uix.button import MDFlatButton
+from api_client import API_BASE_URL, api_url, run_async, session
 
 class SignUpScreen(Screen):
     def on_back_press(self):
@@ -65,58 +66,63 @@ class SignUpScreen(Screen):
             self.show_popup("Error", "Password must contain at least one digit")
             return
 
-        try:
-            # Prepare data with exact field names expected by serializer
-            data = {
-                "email": email.lower(),  # Normalize email
-                "password": password,
-                "confirm_password": confirm_password,
-                "first_name": first_name,
-                "last_name": last_name,
-                "role": role
-            }
-            
-            if phone:
-                data["phone"] = phone
-            if address:
-                data["address"] = address
-            
-            # Make API request with timeout and proper headers
-            url = "http://127.0.0.1:8000/api/users/register/"
-            headers = {
-                "Content-Type": "application/json",
-                "Accept": "application/json"
-            }
-            response = requests.post(url, json=data, headers=headers, timeout=10)
-            
-            if response.status_code == 201:
-                self.show_popup("Success", "Account created successfully! Please login.")
-                self.manager.current = "patient_login"
-                self.clear_form()
-            elif response.status_code == 400:
-                # Parse validation errors
-                try:
-                    errors = response.json()
-                    error_messages = []
-                    for field, error in errors.items():
-                        if isinstance(error, list):
-                            error_messages.append(f"{field}: {' '.join(error)}")
-                        else:
-                            error_messages.append(f"{field}: {error}")
-                    self.show_popup("Validation Error", "\n".join(error_messages))
-                except:
-                    self.show_popup("Error", f"Registration failed: {response.text}")
-            else:
-                error_msg = response.text
-                self.show_popup("Error", f"Registration failed ({response.status_code}): {error_msg}")
+        # Prepare data with exact field names expected by serializer
+        data = {
+            "email": email.lower(),  # Normalize email
+            "password": password,
+            "confirm_password": confirm_password,
+            "first_name": first_name,
+            "last_name": last_name,
+            "role": role
+        }
+        
+        if phone:
+            data["phone"] = phone
+        if address:
+            data["address"] = address
+        
+        # Make API request with timeout and proper headers, off the UI thread
+        headers = {
+            "Content-Type": "application/json",
+            "Accept": "application/json"
+        }
+        run_async(
+            session.post, api_url("/api/users/register/"), json=data, headers=headers, timeout=10,
+            on_result=self.on_sign_up_response,
+            on_error=self.on_sign_up_error,
+            owner=self,
+        )
+
+    def on_sign_up_response(self, response):
+        if response.status_code == 201:
+            self.show_popup("Success", "Account created successfully! Please login.")
+            self.manager.current = "patient_login"
+            self.clear_form()
+        elif response.status_code == 400:
+            # Parse validation errors
+            try:
+                errors = response.json()
+                error_messages = []
+                for field, error in errors.items():
+                    if isinstance(error, list):
+                        error_messages.append(f"{field}: {' '.join(error)}")
+                    else:
+                        error_messages.append(f"{field}: {error}")
+                self.show_popup("Validation Error", "\n".join(error_messages))
+            except:
+                self.show_popup("Error", f"Registration failed: {response.text}")
+        else:
+            error_msg = response.text
+            self.show_popup("Error", f"Registration failed ({response.status_code}): {error_msg}")
 
-        except requests.exceptions.ConnectionError:
+    def on_sign_up_error(self, error):
+        if isinstance(error, requests.exceptions.ConnectionError):
             self.show_popup("Connection Error", 
-                          "Cannot connect to server. Please make sure the backend server is running on http://127.0.0.1:8000")
-        except requests.exceptions.Timeout:
+                          f"Cannot connect to server. Please make sure the backend server is running on {API_BASE_URL}")
+        elif isinstance(error, requests.exceptions.Timeout):
             self.show_popup("Timeout Error", "Server connection timed out. Please try again.")
-        except Exception as e:
-            self.show_popup("Error", f"An error occurred: {str(e)}")
+        else:
+            self.show_popup("Error", f"An error occurred: {str(error)}")
 
     def clear_form(self):
         # Clear all form fields
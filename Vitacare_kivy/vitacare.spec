@@ -18,6 +18,7 @@ a = Analysis(
         'requests',
         'stripe',
         'PIL',
+        'recycle_lists',
         'screens.welcome',
         'screens.patient_login',
         'screens.doctor_login',
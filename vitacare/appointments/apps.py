@@ -3,4 +3,11 @@ from django.apps import AppConfig
 
 class AppointmentsConfig(AppConfig):  # Fixed typo
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'appointments'
\ No newline at end of file
+    name = 'appointments'
+
+    def ready(self):
+        from common.cache import invalidate_owners
+        from common.sync import track_deletions
+        from .models import Appointment
+        track_deletions(Appointment)
+        invalidate_owners(Appointment)
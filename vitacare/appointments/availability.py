@@ -0,0 +1,303 @@
+"""Per-doctor slot availability.
+
+A doctor's working day is split into fixed-length slots between
+``APPOINTMENT_DAY_START`` and ``APPOINTMENT_DAY_END``.  Each day is summarised
+as an integer bitmap where bit ``i`` is set while slot ``i`` is still free, so
+a whole search window is built from one indexed read on
+``(doctor, date, time)`` instead of a query per day.
+"""
+import logging
+import random
+import time as clock
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, transaction
+from django.utils import timezone
+
+from common.cache import bump, doctor_scope, patient_scope
+from users.models import Doctor
+from .models import Appointment
+
+logger = logging.getLogger(__name__)
+
+
+class SlotUnavailable(Exception):
+    """The requested time is taken or the search window is full."""
+
+
+class BookingConflict(Exception):
+    """Every reservation attempt lost a race with a concurrent booking."""
+
+
+def _setting_time(name, default):
+    value = getattr(settings, name, None)
+    if value is None:
+        return default
+    if isinstance(value, time):
+        return value
+    return datetime.strptime(value, "%H:%M").time()
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute + value.second / 60
+
+
+class SlotGrid:
+    """Fixed-length slots over the working day, addressed by bit index."""
+
+    def __init__(self, start=None, end=None, slot_minutes=None):
+        self.start = start or _setting_time('APPOINTMENT_DAY_START', time(6, 0))
+        self.end = end or _setting_time('APPOINTMENT_DAY_END', time(20, 0))
+        self.slot_minutes = slot_minutes or getattr(settings, 'APPOINTMENT_SLOT_MINUTES', 90)
+
+        start_minutes = _minutes(self.start)
+        end_minutes = _minutes(self.end)
+        times = []
+        offset = 0
+        while start_minutes + offset < end_minutes:
+            total = start_minutes + offset
+            times.append(time(int(total // 60), int(total % 60)))
+            offset += self.slot_minutes
+        self.times = tuple(times)
+        self.full_mask = (1 << len(self.times)) - 1
+
+    def within_hours(self, value):
+        return self.start <= value <= self.end
+
+    def _position(self, value):
+        """Fractional slot index of ``value`` relative to the grid start."""
+        return (_minutes(value) - _minutes(self.start)) / self.slot_minutes
+
+    def blocked_mask(self, booked_times):
+        """Bits for every slot that overlaps one of ``booked_times``.
+
+        A booking at an off-grid time occupies a full slot length, so it can
+        block the two grid slots on either side of it.
+        """
+        mask = 0
+        last = len(self.times) - 1
+        for booked in booked_times:
+            position = self._position(booked)
+            lower = int(position // 1)
+            for index in (lower, lower + 1):
+                if 0 <= index <= last and abs(index - position) < 1:
+                    mask |= 1 << index
+        return mask
+
+    def free_mask(self, booked_times):
+        return self.full_mask & ~self.blocked_mask(booked_times)
+
+    def conflicts(self, value, booked_times):
+        """True if a booking at ``value`` would overlap an existing one."""
+        position = self._position(value)
+        return any(abs(self._position(booked) - position) < 1 for booked in booked_times)
+
+    def slots_in(self, mask, not_before=None):
+        """Slot start times whose bits are set in ``mask``."""
+        return [
+            slot for index, slot in enumerate(self.times)
+            if mask >> index & 1 and (not_before is None or slot >= not_before)
+        ]
+
+    def first_free(self, mask, not_before=None):
+        if not_before is not None:
+            for index, slot in enumerate(self.times):
+                if slot < not_before:
+                    mask &= ~(1 << index)
+        if not mask:
+            return None
+        return self.times[(mask & -mask).bit_length() - 1]
+
+
+class DoctorAvailability:
+    """Free-slot bitmaps for one doctor over ``days`` consecutive days."""
+
+    def __init__(self, doctor, start_date, days=None, grid=None):
+        self.doctor = doctor
+        self.grid = grid or SlotGrid()
+        self.start_date = start_date
+        self.days = days or getattr(settings, 'APPOINTMENT_SEARCH_DAYS', 14)
+        self.end_date = start_date + timedelta(days=self.days)
+
+        self._booked = defaultdict(list)
+        rows = (
+            Appointment.objects
+            .filter(doctor=doctor, date__gte=self.start_date, date__lt=self.end_date)
+            .exclude(status=Appointment.CANCELLED)
+            .order_by('date', 'time')
+            .values_list('date', 'time')
+        )
+        for day, booked in rows:
+            self._booked[day].append(booked)
+        self._bitmaps = {
+            day: self.grid.free_mask(times) for day, times in self._booked.items()
+        }
+
+    def __contains__(self, day):
+        return self.start_date <= day < self.end_date
+
+    def dates(self):
+        return [self.start_date + timedelta(days=i) for i in range(self.days)]
+
+    def bitmap(self, day):
+        return self._bitmaps.get(day, self.grid.full_mask)
+
+    def free_slots(self, day, not_before=None):
+        return self.grid.slots_in(self.bitmap(day), not_before)
+
+    def is_free(self, day, value):
+        return not self.grid.conflicts(value, self._booked.get(day, ()))
+
+    def mark_booked(self, day, value):
+        """Record a booking made after the window was loaded."""
+        self._booked[day].append(value)
+        self._bitmaps[day] = self.grid.free_mask(self._booked[day])
+
+    def next_free_slot(self, not_before=None):
+        """First free ``(date, time)`` in the window, or ``None`` if full.
+
+        ``not_before`` only applies to the first day of the window so that
+        slots already in the past today are skipped.
+        """
+        for offset, day in enumerate(self.dates()):
+            slot = self.grid.first_free(self.bitmap(day), not_before if offset == 0 else None)
+            if slot is not None:
+                return day, slot
+        return None
+
+
+SLOT_TAKEN = "This time slot is already booked for the doctor."
+PAST_SLOT = "Appointments cannot be booked in the past."
+
+
+def _is_lock_error(exc):
+    return isinstance(exc, OperationalError) and 'locked' in str(exc)
+
+
+def _with_doctor_lock(doctor_id, work, attempts=None, retry_on_conflict=True):
+    """Run ``work(doctor)`` in a transaction holding the doctor row lock.
+
+    Each attempt runs in a transaction that loads and locks the doctor row, so
+    bookings for one doctor are serialised on databases that support
+    ``SELECT ... FOR UPDATE``.  The ``(doctor, date, time)`` unique
+    constraint catches any race that gets past the lock; the losing attempt
+    is retried from scratch so it sees the winner's booking.
+
+    Raises ``Doctor.DoesNotExist`` for an unknown doctor.
+    """
+    attempts = attempts or getattr(settings, 'APPOINTMENT_BOOKING_ATTEMPTS', 5)
+    for attempt in range(attempts):
+        try:
+            with transaction.atomic():
+                doctor = Doctor.objects.select_for_update().get(pk=doctor_id)
+                return work(doctor)
+        except IntegrityError:
+            if not retry_on_conflict:
+                raise SlotUnavailable(SLOT_TAKEN)
+            logger.info("Slot race lost for doctor %s (attempt %d)", doctor_id, attempt + 1)
+        except OperationalError as exc:
+            if not _is_lock_error(exc):
+                raise
+            logger.info("Database locked while booking for doctor %s (attempt %d)", doctor_id, attempt + 1)
+        clock.sleep(random.uniform(0, 0.02) * (attempt + 1))
+    raise BookingConflict("The schedule is busy, please try again.")
+
+
+def reserve_slot(doctor_id, patient, start_date, at=None, reason="", attempts=None):
+    """Book doctor ``doctor_id`` for ``patient`` at ``at`` on ``start_date``
+    or, when ``at`` is omitted, at the next free slot from ``start_date`` on.
+
+    A request for an explicit time that loses a race fails with
+    ``SlotUnavailable``; an open request retries and takes the next free slot.
+    """
+    def book(doctor):
+        availability = DoctorAvailability(doctor, start_date)
+        if at is not None:
+            if not availability.is_free(start_date, at):
+                raise SlotUnavailable(SLOT_TAKEN)
+            day, slot = start_date, at
+        else:
+            now = timezone.localtime()
+            not_before = now.time() if start_date == now.date() else None
+            found = availability.next_free_slot(not_before=not_before)
+            if found is None:
+                raise SlotUnavailable(f"No free slots in the next {availability.days} days")
+            day, slot = found
+        return Appointment.objects.create(
+            doctor=doctor,
+            patient=patient,
+            doctor_name=doctor.full_name,
+            date=day,
+            time=slot,
+            reason=reason,
+        )
+
+    return _with_doctor_lock(doctor_id, book, attempts, retry_on_conflict=at is None)
+
+
+def reserve_series(doctor_id, patient, requested, reason="", all_or_nothing=False, attempts=None):
+    """Book a series of ``(date, time)`` requests for one doctor and patient.
+
+    The whole series is checked against one availability window spanning
+    all requested dates, then the free items are inserted with a single
+    ``bulk_create``.  A ``time`` of ``None`` takes the first free slot of that
+    day that has not already passed; items in the past are unavailable.
+    Returns one result dict per request, in order; with ``all_or_nothing``
+    nothing is booked unless every item is free.
+    """
+    def book(doctor):
+        days = [day for day, _ in requested]
+        start = min(days)
+        availability = DoctorAvailability(doctor, start, days=(max(days) - start).days + 1)
+        grid = availability.grid
+        now = timezone.localtime()
+
+        results, pending = [], []
+        for index, (day, at) in enumerate(requested):
+            result = {"index": index, "date": day.isoformat()}
+            if day < now.date() or (day == now.date() and at is not None and at < now.time()):
+                error = PAST_SLOT
+            elif at is None:
+                # Skip today's slots that have already passed, as reserve_slot does
+                at = grid.first_free(availability.bitmap(day), now.time() if day == now.date() else None)
+                error = None if at is not None else "No free slots on this day"
+            elif not grid.within_hours(at):
+                error = f"Appointments must be between {grid.start:%H:%M} and {grid.end:%H:%M}"
+            elif not availability.is_free(day, at):
+                error = SLOT_TAKEN
+            else:
+                error = None
+
+            if at is not None:
+                result["time"] = at.strftime("%H:%M:%S")
+            if error:
+                result.update(status="unavailable", error=error)
+            else:
+                availability.mark_booked(day, at)
+                result["status"] = "booked"
+                pending.append((result, Appointment(
+                    doctor=doctor,
+                    patient=patient,
+                    doctor_name=doctor.full_name,
+                    date=day,
+                    time=at,
+                    reason=reason,
+                )))
+            results.append(result)
+
+        if all_or_nothing and len(pending) != len(results):
+            for result, _ in pending:
+                result["status"] = "not_booked"
+            return results
+
+        created = Appointment.objects.bulk_create([appointment for _, appointment in pending])
+        for (result, _), appointment in zip(pending, created):
+            result["appointment_id"] = appointment.id
+        if created:
+            # bulk_create sends no post_save, so invalidate_owners never runs
+            bump(patient_scope(patient.pk), doctor_scope(doctor.id))
+        return results
+
+    return _with_doctor_lock(doctor_id, book, attempts)
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:15
+
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def separate_double_bookings(apps, schema_editor):
+    """Shift duplicate (doctor, date, time) rows by a second each so the
+    unique constraint can be added without deleting any appointment."""
+    Appointment = apps.get_model('appointments', 'Appointment')
+    seen = set()
+    rows = Appointment.objects.order_by('doctor_id', 'date', 'time', 'id').values_list('id', 'doctor_id', 'date', 'time')
+    for pk, doctor_id, day, at in rows:
+        key = (doctor_id, day, at)
+        if key not in seen:
+            seen.add(key)
+            continue
+        while key in seen:
+            at = (datetime.combine(day, at) + timedelta(seconds=1)).time()
+            key = (doctor_id, day, at)
+        seen.add(key)
+        Appointment.objects.filter(pk=pk).update(time=at)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0004_appointment_slot_indexes'),
+        ('users', '0009_alter_customuser_role'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(separate_double_bookings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(fields=('doctor', 'date', 'time'), name='appt_unique_doctor_slot'),
+        ),
+        migrations.RemoveIndex(
+            model_name='appointment',
+            name='appt_doctor_date_time_idx',
+        ),
+    ]
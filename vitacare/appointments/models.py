@@ -2,12 +2,53 @@ from django.db import models
 from users.models import Doctor, CustomUser
 
 class Appointment(models.Model):
+    BOOKED = 'booked'
+    COMPLETED = 'completed'
+    CANCELLED = 'cancelled'
+    NO_SHOW = 'no_show'
+    STATUS_CHOICES = (
+        (BOOKED, 'Booked'),
+        (COMPLETED, 'Completed'),
+        (CANCELLED, 'Cancelled'),
+        (NO_SHOW, 'No-show'),
+    )
+
     doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE)
     patient = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     doctor_name = models.CharField(max_length=255)
     date = models.DateField()
     time = models.TimeField()
     reason = models.TextField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=BOOKED)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # Cancelling frees the slot for someone else.
+            models.UniqueConstraint(
+                fields=['doctor', 'date', 'time'],
+                condition=~models.Q(status='cancelled'),
+                name='appt_unique_doctor_slot',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['patient', 'date', 'time'], name='appt_patient_date_time_idx'),
+            models.Index(fields=['patient', 'updated_at'], name='appt_pat_upd_idx'),
+            models.Index(fields=['doctor', 'updated_at'], name='appt_doc_upd_idx'),
+            # Only still-booked rows, so schedule lookups stay small as
+            # completed history accumulates.
+            models.Index(
+                fields=['doctor', 'date', 'time'],
+                condition=models.Q(status='booked'),
+                name='appt_doc_active_idx',
+            ),
+            models.Index(
+                fields=['patient', 'date', 'time'],
+                condition=models.Q(status='booked'),
+                name='appt_pat_active_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.patient.email} with {self.doctor_name} on {self.date} at {self.time}"
\ No newline at end of file
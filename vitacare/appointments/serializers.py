@@ -1,7 +1,30 @@
+from django.db.models import F
 from rest_framework import serializers
 from .models import Appointment
 
 class AppointmentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Appointment
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+
+class AppointmentSyncSerializer(AppointmentSerializer):
+    """Full rows plus the patient's email and name, so a doctor's offline
+    copy of the schedule can be listed without further requests.
+
+    Pass a queryset through ``optimize`` so the patient columns come from
+    the same query.
+    """
+    patient_email = serializers.CharField(read_only=True)
+    patient_name = serializers.SerializerMethodField()
+
+    def get_patient_name(self, obj):
+        return f"{obj.patient_first_name} {obj.patient_last_name}".strip()
+
+    @staticmethod
+    def optimize(queryset):
+        return queryset.annotate(
+            patient_email=F('patient__email'),
+            patient_first_name=F('patient__first_name'),
+            patient_last_name=F('patient__last_name'),
+        )
@@ -1,7 +1,497 @@
-from django.test import TestCase
+import csv
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from common.testing import PatientClientMixin
+from users import directory
+from users.models import CustomUser, Doctor
+from .availability import DoctorAvailability, SlotGrid
 from .models import Appointment
 
+
 class AppointmentModelTest(TestCase):
     def test_create_appointment(self):
         # Example test to ensure the Appointment model works
         self.assertTrue(Appointment.objects.count() == 0)
+
+
+class AppointmentTestMixin(PatientClientMixin):
+    def setUp(self):
+        super().setUp()
+        self.doctor_client = APIClient()
+        self.doctor_client.force_authenticate(self.doctor.user)
+
+    def book(self, day, at):
+        return Appointment.objects.create(
+            doctor=self.doctor, patient=self.patient, doctor_name=self.doctor.full_name, date=day, time=at
+        )
+
+
+class SlotGridTest(TestCase):
+    def test_default_grid(self):
+        grid = SlotGrid(time(6, 0), time(20, 0), 90)
+        self.assertEqual(grid.times[0], time(6, 0))
+        self.assertEqual(grid.times[-1], time(19, 30))
+        self.assertEqual(grid.full_mask, (1 << len(grid.times)) - 1)
+
+    def test_off_grid_booking_blocks_neighbouring_slots(self):
+        grid = SlotGrid(time(6, 0), time(20, 0), 90)
+        mask = grid.blocked_mask([time(7, 0)])
+        self.assertEqual(grid.slots_in(mask), [time(6, 0), time(7, 30)])
+        self.assertEqual(grid.first_free(grid.full_mask & ~mask), time(9, 0))
+
+    def test_conflicts(self):
+        grid = SlotGrid(time(6, 0), time(20, 0), 90)
+        self.assertTrue(grid.conflicts(time(8, 0), [time(7, 0)]))
+        self.assertFalse(grid.conflicts(time(8, 30), [time(7, 0)]))
+
+
+class DoctorAvailabilityTest(AppointmentTestMixin, TestCase):
+    def test_window_is_one_query(self):
+        self.book(date(2030, 1, 1), time(6, 0))
+        with self.assertNumQueries(1):
+            availability = DoctorAvailability(self.doctor, date(2030, 1, 1), days=30)
+            availability.next_free_slot()
+
+    def test_rolls_over_full_days(self):
+        grid = SlotGrid()
+        for slot in grid.times:
+            self.book(date(2030, 1, 1), slot)
+        availability = DoctorAvailability(self.doctor, date(2030, 1, 1), days=3)
+        self.assertEqual(availability.next_free_slot(), (date(2030, 1, 2), grid.times[0]))
+
+    def test_fills_gaps(self):
+        self.book(date(2030, 1, 1), time(6, 0))
+        self.book(date(2030, 1, 1), time(10, 30))
+        availability = DoctorAvailability(self.doctor, date(2030, 1, 1), days=1)
+        self.assertEqual(availability.next_free_slot(), (date(2030, 1, 1), time(7, 30)))
+
+
+class BookAppointmentViewTest(AppointmentTestMixin, TestCase):
+    def test_books_next_free_slot(self):
+        self.book(date(2030, 1, 1), time(6, 0))
+        response = self.client.post('/api/appointments/book/', {'doctor': self.doctor.id, 'date': '2030-01-01'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['suggested_time'], '07:30:00')
+
+    def test_rejects_conflicting_custom_time(self):
+        self.book(date(2030, 1, 1), time(9, 0))
+        response = self.client.post(
+            '/api/appointments/book/', {'doctor': self.doctor.id, 'date': '2030-01-01', 'time': '10:00:00'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_rejects_time_outside_hours(self):
+        response = self.client.post(
+            '/api/appointments/book/', {'doctor': self.doctor.id, 'date': '2030-01-01', 'time': '21:00:00'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_availability_endpoint(self):
+        self.book(date(2030, 1, 1), time(6, 0))
+        response = self.client.get(
+            '/api/appointments/availability/', {'doctor': self.doctor.id, 'date': '2030-01-01', 'days': 2}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['days']), 2)
+        self.assertNotIn('06:00:00', response.data['days'][0]['free'])
+        self.assertEqual(response.data['next_free'], {'date': '2030-01-01', 'time': '07:30:00'})
+
+
+class BatchBookAppointmentViewTest(AppointmentTestMixin, TestCase):
+    url = '/api/appointments/book/batch/'
+
+    def test_weekly_recurrence(self):
+        self.book(date(2030, 1, 15), time(9, 0))
+        # savepoint, doctor lock, availability window, bulk insert, release
+        with self.assertNumQueries(5):
+            response = self.client.post(self.url, {
+                'doctor': self.doctor.id,
+                'recurrence': {'start': '2030-01-01', 'time': '09:00:00', 'count': 12},
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['booked'], 11)
+        self.assertEqual(response.data['results'][2]['status'], 'unavailable')
+        self.assertEqual(Appointment.objects.filter(doctor=self.doctor).count(), 12)
+
+    def test_slot_list_detects_conflicts_within_batch(self):
+        response = self.client.post(self.url, {
+            'doctor': self.doctor.id,
+            'slots': [
+                {'date': '2030-01-01', 'time': '09:00:00'},
+                {'date': '2030-01-01', 'time': '09:30:00'},
+                {'date': '2030-01-02'},
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        statuses = [r['status'] for r in response.data['results']]
+        self.assertEqual(statuses, ['booked', 'unavailable', 'booked'])
+        self.assertEqual(response.data['results'][2]['time'], '06:00:00')
+
+    def test_all_or_nothing(self):
+        self.book(date(2030, 1, 8), time(9, 0))
+        response = self.client.post(self.url, {
+            'doctor': self.doctor.id,
+            'all_or_nothing': True,
+            'recurrence': {'start': '2030-01-01', 'time': '09:00:00', 'count': 4},
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_all_or_nothing_parses_strictly(self):
+        self.book(date(2030, 1, 8), time(9, 0))
+        series = {'start': '2030-01-01', 'time': '09:00:00', 'count': 2}
+        for flag in ('false', '0', False):
+            response = self.client.post(self.url, {
+                'doctor': self.doctor.id, 'all_or_nothing': flag, 'recurrence': series,
+            }, format='json')
+            self.assertEqual(response.data['booked'], 1)
+            Appointment.objects.filter(date=date(2030, 1, 1)).delete()
+        response = self.client.post(self.url, {
+            'doctor': self.doctor.id, 'all_or_nothing': 'true', 'recurrence': series,
+        }, format='json')
+        self.assertEqual(response.data['booked'], 0)
+
+    def test_open_slot_today_skips_passed_times(self):
+        today = date(2030, 1, 1)
+        noon = timezone.make_aware(datetime(2030, 1, 1, 12, 0))
+        with mock.patch('appointments.availability.timezone.localtime', return_value=noon):
+            response = self.client.post(self.url, {
+                'doctor': self.doctor.id,
+                'slots': [{'date': today.isoformat()}, {'date': '2030-01-02'}],
+            }, format='json')
+        times = [r['time'] for r in response.data['results']]
+        self.assertEqual(times, ['12:00:00', '06:00:00'])
+
+    def test_series_starting_yesterday_skips_the_past(self):
+        today = date(2030, 1, 2)
+        noon = timezone.make_aware(datetime(2030, 1, 2, 12, 0))
+        with mock.patch('appointments.availability.timezone.localtime', return_value=noon):
+            response = self.client.post(self.url, {
+                'doctor': self.doctor.id,
+                'recurrence': {'start': (today - timedelta(days=1)).isoformat(), 'count': 3, 'interval_days': 1},
+            }, format='json')
+            statuses = [r['status'] for r in response.data['results']]
+            self.assertEqual(statuses, ['unavailable', 'booked', 'booked'])
+            response = self.client.post(self.url, {
+                'doctor': self.doctor.id,
+                'slots': [{'date': today.isoformat(), 'time': '09:00:00'}],
+            }, format='json')
+            self.assertEqual(response.data['results'][0]['status'], 'unavailable')
+        self.assertFalse(Appointment.objects.filter(date__lt=today).exists())
+
+    def test_batch_booking_invalidates_cached_lists(self):
+        doctor_list = {'email': self.doctor.email}
+        self.assertEqual(self.client.get('/api/appointments/doctor-list/', doctor_list).status_code, 204)
+        self.assertEqual(self.client.get('/api/appointments/my-latest/').status_code, 204)
+        response = self.client.post(self.url, {
+            'doctor': self.doctor.id,
+            'recurrence': {'start': '2030-01-01', 'time': '09:00:00', 'count': 2},
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        response = self.client.get('/api/appointments/doctor-list/', doctor_list)
+        self.assertEqual(len(response.data['appointments']), 2)
+        response = self.client.get('/api/appointments/my-latest/')
+        self.assertEqual(response.data['date'], '2030-01-08')
+
+    def test_rejects_oversized_batch(self):
+        response = self.client.post(self.url, {
+            'doctor': self.doctor.id,
+            'recurrence': {'start': '2030-01-01', 'count': 53},
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class DoctorAppointmentsListViewTest(AppointmentTestMixin, TestCase):
+    url = '/api/appointments/doctor-list/'
+
+    def setUp(self):
+        super().setUp()
+        for day in range(1, 6):
+            for slot in (time(6, 0), time(9, 0)):
+                self.book(date(2030, 1, day), slot)
+
+    def test_legacy_call_without_cursor(self):
+        response = self.client.get(self.url, {'email': self.doctor.email})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['appointments']), 10)
+        self.assertIsNone(response.data['next_cursor'])
+        self.assertEqual(response.data['appointments'][0]['patient_email'], self.patient.email)
+
+    def test_keyset_pages_cover_everything_once(self):
+        seen, cursor = [], None
+        directory.directory()  # the doctor then resolves from the cached directory
+        while True:
+            params = {'email': self.doctor.email, 'limit': 3}
+            if cursor:
+                params['cursor'] = cursor
+            # version stamp, page
+            with self.assertNumQueries(2):
+                response = self.client.get(self.url, params)
+            seen.extend(a['appointment_id'] for a in response.data['appointments'])
+            cursor = response.data['next_cursor']
+            if not cursor:
+                break
+        ids = list(Appointment.objects.order_by('date', 'time').values_list('id', flat=True))
+        self.assertEqual(seen, ids)
+
+    def test_date_range_and_past_scope(self):
+        response = self.client.get(self.url, {'email': self.doctor.email, 'from': '2030-01-02', 'to': '2030-01-03'})
+        self.assertEqual(len(response.data['appointments']), 4)
+        self.book(date(2020, 1, 1), time(6, 0))
+        response = self.client.get(self.url, {'email': self.doctor.email, 'scope': 'past'})
+        self.assertEqual([a['date'] for a in response.data['appointments']], ['2020-01-01'])
+
+    def test_ndjson_export_streams_every_row(self):
+        response = self.client.get(self.url, {'email': self.doctor.email, 'export': 'ndjson'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 10)
+        self.assertEqual(json.loads(lines[0])['date'], '2030-01-01')
+
+    def test_csv_export_honours_filters(self):
+        response = self.client.get(self.url, {'email': self.doctor.email, 'export': 'csv', 'from': '2030-01-05'})
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0][0], 'appointment_id')
+        self.assertEqual(len(rows), 3)
+
+    def test_conditional_get(self):
+        etag = self.client.get(self.url, {'email': self.doctor.email})['ETag']
+        response = self.client.get(self.url, {'email': self.doctor.email}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.book(date(2030, 2, 1), time(6, 0))
+        response = self.client.get(self.url, {'email': self.doctor.email}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_bad_cursor(self):
+        response = self.client.get(self.url, {'email': self.doctor.email, 'cursor': 'nonsense'})
+        self.assertEqual(response.status_code, 400)
+
+
+class AppointmentStatusTest(AppointmentTestMixin, TestCase):
+    def test_complete_is_a_single_update_and_keeps_records(self):
+        from prescriptions.models import Prescription
+
+        appointment = self.book(date(2030, 1, 1), time(6, 0))
+        Prescription.objects.create(
+            doctor=self.doctor, patient=self.patient, appointment=appointment, medication='Aspirin'
+        )
+        # The owners, then the update
+        with self.assertNumQueries(2):
+            response = self.doctor_client.post(f'/api/appointments/complete/{appointment.id}/')
+        self.assertEqual(response.status_code, 200)
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.status, Appointment.COMPLETED)
+        self.assertEqual(Prescription.objects.filter(appointment=appointment).count(), 1)
+
+        response = self.doctor_client.post(f'/api/appointments/complete/{appointment.id}/')
+        self.assertEqual(response.status_code, 409)
+        response = self.doctor_client.post('/api/appointments/complete/999999/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_closed_appointments_leave_working_lists(self):
+        done = self.book(date(2030, 1, 1), time(6, 0))
+        upcoming = self.book(date(2030, 1, 2), time(6, 0))
+        response = self.doctor_client.post(f'/api/appointments/status/{upcoming.id}/', {'status': 'no_show'})
+        self.assertEqual(response.status_code, 200)
+        response = self.doctor_client.post(f'/api/appointments/complete/{done.id}/')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get('/api/appointments/doctor-list/', {'email': self.doctor.email})
+        self.assertEqual(response.status_code, 204)
+        response = self.client.get('/api/appointments/doctor-list/', {'email': self.doctor.email, 'status': 'any'})
+        self.assertEqual([a['status'] for a in response.data['appointments']], ['completed', 'no_show'])
+        response = self.client.get('/api/appointments/my-latest/')
+        self.assertEqual(response.status_code, 204)
+
+    def test_cancelling_frees_the_slot(self):
+        cancelled = self.book(date(2030, 1, 1), time(6, 0))
+        response = self.client.post(f'/api/appointments/status/{cancelled.id}/', {'status': 'cancelled'})
+        self.assertEqual(response.data['status'], 'cancelled')
+        response = self.client.post(
+            '/api/appointments/book/', {'doctor': self.doctor.id, 'date': '2030-01-01', 'time': '06:00:00'}
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_only_the_doctor_may_complete(self):
+        appointment = self.book(date(2030, 1, 1), time(6, 0))
+        response = self.client.post(f'/api/appointments/complete/{appointment.id}/')
+        self.assertEqual(response.status_code, 403)
+        other_doctor = Doctor.objects.create(
+            full_name='Dr Other', email='other-doc@test.com', license_number='LIC003', password='Doctor123!'
+        )
+        self.client.force_authenticate(other_doctor.user)
+        response = self.client.post(f'/api/appointments/complete/{appointment.id}/')
+        self.assertEqual(response.status_code, 403)
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.status, Appointment.BOOKED)
+
+    def test_doctor_owner_needs_a_doctor_account(self):
+        appointment = self.book(date(2030, 1, 1), time(6, 0))
+        CustomUser.objects.filter(pk=self.doctor.user_id).update(role='patient')
+        response = self.doctor_client.post(f'/api/appointments/status/{appointment.id}/', {'status': 'no_show'})
+        self.assertEqual(response.status_code, 403)
+        CustomUser.objects.filter(pk=self.doctor.user_id).update(role='doctor')
+        response = self.doctor_client.post(f'/api/appointments/status/{appointment.id}/', {'status': 'no_show'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_only_owners_may_change_status(self):
+        appointment = self.book(date(2030, 1, 1), time(6, 0))
+        url = f'/api/appointments/status/{appointment.id}/'
+        response = self.client.post(url, {'status': 'no_show'})
+        self.assertEqual(response.status_code, 403)
+
+        stranger = CustomUser.objects.create_user(
+            email='other@test.com', password='Other123!', first_name='Oth', last_name='Er'
+        )
+        self.client.force_authenticate(stranger)
+        response = self.client.post(url, {'status': 'cancelled'})
+        self.assertEqual(response.status_code, 403)
+        other_doctor = Doctor.objects.create(
+            full_name='Dr Other', email='other-doc@test.com', license_number='LIC003', password='Doctor123!'
+        )
+        self.client.force_authenticate(other_doctor.user)
+        response = self.client.post(url, {'status': 'no_show'})
+        self.assertEqual(response.status_code, 403)
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.status, Appointment.BOOKED)
+
+        self.client.force_authenticate(self.doctor.user)
+        response = self.client.post(url, {'status': 'no_show'})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post('/api/appointments/status/999999/', {'status': 'cancelled'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_rejects_unknown_status(self):
+        appointment = self.book(date(2030, 1, 1), time(6, 0))
+        response = self.client.post(f'/api/appointments/status/{appointment.id}/', {'status': 'booked'})
+        self.assertEqual(response.status_code, 400)
+
+
+class AppointmentSyncViewTest(AppointmentTestMixin, TestCase):
+    url = '/api/appointments/sync/'
+
+    def test_full_then_incremental_sync(self):
+        first = self.book(date(2030, 1, 1), time(6, 0))
+        response = self.client.get(self.url)
+        self.assertEqual([a['id'] for a in response.data['changed']], [first.id])
+        self.assertEqual(response.data['deleted'], [])
+        since = response.data['since']
+
+        Appointment.objects.filter(pk=first.pk).update(updated_at=timezone.now() - timedelta(minutes=5))
+        second = self.book(date(2030, 1, 2), time(6, 0))
+        response = self.client.get(self.url, {'since': since})
+        self.assertEqual([a['id'] for a in response.data['changed']], [second.id])
+
+    def test_completion_and_deletion_reach_sync(self):
+        completed = self.book(date(2030, 1, 1), time(6, 0))
+        removed = self.book(date(2030, 1, 2), time(6, 0))
+        since = self.client.get(self.url).data['since']
+        Appointment.objects.filter(pk__in=[completed.pk, removed.pk]).update(
+            updated_at=timezone.now() - timedelta(minutes=5)
+        )
+        self.doctor_client.post(f'/api/appointments/complete/{completed.id}/')
+        removed_id = removed.id
+        removed.delete()
+        response = self.client.get(self.url, {'since': since})
+        self.assertEqual([(a['id'], a['status']) for a in response.data['changed']], [(completed.id, 'completed')])
+        self.assertEqual(response.data['deleted'], [removed_id])
+
+    def test_doctor_syncs_own_schedule(self):
+        appointment = self.book(date(2030, 1, 1), time(6, 0))
+        self.client.force_authenticate(self.doctor.user)
+        with self.assertNumQueries(2):  # doctor id, rows with the patient joined in
+            response = self.client.get(self.url)
+        self.assertEqual([a['id'] for a in response.data['changed']], [appointment.id])
+        row = response.data['changed'][0]
+        self.assertEqual((row['patient_email'], row['patient_name']), ('patient@test.com', 'Pat Test'))
+
+    def test_pages_through_rows_sharing_one_timestamp(self):
+        Appointment.objects.bulk_create(
+            Appointment(doctor=self.doctor, patient=self.patient, doctor_name=self.doctor.full_name,
+                        date=date(2030, 1, 1) + timedelta(days=day), time=time(6, 0))
+            for day in range(600)
+        )
+        Appointment.objects.update(updated_at=timezone.now() - timedelta(minutes=5))  # a backfill
+
+        seen, since, pages = [], None, 0
+        while True:
+            response = self.client.get(self.url, {'since': since} if since else {})
+            seen.extend(a['id'] for a in response.data['changed'])
+            since, pages = response.data['since'], pages + 1
+            if not response.data['has_more']:
+                break
+            self.assertLess(pages, 3)
+        self.assertEqual(pages, 2)
+        self.assertEqual(sorted(seen), sorted(Appointment.objects.values_list('id', flat=True)))
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_accepts_plain_timestamp(self):
+        appointment = self.book(date(2030, 1, 1), time(6, 0))
+        response = self.client.get(self.url, {'since': (timezone.now() - timedelta(minutes=1)).isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([a['id'] for a in response.data['changed']], [appointment.id])
+
+    def test_bad_since(self):
+        response = self.client.get(self.url, {'since': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_out_of_range_since(self):
+        response = self.client.get(self.url, {'since': '2030-13-01T00:00:00'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ConcurrentBookingTest(TransactionTestCase):
+    BOOKINGS = 200
+
+    def setUp(self):
+        cache.clear()
+        self.doctor = Doctor.objects.create(
+            full_name='Dr Busy', email='busy@test.com', license_number='LIC002', password='Doctor123!'
+        )
+        self.patient = CustomUser.objects.create_user(
+            email='rush@test.com', password='Patient123!', first_name='Rush', last_name='Hour'
+        )
+
+    def _book(self, _, **slot):
+        try:
+            client = APIClient()
+            client.force_authenticate(self.patient)
+            data = {'doctor': self.doctor.id, 'date': '2030-01-01', **slot}
+            return client.post('/api/appointments/book/', data).status_code
+        finally:
+            connection.close()
+
+    @override_settings(APPOINTMENT_SEARCH_DAYS=30, APPOINTMENT_BOOKING_ATTEMPTS=50)
+    def test_parallel_bookings_never_double_book(self):
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            statuses = list(pool.map(self._book, range(self.BOOKINGS)))
+
+        # 30 days of free slots is far more than BOOKINGS, and open requests
+        # retry past lost races, so every one of them must get a slot.
+        self.assertEqual(statuses, [201] * self.BOOKINGS)
+        self.assertEqual(Appointment.objects.filter(doctor=self.doctor).count(), self.BOOKINGS)
+        duplicates = (
+            Appointment.objects.filter(doctor=self.doctor)
+            .values('date', 'time').annotate(rows=Count('id')).filter(rows__gt=1)
+        )
+        self.assertFalse(duplicates.exists(), list(duplicates))
+
+    @override_settings(APPOINTMENT_BOOKING_ATTEMPTS=50)
+    def test_parallel_requests_for_one_slot_book_it_once(self):
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            statuses = list(pool.map(lambda i: self._book(i, time='09:00:00'), range(32)))
+
+        self.assertEqual(statuses.count(201), 1, statuses)
+        self.assertEqual(statuses.count(400), 31, statuses)  # slot taken
+        self.assertEqual(Appointment.objects.filter(doctor=self.doctor).count(), 1)
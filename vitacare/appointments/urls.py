@@ -1,17 +1,25 @@
 from django.urls import path
 from .views import (
     BookAppointmentView,
+    BatchBookAppointmentView,
+    DoctorAvailabilityView,
     MyLatestAppointmentView,
     DoctorAppointmentsListView,
 
     CompleteAppointmentView,
-    AppointmentDetailView  # Added missing import
+    AppointmentStatusView,
+    AppointmentDetailView,  # Added missing import
+    AppointmentSyncView,
 )
 
 urlpatterns = [
     path('book/', BookAppointmentView.as_view(), name='book_appointment'),
+    path('book/batch/', BatchBookAppointmentView.as_view(), name='batch_book_appointments'),
+    path('availability/', DoctorAvailabilityView.as_view(), name='doctor_availability'),
     path('my-latest/', MyLatestAppointmentView.as_view(), name='my_latest_appointment'),
     path('doctor-list/', DoctorAppointmentsListView.as_view(), name='doctor_appointments_list'),
     path('detail/', AppointmentDetailView.as_view(), name='appointment_detail'),
+    path('sync/', AppointmentSyncView.as_view(), name='appointments_sync'),
     path('complete/<int:appointment_id>/', CompleteAppointmentView.as_view(), name='complete_appointment'),
+    path('status/<int:appointment_id>/', AppointmentStatusView.as_view(), name='appointment_status'),
 ]
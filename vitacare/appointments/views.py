@@ -1,16 +1,83 @@
-from datetime import datetime, timedelta, time
+import csv
+import itertools
+import json
+from datetime import datetime, timedelta
+from django.db.models import Q
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 import logging
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework import status
-from .serializers import AppointmentSerializer
+from common.cache import bump, cached_response, doctor_scope, patient_scope, patient_scopes
+from common.conditional import conditional_list
+from common.sync import SyncView
+from .availability import (
+    BookingConflict, DoctorAvailability, SlotGrid, SlotUnavailable, reserve_series, reserve_slot
+)
+from .pagination import ordering, page_size, paginate
+from .serializers import AppointmentSerializer, AppointmentSyncSerializer
 from .models import Appointment
-from users.models import Doctor, CustomUser
+from users import directory
+from users.models import Doctor, CustomUser, normalize_email
 
 logger = logging.getLogger(__name__)
 
+MAX_AVAILABILITY_DAYS = 60
+MAX_BATCH_BOOKINGS = 52
+EXPORT_CHUNK_SIZE = 2000
+
+
+def _parse_series(data):
+    """Expand a batch request into ``(date, time_or_None)`` pairs.
+
+    Accepts either ``slots`` (a list of ``{"date", "time"}`` objects, time
+    optional) or ``recurrence`` (``start``, optional ``time``,
+    ``interval_days`` defaulting to weekly, and ``count``).
+    Raises ``ValueError`` with a client-facing message.
+    """
+    def parse_time(value):
+        return datetime.strptime(value, "%H:%M:%S").time() if value else None
+
+    slots = data.get("slots")
+    recurrence = data.get("recurrence")
+    if slots and recurrence:
+        raise ValueError("Send either slots or recurrence, not both")
+
+    series = []
+    if slots:
+        if not isinstance(slots, list):
+            raise ValueError("slots must be a list")
+        for index, slot in enumerate(slots):
+            try:
+                series.append((
+                    datetime.strptime(slot.get("date", ""), "%Y-%m-%d").date(),
+                    parse_time(slot.get("time")),
+                ))
+            except (AttributeError, TypeError, ValueError):
+                raise ValueError(f"slots[{index}]: use date YYYY-MM-DD and optional time HH:MM:SS")
+    elif recurrence:
+        try:
+            start = datetime.strptime(recurrence.get("start", ""), "%Y-%m-%d").date()
+            at = parse_time(recurrence.get("time"))
+            interval = int(recurrence.get("interval_days", 7))
+            count = int(recurrence.get("count", 0))
+        except (AttributeError, TypeError, ValueError):
+            raise ValueError("recurrence needs start (YYYY-MM-DD), count and optional time/interval_days")
+        if interval < 1 or count < 1:
+            raise ValueError("interval_days and count must be positive")
+        if count > MAX_BATCH_BOOKINGS:
+            raise ValueError(f"At most {MAX_BATCH_BOOKINGS} appointments per batch")
+        series = [(start + timedelta(days=interval * i), at) for i in range(count)]
+    else:
+        raise ValueError("slots or recurrence required")
+
+    if len(series) > MAX_BATCH_BOOKINGS:
+        raise ValueError(f"At most {MAX_BATCH_BOOKINGS} appointments per batch")
+    return series
+
+
 class BookAppointmentView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -22,11 +89,6 @@ class BookAppointmentView(APIView):
             custom_time = request.data.get("time")  # Optional: HH:MM:SS
             reason = request.data.get("reason", "")
 
-            try:
-                doctor = Doctor.objects.get(id=doctor_id)
-            except Doctor.DoesNotExist:
-                return Response({'error': 'Doctor not found'}, status=status.HTTP_404_NOT_FOUND)
-
             if custom_date:
                 try:
                     date_obj = datetime.strptime(custom_date, "%Y-%m-%d").date()
@@ -35,125 +97,412 @@ class BookAppointmentView(APIView):
             else:
                 date_obj = timezone.now().date()
 
-            latest_appointment = Appointment.objects.filter(doctor=doctor, date=date_obj).order_by('-time').first()
-            suggested_time = time(6, 0)
-            if latest_appointment:
-                suggested_time = (datetime.combine(date_obj, latest_appointment.time) + timedelta(minutes=90)).time()
-
-            if suggested_time >= time(20, 0):
-                date_obj += timedelta(days=1)
-                suggested_time = time(6, 0)
-
+            grid = SlotGrid()
+            final_time = None
             if custom_time:
                 try:
-                    patient_time = datetime.strptime(custom_time, "%H:%M:%S").time()
-                    if patient_time < time(6, 0) or patient_time > time(20, 0):
-                        return Response({"error": "Appointments must be between 06:00 and 20:00"}, status=status.HTTP_400_BAD_REQUEST)
-                    if latest_appointment and patient_time < suggested_time:
-                        return Response({"error": "Time must be at least 1hr30m after last appointment"}, status=status.HTTP_400_BAD_REQUEST)
-                    final_time = patient_time
+                    final_time = datetime.strptime(custom_time, "%H:%M:%S").time()
                 except ValueError:
                     return Response({"error": "Invalid time format (use HH:MM:SS)"}, status=status.HTTP_400_BAD_REQUEST)
-            else:
-                final_time = suggested_time
-
-            if Appointment.objects.filter(doctor=doctor, date=date_obj, time=final_time).exists():
-                return Response({"error": "This time slot is already booked for the doctor."}, status=status.HTTP_400_BAD_REQUEST)
-
-            serializer = AppointmentSerializer(data={
-                "doctor": doctor.id,
-                "patient": patient.id,
-                "doctor_name": doctor.full_name,
-                "date": date_obj,
-                "time": final_time,
-                "reason": reason
-            })
-
-            if serializer.is_valid():
-                serializer.save()
-                return Response({
-                    "message": "Appointment booked successfully",
-                    "suggested_time": final_time.strftime("%H:%M:%S"),
-                    "appointment": serializer.data
-                }, status=status.HTTP_201_CREATED)
-
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+                if not grid.within_hours(final_time):
+                    return Response(
+                        {"error": f"Appointments must be between {grid.start:%H:%M} and {grid.end:%H:%M}"},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+
+            try:
+                appointment = reserve_slot(doctor_id, patient, date_obj, at=final_time, reason=reason)
+            except (Doctor.DoesNotExist, ValueError):
+                return Response({'error': 'Doctor not found'}, status=status.HTTP_404_NOT_FOUND)
+            except SlotUnavailable as exc:
+                return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+            except BookingConflict as exc:
+                return Response({"error": str(exc)}, status=status.HTTP_409_CONFLICT)
+
+            return Response({
+                "message": "Appointment booked successfully",
+                "suggested_time": appointment.time.strftime("%H:%M:%S"),
+                "appointment": AppointmentSerializer(appointment).data
+            }, status=status.HTTP_201_CREATED)
         except Exception as exc:
             logger.exception("Error in BookAppointmentView.post")
             return Response({"error": "Internal server error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class BatchBookAppointmentView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        try:
+            doctor_id = request.data.get("doctor")
+            reason = request.data.get("reason", "")
+            # Form posts send strings, so "false" and "0" must not count as set
+            all_or_nothing = request.data.get("all_or_nothing", False) in (True, "true", "1")
+
+            try:
+                series = _parse_series(request.data)
+            except ValueError as exc:
+                return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+            try:
+                results = reserve_series(
+                    doctor_id, request.user, series, reason=reason, all_or_nothing=all_or_nothing
+                )
+            except (Doctor.DoesNotExist, ValueError):
+                return Response({'error': 'Doctor not found'}, status=status.HTTP_404_NOT_FOUND)
+            except BookingConflict as exc:
+                return Response({"error": str(exc)}, status=status.HTTP_409_CONFLICT)
+
+            booked = sum(1 for r in results if r["status"] == "booked")
+            return Response({
+                "booked": booked,
+                "failed": len(results) - booked,
+                "results": results,
+            }, status=status.HTTP_201_CREATED if booked else status.HTTP_400_BAD_REQUEST)
+        except Exception as exc:
+            logger.exception("Error in BatchBookAppointmentView.post")
+            return Response({"error": "Internal server error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class DoctorAvailabilityView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        doctor_id = request.GET.get("doctor")
+        if not doctor_id:
+            return Response({"error": "doctor required"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            doctor = Doctor.objects.get(id=doctor_id)
+        except (Doctor.DoesNotExist, ValueError):
+            return Response({"error": "Doctor not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        start = request.GET.get("date")
+        try:
+            start_date = datetime.strptime(start, "%Y-%m-%d").date() if start else timezone.now().date()
+            days = min(int(request.GET.get("days", 7)), MAX_AVAILABILITY_DAYS)
+        except ValueError:
+            return Response({"error": "Invalid date or days"}, status=status.HTTP_400_BAD_REQUEST)
+        if days < 1:
+            return Response({"error": "days must be positive"}, status=status.HTTP_400_BAD_REQUEST)
+
+        availability = DoctorAvailability(doctor, start_date, days=days)
+        now = timezone.localtime()
+        not_before = now.time() if start_date == now.date() else None
+        next_slot = availability.next_free_slot(not_before=not_before)
+        return Response({
+            "doctor": doctor.id,
+            "slot_minutes": availability.grid.slot_minutes,
+            "days": [
+                {
+                    "date": day.isoformat(),
+                    "free": [
+                        slot.strftime("%H:%M:%S")
+                        for slot in availability.free_slots(day, not_before if day == start_date else None)
+                    ],
+                }
+                for day in availability.dates()
+            ],
+            "next_free": {
+                "date": next_slot[0].isoformat(),
+                "time": next_slot[1].strftime("%H:%M:%S"),
+            } if next_slot else None,
+        }, status=status.HTTP_200_OK)
+
+
+def latest_appointment(patient):
+    """The patient's most recent booked appointment as a response dict, or
+    ``None``."""
+    latest = (
+        Appointment.objects
+        .filter(patient=patient, status=Appointment.BOOKED)
+        .order_by('-date', '-time')
+        .first()
+    )
+    if latest is None:
+        return None
+    return {
+        "appointment_id": latest.id,
+        "doctor_name": latest.doctor_name,
+        "date": latest.date.isoformat(),
+        "time": latest.time.strftime("%H:%M:%S"),
+        "reason": latest.reason or ""
+    }
+
+
+def next_doctor_appointment(doctor):
+    """The doctor's next booked appointment as a response dict, or ``None``."""
+    now = timezone.localtime()
+    upcoming = (
+        Appointment.objects
+        .filter(doctor=doctor, status=Appointment.BOOKED)
+        .filter(Q(date__gt=now.date()) | Q(date=now.date(), time__gte=now.time()))
+        .select_related('patient')
+        .order_by('date', 'time')
+        .first()
+    )
+    if upcoming is None:
+        return None
+    return {
+        "appointment_id": upcoming.id,
+        "patient_id": upcoming.patient_id,
+        "patient_name": f"{upcoming.patient.first_name} {upcoming.patient.last_name}".strip(),
+        "date": upcoming.date.isoformat(),
+        "time": upcoming.time.strftime("%H:%M:%S"),
+        "reason": upcoming.reason or ""
+    }
+
+
 class MyLatestAppointmentView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional_list(lambda request: Appointment.objects.filter(patient=request.user, status=Appointment.BOOKED))
+    @cached_response('my_latest_appointment', patient_scopes)
     def get(self, request):
         try:
-            latest = Appointment.objects.filter(patient=request.user).order_by('-date', '-time').first()
+            latest = latest_appointment(request.user)
             if latest:
-                return Response({
-                    "appointment_id": latest.id,
-                    "doctor_name": latest.doctor_name,
-                    "date": latest.date.isoformat(),
-                    "time": latest.time.strftime("%H:%M:%S"),
-                    "reason": latest.reason or ""
-                }, status=status.HTTP_200_OK)
+                return Response(latest, status=status.HTTP_200_OK)
             return Response({"message": "No appointments found"}, status=status.HTTP_204_NO_CONTENT)
         except Exception as exc:
             logger.exception("Error in MyLatestAppointmentView.get")
             return Response({"error": "Internal server error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+DOCTOR_LIST_FIELDS = (
+    "id", "date", "time", "reason", "status", "patient_id",
+    "patient__email", "patient__first_name", "patient__last_name",
+)
+
+
+EXPORT_COLUMNS = (
+    "appointment_id", "patient_id", "patient_email", "patient_name", "date", "time", "reason", "status",
+)
+
+
+def _doctor_list_row(row):
+    return {
+        "appointment_id": row["id"],
+        "patient_id": row["patient_id"],
+        "patient_email": row["patient__email"],
+        "patient_name": f'{row["patient__first_name"]} {row["patient__last_name"]}'.strip(),
+        "date": row["date"].isoformat(),
+        "time": row["time"].strftime("%H:%M:%S"),
+        "reason": row["reason"] or "N/A",
+        "status": row["status"],
+    }
+
+
+STATUS_VALUES = [value for value, _ in Appointment.STATUS_CHOICES]
+
+
+def _filter_by_scope(queryset, params):
+    """Apply ``status``, ``scope`` (all/upcoming/past) and ``from``/``to``
+    date filters.
+
+    ``status`` defaults to ``booked`` so finished appointments drop off the
+    working list as they did when completion deleted them; ``any`` lists
+    every status.  Returns the queryset and whether it should be read newest
+    first, which is the natural order for past appointments.
+    """
+    appointment_status = params.get("status", Appointment.BOOKED)
+    if appointment_status != "any":
+        if appointment_status not in STATUS_VALUES:
+            raise ValueError(f"status must be any or one of {', '.join(STATUS_VALUES)}")
+        queryset = queryset.filter(status=appointment_status)
+
+    scope = params.get("scope", "all")
+    if scope not in ("all", "upcoming", "past"):
+        raise ValueError("scope must be one of all, upcoming, past")
+
+    now = timezone.localtime()
+    upcoming = Q(date__gt=now.date()) | Q(date=now.date(), time__gte=now.time())
+    if scope == "upcoming":
+        queryset = queryset.filter(upcoming)
+    elif scope == "past":
+        queryset = queryset.exclude(upcoming)
+
+    try:
+        if params.get("from"):
+            queryset = queryset.filter(date__gte=datetime.strptime(params["from"], "%Y-%m-%d").date())
+        if params.get("to"):
+            queryset = queryset.filter(date__lte=datetime.strptime(params["to"], "%Y-%m-%d").date())
+    except ValueError:
+        raise ValueError("Invalid date format (use YYYY-MM-DD)")
+    return queryset, scope == "past"
+
+
+class _Echo:
+    """File-like object whose ``write`` hands the value straight back, so
+    ``csv.writer`` can format one row at a time for a streaming response."""
+
+    def write(self, value):
+        return value
+
+
+def _export_response(appointments, export, descending, filename):
+    """Stream ``appointments`` as NDJSON or CSV without materialising them.
+
+    Rows come from a server-side ``.iterator()`` in chunks, so memory stays
+    flat regardless of history length.
+    """
+    if export not in ("ndjson", "csv"):
+        raise ValueError("export must be ndjson or csv")
+
+    rows = (
+        appointments
+        .order_by(*ordering(descending))
+        .values(*DOCTOR_LIST_FIELDS)
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+    if export == "ndjson":
+        stream = (json.dumps(_doctor_list_row(row)) + "\n" for row in rows)
+        content_type = "application/x-ndjson"
+    else:
+        writer = csv.writer(_Echo())
+        stream = itertools.chain(
+            [writer.writerow(EXPORT_COLUMNS)],
+            (writer.writerow(_doctor_list_row(row).values()) for row in rows),
+        )
+        content_type = "text/csv"
+
+    response = StreamingHttpResponse(stream, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{export}"'
+    return response
+
+
+def _doctor_list_queryset(request):
+    email = normalize_email(request.GET.get("email"))
+    if not email or request.GET.get("export"):
+        return None
+    try:
+        queryset, _ = _filter_by_scope(Appointment.objects.filter(doctor__email=email), request.GET)
+    except ValueError:
+        return None
+    return queryset
+
+
+def _doctor_list_scopes(request):
+    if request.GET.get("export"):
+        return None
+    doctor_id = directory.doctor_id_for_email(request.GET.get("email"))
+    return None if doctor_id is None else [doctor_scope(doctor_id)]
+
+
 class DoctorAppointmentsListView(APIView):
     permission_classes = [AllowAny]  # could be IsAuthenticated if using tokens
 
+    @conditional_list(_doctor_list_queryset)
+    @cached_response('doctor_appointments', _doctor_list_scopes)
     def get(self, request):
         try:
-            doctor_email = request.GET.get("email")
+            doctor_email = normalize_email(request.GET.get("email"))
             if not doctor_email:
                 return Response({"error": "Doctor email required"}, status=status.HTTP_400_BAD_REQUEST)
 
-            try:
-                doctor = Doctor.objects.get(email=doctor_email)
-            except Doctor.DoesNotExist:
+            doctor_id = directory.doctor_id_for_email(doctor_email)
+            if doctor_id is None:
                 return Response({"error": "Doctor not found"}, status=status.HTTP_404_NOT_FOUND)
 
-            appointments = Appointment.objects.filter(doctor=doctor).order_by('date', 'time')
-            if not appointments.exists():
+            try:
+                appointments, descending = _filter_by_scope(
+                    Appointment.objects.filter(doctor_id=doctor_id), request.GET
+                )
+                export = request.GET.get("export")
+                if export:
+                    return _export_response(appointments, export, descending, f"appointments-{doctor_id}")
+                limit = page_size(request.GET.get("limit"))
+                rows, next_cursor = paginate(
+                    appointments.values(*DOCTOR_LIST_FIELDS),
+                    cursor=request.GET.get("cursor"),
+                    limit=limit,
+                    descending=descending,
+                )
+            except ValueError as exc:
+                return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+            if not rows and not request.GET.get("cursor"):
                 return Response({"message": "No appointments found"}, status=status.HTTP_204_NO_CONTENT)
 
-            data = []
-            for a in appointments:
-                data.append({
-                    "appointment_id": a.id,
-                    "patient_id": a.patient.id,
-                    "patient_email": a.patient.email,
-                    "date": a.date.isoformat(),
-                    "time": a.time.strftime("%H:%M:%S"),
-                    "reason": a.reason or "N/A"
-                })
-            return Response({"appointments": data}, status=status.HTTP_200_OK)
+            data = [_doctor_list_row(row) for row in rows]
+            return Response({"appointments": data, "next_cursor": next_cursor}, status=status.HTTP_200_OK)
         except Exception as exc:
             logger.exception("Error in DoctorAppointmentsListView.get")
             return Response({"error": "Internal server error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class AppointmentSyncView(SyncView):
+    queryset = AppointmentSyncSerializer.optimize(Appointment.objects.all())
+    serializer_class = AppointmentSyncSerializer
+
+
+def _close_appointment(request, appointment_id, new_status):
+    """Move a booked appointment to ``new_status`` with a single UPDATE.
+
+    Only the appointment's doctor, signed in with a doctor account, may
+    close it; its patient may only cancel.
+    ``.update()`` skips ``auto_now``, so ``updated_at`` is set explicitly to
+    keep the row visible to incremental sync.
+    """
+    owners = (
+        Appointment.objects.filter(id=appointment_id)
+        .values_list('patient_id', 'doctor_id', 'doctor__user_id', 'doctor__user__role')
+        .first()
+    )
+    if owners is None:
+        return Response({'error': 'Appointment not found'}, status=status.HTTP_404_NOT_FOUND)
+    patient_id, doctor_id, doctor_user_id, doctor_role = owners
+    is_doctor = doctor_user_id is not None and doctor_user_id == request.user.pk and doctor_role == 'doctor'
+    is_patient = patient_id == request.user.pk and new_status == Appointment.CANCELLED
+    if not (is_doctor or is_patient):
+        return Response({'error': 'Not allowed to change this appointment'}, status=status.HTTP_403_FORBIDDEN)
+
+    updated = (
+        Appointment.objects
+        .filter(id=appointment_id, status=Appointment.BOOKED)
+        .update(status=new_status, updated_at=timezone.now())
+    )
+    if updated:
+        bump(patient_scope(patient_id), doctor_scope(doctor_id))
+        return Response({'message': f'Appointment marked {new_status}', 'status': new_status}, status=status.HTTP_200_OK)
+    current = Appointment.objects.filter(id=appointment_id).values_list('status', flat=True).first()
+    if current is None:
+        return Response({'error': 'Appointment not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response({'error': f'Appointment is already {current}'}, status=status.HTTP_409_CONFLICT)
+
+
 class CompleteAppointmentView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, appointment_id):
         try:
-            try:
-                appt = Appointment.objects.get(id=appointment_id)
-            except Appointment.DoesNotExist:
-                return Response({'error': 'Appointment not found'}, status=status.HTTP_404_NOT_FOUND)
-
-            appt.delete()  # remove from list (or mark completed if you have a flag)
-            return Response({'message': 'Appointment completed and removed'}, status=status.HTTP_200_OK)
+            return _close_appointment(request, appointment_id, Appointment.COMPLETED)
         except Exception as exc:
             logger.exception("Error in CompleteAppointmentView.post")
             return Response({"error": "Internal server error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class AppointmentStatusView(APIView):
+    """Close a booked appointment as completed, cancelled or no-show.
+
+    The appointment's doctor may set any of these; its patient may only
+    cancel.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, appointment_id):
+        new_status = request.data.get('status')
+        if new_status not in (Appointment.COMPLETED, Appointment.CANCELLED, Appointment.NO_SHOW):
+            return Response(
+                {'error': 'status must be completed, cancelled or no_show'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            return _close_appointment(request, appointment_id, new_status)
+        except Exception as exc:
+            logger.exception("Error in AppointmentStatusView.post")
+            return Response({"error": "Internal server error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 class AppointmentDetailView(APIView):
     permission_classes = [AllowAny]
 
@@ -162,16 +511,18 @@ class AppointmentDetailView(APIView):
         if not appt_id:
             return Response({'error': 'id required'}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            appt = Appointment.objects.get(id=appt_id)
+            appt = Appointment.objects.select_related('patient').get(id=appt_id)
             return Response({
                 'id': appt.id,
                 'patient_id': appt.patient.id,
                 'patient_email': appt.patient.email,
-                'doctor_id': appt.doctor.id,
+                'patient_name': f"{appt.patient.first_name} {appt.patient.last_name}".strip(),
+                'doctor_id': appt.doctor_id,
                 'doctor_name': appt.doctor_name,
                 'date': appt.date.isoformat(),
                 'time': appt.time.strftime('%H:%M:%S'),
-                'reason': appt.reason or ''
+                'reason': appt.reason or '',
+                'status': appt.status,
             }, status=status.HTTP_200_OK)
         except Appointment.DoesNotExist:
             return Response({'error': 'Appointment not found'}, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
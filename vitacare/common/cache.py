@@ -0,0 +1,137 @@
+"""Response caching with versioned per-owner keys.
+
+Cached responses are keyed by the request and by the current version of
+every *scope* they depend on, e.g. ``patient:7`` or ``doctor:3``.  Saving
+or deleting a record bumps the versions of the scopes that own it, so
+affected entries are never read again and expire on their own; nothing has
+to enumerate or delete keys.  Versions and entries live in the default
+cache, so a shared backend (``VITACARE_CACHE=file``) shares them between
+workers.
+
+Writes through ``QuerySet.update()`` skip the signals and must call
+``bump()`` themselves.  Data a response borrows from another owner (a
+doctor's name shown in a patient's list) can lag by up to
+``CACHE_RESPONSE_TTL``.
+"""
+import hashlib
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+VERSION_PREFIX = 'cache:version:'
+
+
+def patient_scope(patient_id):
+    return f"patient:{patient_id}"
+
+
+def doctor_scope(doctor_id):
+    return f"doctor:{doctor_id}"
+
+
+class CacheMetrics:
+    """Hit / miss counters per cached endpoint."""
+
+    def __init__(self):
+        self._counts = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, name, outcome):
+        with self._lock:
+            self._counts[(name, outcome)] += 1
+
+    def snapshot(self):
+        with self._lock:
+            counts = dict(self._counts)
+        result = defaultdict(lambda: {'hit': 0, 'miss': 0})
+        for (name, outcome), count in sorted(counts.items()):
+            result[name][outcome] = count
+        return dict(result)
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+
+
+metrics = CacheMetrics()
+
+
+def versions(scopes):
+    """Current version token of each scope, creating missing ones."""
+    keys = [VERSION_PREFIX + scope for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, str(time.time_ns()), timeout=None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def bump(*scopes):
+    """Invalidate everything cached under ``scopes``."""
+    token = str(time.time_ns())
+    cache.set_many({VERSION_PREFIX + scope: token for scope in scopes}, timeout=None)
+
+
+def cached_response(name, scopes_for, timeout=None):
+    """Cache successful responses of a GET handler.
+
+    Works on ``APIView`` methods and ``@api_view`` functions (apply it below
+    ``@api_view``).  ``scopes_for(request)`` returns the scopes the response
+    depends on, or ``None`` to bypass the cache (e.g. for exports).  Entries
+    are per user, so handlers may depend on ``request.user``.
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(*args, **kwargs):
+            request = args[0] if isinstance(args[0], Request) else args[1]
+            scopes = scopes_for(request)
+            if scopes is None:
+                return handler(*args, **kwargs)
+
+            stamp = ':'.join(versions(scopes))
+            user_id = getattr(request.user, 'pk', None)
+            digest = hashlib.sha1(f"{user_id}|{request.get_full_path()}|{stamp}".encode()).hexdigest()
+            key = f"cache:response:{name}:{digest}"
+            entry = cache.get(key)
+            if entry is not None:
+                metrics.record(name, 'hit')
+                return Response(entry[1], status=entry[0])
+
+            metrics.record(name, 'miss')
+            response = handler(*args, **kwargs)
+            if response.status_code in (status.HTTP_200_OK, status.HTTP_204_NO_CONTENT) and hasattr(response, 'data'):
+                ttl = timeout if timeout is not None else getattr(settings, 'CACHE_RESPONSE_TTL', 60)
+                cache.set(key, (response.status_code, response.data), timeout=ttl)
+            return response
+        return wrapper
+    return decorator
+
+
+def patient_scopes(request):
+    """Scopes for endpoints listing the requesting patient's own records."""
+    if not request.user.is_authenticated:
+        return None
+    return [patient_scope(request.user.pk)]
+
+
+def owner_scopes(instance):
+    return [patient_scope(instance.patient_id), doctor_scope(instance.doctor_id)]
+
+
+def invalidate_owners(model, scopes_for=owner_scopes):
+    """Bump the owners' scopes whenever a ``model`` row is saved or deleted."""
+    def changed(sender, instance, **kwargs):
+        bump(*scopes_for(instance))
+
+    label = model._meta.label_lower
+    post_save.connect(changed, sender=model, weak=False, dispatch_uid=f"cache:{label}:saved")
+    post_delete.connect(changed, sender=model, weak=False, dispatch_uid=f"cache:{label}:deleted")
@@ -0,0 +1,64 @@
+"""Conditional GET support for list endpoints.
+
+A list's ETag is derived from a cheap aggregate over the rows it would
+return (their count and newest ``updated_at``) plus the request path, so
+an unchanged list can be answered with ``304 Not Modified`` before any row
+is loaded or serialised.
+"""
+import hashlib
+from functools import wraps
+
+from django.db.models import Count, Max
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def version_stamp(queryset):
+    """Aggregate that changes whenever a row in ``queryset`` is added,
+    removed or edited.  Models without ``updated_at`` only detect adds and
+    removes."""
+    field = 'updated_at' if any(f.name == 'updated_at' for f in queryset.model._meta.concrete_fields) else 'pk'
+    stats = queryset.order_by().aggregate(count=Count('pk'), last=Max(field))
+    return f"{stats['count']}:{stats['last']}"
+
+
+def make_etag(request, stamp):
+    digest = hashlib.sha1(f"{request.get_full_path()}|{stamp}".encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(',')]
+    return '*' in tags or etag in tags
+
+
+def conditional_list(queryset_for):
+    """Decorate an ``APIView`` GET handler with ETag / ``If-None-Match``.
+
+    ``queryset_for(request)`` returns the rows the handler would list, or
+    ``None`` to skip conditional handling (e.g. when a required parameter
+    is missing).  Only ``200`` responses carry the ETag.
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            queryset = queryset_for(request)
+            if queryset is None:
+                return handler(self, request, *args, **kwargs)
+
+            etag = make_etag(request, version_stamp(queryset))
+            if etag_matches(request, etag):
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = handler(self, request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+            response['ETag'] = etag
+            response['Cache-Control'] = 'private, no-cache'
+            response['Vary'] = 'Authorization'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,100 @@
+"""Database settings from the environment.
+
+``VITACARE_DB_ENGINE`` selects ``sqlite`` (the default) or ``postgres``.
+
+SQLite connections run ``SQLITE_PRAGMAS`` as soon as they are opened:
+``synchronous=NORMAL`` is durable under WAL except against power loss, and
+``busy_timeout`` makes a writer wait for the lock instead of failing with
+"database is locked".  WAL itself, which lets readers proceed while a write
+is in progress, is stored in the database file, so it is switched on once by
+the ``common`` migrations (``set_sqlite_journal_mode``) rather than on every
+connect, which would rewrite the file header each time.
+Transactions start ``IMMEDIATE`` so a transaction that reads and then writes
+takes the write lock up front rather than failing when it tries to upgrade.
+``VITACARE_SQLITE_TUNING=0`` opens connections with SQLite's defaults.
+PostgreSQL reads ``VITACARE_DB_NAME``, ``_USER``, ``_PASSWORD``, ``_HOST``
+and ``_PORT`` and keeps connections open for ``VITACARE_DB_CONN_MAX_AGE``
+seconds (60 by default) with health checks, so a dropped connection is
+replaced instead of failing the next request.
+
+``VITACARE_DB_POOL=1`` switches PostgreSQL to Django's built-in connection
+pool (psycopg 3 with ``psycopg-pool``), sized by ``VITACARE_DB_POOL_MIN``
+and ``VITACARE_DB_POOL_MAX``.  Pooled connections are returned after each
+request, so persistent connections are turned off in that mode.
+
+This module is imported from the settings files and must not import Django
+models.
+"""
+import os
+
+
+SQLITE_JOURNAL_MODE = 'WAL'
+SQLITE_PRAGMAS = {
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # milliseconds
+    'mmap_size': 128 * 1024 * 1024,
+    'cache_size': -20000,  # negative means KiB, so about 20 MB
+    'temp_store': 'MEMORY',
+}
+
+
+def _flag(env, name, default=''):
+    return env.get(name, default).lower() in ('1', 'true', 'yes', 'on')
+
+
+def sqlite_init_command(pragmas=None):
+    """The ``init_command`` that applies ``pragmas`` to a new connection."""
+    pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+    return ';'.join(f"PRAGMA {name}={value}" for name, value in pragmas.items())
+
+
+def set_sqlite_journal_mode(connection, mode=SQLITE_JOURNAL_MODE):
+    """Persistently switch the SQLite database behind ``connection`` to
+    ``mode``; a no-op for other engines or with the tuning turned off.  Must
+    run outside a transaction."""
+    if connection.vendor != 'sqlite' or 'init_command' not in connection.settings_dict.get('OPTIONS', {}):
+        return
+    connection.cursor().execute(f"PRAGMA journal_mode={mode}")
+
+
+def database_from_env(sqlite_path, environ=None):
+    """``DATABASES['default']`` for the configured engine, falling back to
+    SQLite at ``sqlite_path``."""
+    env = os.environ if environ is None else environ
+    engine = env.get('VITACARE_DB_ENGINE', 'sqlite').lower()
+
+    if engine in ('sqlite', 'sqlite3'):
+        config = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': env.get('VITACARE_DB_NAME') or sqlite_path,
+        }
+        if _flag(env, 'VITACARE_SQLITE_TUNING', '1'):
+            config['OPTIONS'] = {
+                'init_command': sqlite_init_command(),
+                'transaction_mode': 'IMMEDIATE',
+            }
+        return config
+    if engine not in ('postgres', 'postgresql'):
+        raise ValueError(f"Unsupported VITACARE_DB_ENGINE {engine!r}; use 'sqlite' or 'postgres'")
+
+    config = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': env.get('VITACARE_DB_NAME', 'vitacare'),
+        'USER': env.get('VITACARE_DB_USER', 'postgres'),
+        'PASSWORD': env.get('VITACARE_DB_PASSWORD', ''),
+        'HOST': env.get('VITACARE_DB_HOST', 'localhost'),
+        'PORT': env.get('VITACARE_DB_PORT', '5432'),
+        'CONN_MAX_AGE': int(env.get('VITACARE_DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
+    }
+    if env.get('VITACARE_DB_TEST_NAME'):
+        config['TEST'] = {'NAME': env['VITACARE_DB_TEST_NAME']}
+    if _flag(env, 'VITACARE_DB_POOL'):
+        config['CONN_MAX_AGE'] = 0
+        config['OPTIONS']['pool'] = {
+            'min_size': int(env.get('VITACARE_DB_POOL_MIN', 2)),
+            'max_size': int(env.get('VITACARE_DB_POOL_MAX', 10)),
+            'timeout': int(env.get('VITACARE_DB_POOL_TIMEOUT', 10)),
+        }
+    return config
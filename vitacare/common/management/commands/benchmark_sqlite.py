@@ -0,0 +1,112 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from common.database import SQLITE_JOURNAL_MODE, sqlite_init_command
+
+
+class Command(BaseCommand):
+    """Compare SQLite read/write throughput with and without the tuning
+    profile from ``common.database``.
+
+    Each run uses a fresh database file with an appointments-like table;
+    writer threads insert rows one transaction at a time while reader
+    threads run an indexed range query, the mix the booking endpoints see.
+    """
+
+    help = "Benchmark SQLite throughput with and without the tuned pragmas"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=5.0, help="Duration of each run")
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--rows', type=int, default=20000, help="Rows loaded before each run")
+
+    def handle(self, *args, **options):
+        results = []
+        for label, tuned in (('default', False), ('tuned', True)):
+            self.stdout.write(f"Running {label} profile for {options['seconds']}s...")
+            results.append((label, self.run(tuned, options)))
+
+        self.stdout.write(f"\n{'profile':<10}{'reads/s':>12}{'writes/s':>12}{'lock errors':>14}")
+        for label, (reads, writes, errors) in results:
+            seconds = options['seconds']
+            self.stdout.write(f"{label:<10}{reads / seconds:>12.0f}{writes / seconds:>12.0f}{errors:>14}")
+
+    def connect(self, path, tuned):
+        if not tuned:
+            return sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        conn.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        for statement in sqlite_init_command().split(';'):
+            conn.execute(statement)
+        return conn
+
+    def run(self, tuned, options):
+        fd, path = tempfile.mkstemp(suffix='.sqlite3', prefix='vitacare-bench-')
+        os.close(fd)
+        try:
+            self.load(path, tuned, options['rows'])
+            counts = {'reads': 0, 'writes': 0, 'errors': 0}
+            lock = threading.Lock()
+            deadline = time.monotonic() + options['seconds']
+
+            def worker(write):
+                conn = self.connect(path, tuned)
+                done = errors = 0
+                n = 0
+                while time.monotonic() < deadline:
+                    n += 1
+                    try:
+                        if write:
+                            conn.execute('BEGIN IMMEDIATE' if tuned else 'BEGIN')
+                            conn.execute(
+                                "INSERT INTO appt (doctor_id, patient_id, day, slot, status) VALUES (?, ?, ?, ?, 'booked')",
+                                (n % 50, n % 500, n % 365, n % 24),
+                            )
+                            conn.execute('COMMIT')
+                        else:
+                            conn.execute(
+                                "SELECT id, day, slot FROM appt WHERE doctor_id = ? AND day >= ? ORDER BY day, slot LIMIT 20",
+                                (n % 50, n % 365),
+                            ).fetchall()
+                        done += 1
+                    except sqlite3.OperationalError:
+                        errors += 1
+                        if conn.in_transaction:
+                            conn.execute('ROLLBACK')
+                conn.close()
+                with lock:
+                    counts['writes' if write else 'reads'] += done
+                    counts['errors'] += errors
+
+            threads = [threading.Thread(target=worker, args=(True,)) for _ in range(options['writers'])]
+            threads += [threading.Thread(target=worker, args=(False,)) for _ in range(options['readers'])]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            return counts['reads'], counts['writes'], counts['errors']
+        finally:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+    def load(self, path, tuned, rows):
+        conn = self.connect(path, tuned)
+        conn.execute(
+            "CREATE TABLE appt (id INTEGER PRIMARY KEY, doctor_id INTEGER, patient_id INTEGER, "
+            "day INTEGER, slot INTEGER, status TEXT)"
+        )
+        conn.execute("CREATE INDEX appt_doc_day ON appt (doctor_id, day, slot)")
+        conn.execute('BEGIN')
+        conn.executemany(
+            "INSERT INTO appt (doctor_id, patient_id, day, slot, status) VALUES (?, ?, ?, ?, 'booked')",
+            ((i % 50, i % 500, i % 365, i % 24) for i in range(rows)),
+        )
+        conn.execute('COMMIT')
+        conn.close()
@@ -0,0 +1,124 @@
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """Run the test suite on SQLite and on PostgreSQL.
+
+    PostgreSQL comes from the ``VITACARE_DB_*`` variables when
+    ``VITACARE_DB_HOST`` is set; otherwise a throwaway cluster is created
+    with ``initdb``/``pg_ctl`` (from ``PATH`` or ``--pg-bin``) in a
+    temporary directory and removed afterwards.
+    """
+
+    help = "Run the test suite against SQLite and PostgreSQL"
+
+    def add_arguments(self, parser):
+        parser.add_argument('labels', nargs='*', help="Test labels passed on to manage.py test")
+        parser.add_argument('--pg-bin', help="Directory containing initdb and pg_ctl")
+        parser.add_argument('--pool', action='store_true', help="Also run PostgreSQL in pooled mode")
+        parser.add_argument('--require-postgres', action='store_true',
+                            help="Fail instead of skipping when PostgreSQL is unavailable")
+
+    def handle(self, *args, **options):
+        results = {'sqlite': self.run_suite(options['labels'], {'VITACARE_DB_ENGINE': 'sqlite'})}
+
+        with self.postgres(options['pg_bin']) as env:
+            if env is None:
+                message = "PostgreSQL unavailable: set VITACARE_DB_HOST or install initdb/pg_ctl"
+                if options['require_postgres']:
+                    raise CommandError(message)
+                self.stdout.write(self.style.WARNING(f"• {message}; skipped"))
+            else:
+                results['postgres'] = self.run_suite(options['labels'], env)
+                if options['pool']:
+                    results['postgres (pool)'] = self.run_suite(
+                        options['labels'], dict(env, VITACARE_DB_POOL='1')
+                    )
+
+        self.stdout.write("\nResults:")
+        for engine, ok in results.items():
+            style = self.style.SUCCESS if ok else self.style.ERROR
+            self.stdout.write(style(f" {engine:<16} {'passed' if ok else 'FAILED'}"))
+        if not all(results.values()):
+            raise CommandError("Test suite failed on at least one engine")
+
+    def run_suite(self, labels, env):
+        engine = env['VITACARE_DB_ENGINE'] + (' (pool)' if env.get('VITACARE_DB_POOL') else '')
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n=== {engine} ==="))
+        command = [sys.executable, str(Path(settings.BASE_DIR) / 'manage.py'), 'test', '--noinput', *labels]
+        return subprocess.run(command, env=dict(os.environ, **env)).returncode == 0
+
+    def postgres(self, pg_bin):
+        if os.environ.get('VITACARE_DB_HOST'):
+            return _Existing(dict(os.environ, VITACARE_DB_ENGINE='postgres'))
+        initdb = shutil.which('initdb', path=pg_bin)
+        pg_ctl = shutil.which('pg_ctl', path=pg_bin)
+        if not (initdb and pg_ctl):
+            return _Existing(None)
+        return _ThrowawayCluster(initdb, pg_ctl, self.stdout)
+
+
+class _Existing:
+    def __init__(self, env):
+        self.env = env
+
+    def __enter__(self):
+        return self.env
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _ThrowawayCluster:
+    """A private PostgreSQL cluster listening on a free local port."""
+
+    def __init__(self, initdb, pg_ctl, stdout):
+        self.initdb = initdb
+        self.pg_ctl = pg_ctl
+        self.stdout = stdout
+
+    def __enter__(self):
+        self.root = tempfile.mkdtemp(prefix='vitacare-pg-')
+        data = os.path.join(self.root, 'data')
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+
+        try:
+            subprocess.run([self.initdb, '-D', data, '-U', 'postgres', '-A', 'trust'],
+                           check=True, stdout=subprocess.DEVNULL)
+            subprocess.run([
+                self.pg_ctl, '-D', data, '-l', os.path.join(self.root, 'server.log'), '-w',
+                '-o', f"-p {port} -k {self.root} -c listen_addresses=127.0.0.1 -c fsync=off",
+                'start',
+            ], check=True, stdout=subprocess.DEVNULL)
+        except subprocess.CalledProcessError as exc:
+            shutil.rmtree(self.root, ignore_errors=True)
+            raise CommandError(f"Could not start a throwaway PostgreSQL: {exc}")
+        self.data = data
+        self.stdout.write(f"• Throwaway PostgreSQL on port {port} ({self.root})")
+        return {
+            'VITACARE_DB_ENGINE': 'postgres',
+            'VITACARE_DB_HOST': '127.0.0.1',
+            'VITACARE_DB_PORT': str(port),
+            'VITACARE_DB_USER': 'postgres',
+            'VITACARE_DB_PASSWORD': '',
+            'VITACARE_DB_NAME': 'postgres',
+        }
+
+    def __exit__(self, *exc):
+        subprocess.run([self.pg_ctl, '-D', self.data, '-m', 'fast', '-w', 'stop'], stdout=subprocess.DEVNULL)
+        # Give the postmaster a moment to release the socket directory.
+        time.sleep(0.5)
+        shutil.rmtree(self.root, ignore_errors=True)
+        return False
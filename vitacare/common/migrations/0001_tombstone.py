@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource', models.CharField(max_length=64)),
+                ('object_id', models.BigIntegerField()),
+                ('patient_id', models.BigIntegerField(blank=True, null=True)),
+                ('doctor_id', models.BigIntegerField(blank=True, null=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['resource', 'patient_id', 'deleted_at'], name='tombstone_patient_idx'), models.Index(fields=['resource', 'doctor_id', 'deleted_at'], name='tombstone_doctor_idx')],
+            },
+        ),
+    ]
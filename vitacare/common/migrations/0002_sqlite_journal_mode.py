@@ -0,0 +1,20 @@
+from django.db import migrations
+
+from common.database import set_sqlite_journal_mode
+
+
+def enable_wal(apps, schema_editor):
+    set_sqlite_journal_mode(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+    # journal_mode cannot change inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('common', '0001_tombstone'),
+    ]
+
+    operations = [
+        migrations.RunPython(enable_wal, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+from django.db import models
+
+
+class Tombstone(models.Model):
+    """Marker left behind when a synced record is deleted, so clients that
+    sync with ``?since=`` learn about deletions as well as changes."""
+
+    resource = models.CharField(max_length=64)
+    object_id = models.BigIntegerField()
+    patient_id = models.BigIntegerField(null=True, blank=True)
+    doctor_id = models.BigIntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['resource', 'patient_id', 'deleted_at'], name='tombstone_patient_idx'),
+            models.Index(fields=['resource', 'doctor_id', 'deleted_at'], name='tombstone_doctor_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.resource} #{self.object_id} deleted {self.deleted_at}"
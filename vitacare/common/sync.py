@@ -0,0 +1,123 @@
+"""Incremental ``?since=`` sync for owner-scoped records.
+
+Clients keep the ``since`` value from their last response and send it back
+to receive only rows whose ``updated_at`` moved, plus tombstones for rows
+deleted in the meantime, so a sync costs O(changes) rather than O(history).
+
+``since`` is an opaque cursor over ``(updated_at, id)``: many rows can share
+one ``updated_at`` (a backfill stamps them all at once), so a timestamp alone
+cannot resume inside such a run.  A plain ISO 8601 timestamp is accepted too.
+"""
+import base64
+from datetime import datetime, timedelta
+
+from django.db.models import Q
+from django.db.models.signals import post_delete
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from users.models import Doctor
+from .models import Tombstone
+
+SYNC_PAGE_SIZE = 500
+# Rows committed by transactions that started just before a sync can carry
+# an updated_at slightly older than the sync time; the next window reaches
+# back this far so they are not skipped.  Clients upsert, so repeats are
+# harmless.
+SYNC_OVERLAP = timedelta(seconds=2)
+
+
+def track_deletions(model):
+    """Record a ``Tombstone`` whenever an instance of ``model`` is deleted,
+    including deletes cascaded from a parent row."""
+    resource = model._meta.label_lower
+
+    def record(sender, instance, **kwargs):
+        Tombstone.objects.create(
+            resource=resource,
+            object_id=instance.pk,
+            patient_id=instance.patient_id,
+            doctor_id=instance.doctor_id,
+        )
+
+    post_delete.connect(record, sender=model, weak=False, dispatch_uid=f"tombstone:{resource}")
+
+
+class InvalidSince(ValueError):
+    pass
+
+
+def encode_since(updated_at, row_id=0):
+    raw = f"{updated_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_since(value):
+    """Return ``(updated_at, id)`` for a ``since`` cursor or ISO timestamp."""
+    try:
+        # Well formed but impossible dates (month 13) raise ValueError
+        stamp, row_id = parse_datetime(value), 0
+        if stamp is None:
+            padded = value + "=" * (-len(value) % 4)
+            raw_stamp, raw_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+            stamp, row_id = datetime.fromisoformat(raw_stamp), int(raw_id)
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidSince("since must be a sync cursor or an ISO 8601 timestamp")
+    if timezone.is_naive(stamp):
+        stamp = timezone.make_aware(stamp)
+    return stamp, row_id
+
+
+def owner_filter(user):
+    """Doctors sync the records they own, everyone else their patient records."""
+    if getattr(user, 'role', None) == 'doctor':
+        doctor_id = Doctor.objects.filter(user_id=user.pk).values_list('id', flat=True).first()
+        if doctor_id is not None:
+            return {'doctor_id': doctor_id}
+    return {'patient_id': user.id}
+
+
+class SyncView(APIView):
+    """Base view returning changed rows and deletions since a timestamp.
+
+    Subclasses set ``queryset`` and ``serializer_class``; the model must
+    have its deletions tracked with ``track_deletions``.
+    """
+    permission_classes = [IsAuthenticated]
+    queryset = None
+    serializer_class = None
+
+    def get(self, request):
+        since = None
+        if request.GET.get('since'):
+            try:
+                since, after_id = decode_since(request.GET['since'])
+            except InvalidSince as exc:
+                return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        now = timezone.now()
+        owner = owner_filter(request.user)
+        changed = self.queryset.filter(**owner)
+        deleted = Tombstone.objects.filter(resource=self.queryset.model._meta.label_lower, **owner)
+        if since is not None:
+            changed = changed.filter(Q(updated_at__gt=since) | Q(updated_at=since, id__gt=after_id))
+            deleted = deleted.filter(deleted_at__gte=since)
+
+        rows = list(changed.order_by('updated_at', 'id')[:SYNC_PAGE_SIZE + 1])
+        has_more = len(rows) > SYNC_PAGE_SIZE
+        if has_more:
+            rows = rows[:SYNC_PAGE_SIZE]
+            next_since = encode_since(rows[-1].updated_at, rows[-1].id)
+        else:
+            next_since = encode_since(now - SYNC_OVERLAP)
+
+        return Response({
+            'changed': self.serializer_class(rows, many=True).data,
+            'deleted': [] if since is None else list(deleted.values_list('object_id', flat=True).distinct()),
+            'since': next_since,
+            'has_more': has_more,
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,24 @@
+"""Shared fixtures for the API tests."""
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from users.models import CustomUser, Doctor
+
+
+class PatientClientMixin:
+    """A fresh cache, one doctor, and a patient signed in on ``self.client``.
+
+    Mix in ahead of ``TestCase``; subclasses that need more extend ``setUp``.
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.doctor = Doctor.objects.create(
+            full_name='Dr Test', email='doc@test.com', license_number='LIC001', password='Doctor123!'
+        )
+        self.patient = CustomUser.objects.create_user(
+            email='patient@test.com', password='Patient123!', first_name='Pat', last_name='Test'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.patient)
@@ -0,0 +1,116 @@
+import os
+import sqlite3
+import tempfile
+from types import SimpleNamespace
+from unittest import skipUnless
+
+from django.db import connection
+
+from django.test import SimpleTestCase, TestCase
+
+from appointments.models import Appointment
+from consultations.models import Consultation
+from users.models import CustomUser
+
+from . import cache as response_cache
+
+from .database import SQLITE_PRAGMAS, database_from_env, set_sqlite_journal_mode, sqlite_init_command
+from .testing import PatientClientMixin
+
+
+class DatabaseFromEnvTest(SimpleTestCase):
+    def test_sqlite_is_the_default(self):
+        config = database_from_env('/tmp/db.sqlite3', environ={'VITACARE_SQLITE_TUNING': '0'})
+        self.assertEqual(config, {'ENGINE': 'django.db.backends.sqlite3', 'NAME': '/tmp/db.sqlite3'})
+
+    def test_sqlite_tuning_is_applied_on_connect(self):
+        config = database_from_env('/tmp/db.sqlite3', environ={})
+        self.assertIn('PRAGMA busy_timeout=5000', config['OPTIONS']['init_command'])
+        self.assertNotIn('journal_mode', config['OPTIONS']['init_command'])
+        self.assertEqual(config['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+
+    def test_journal_mode_is_set_once(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'db.sqlite3')
+            conn = sqlite3.connect(path, isolation_level=None)
+            for statement in sqlite_init_command().split(';'):
+                conn.execute(statement)
+            self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone()[0], 'delete')
+            tuned = SimpleNamespace(
+                vendor='sqlite', settings_dict=database_from_env(path, environ={}), cursor=conn.cursor
+            )
+            set_sqlite_journal_mode(tuned)
+            conn.close()
+            conn = sqlite3.connect(path)
+            self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+            conn.close()
+
+    def test_postgres_keeps_connections_with_health_checks(self):
+        config = database_from_env('unused', environ={
+            'VITACARE_DB_ENGINE': 'postgres', 'VITACARE_DB_NAME': 'care', 'VITACARE_DB_HOST': 'db',
+        })
+        self.assertEqual(config['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual((config['NAME'], config['HOST'], config['PORT']), ('care', 'db', '5432'))
+        self.assertEqual(config['CONN_MAX_AGE'], 60)
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+        self.assertNotIn('pool', config['OPTIONS'])
+
+    def test_pool_mode_disables_persistent_connections(self):
+        config = database_from_env('unused', environ={
+            'VITACARE_DB_ENGINE': 'postgres', 'VITACARE_DB_POOL': 'true', 'VITACARE_DB_POOL_MAX': '20',
+        })
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertEqual(config['OPTIONS']['pool']['max_size'], 20)
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            database_from_env('unused', environ={'VITACARE_DB_ENGINE': 'oracle'})
+
+
+@skipUnless(connection.vendor == 'sqlite', "SQLite only")
+class SQLitePragmaTest(TestCase):
+    def test_connection_uses_tuned_pragmas(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], SQLITE_PRAGMAS['busy_timeout'])
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA temp_store')
+            self.assertEqual(cursor.fetchone()[0], 2)  # MEMORY
+
+
+class CachedResponseTest(PatientClientMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        response_cache.metrics.clear()
+
+    def test_hits_until_the_owner_changes(self):
+        Consultation.objects.create(doctor=self.doctor, patient=self.patient, summary='First')
+        self.client.get('/api/prescriptions/consultations/my/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/prescriptions/consultations/my/')
+        self.assertEqual([c['summary'] for c in response.data], ['First'])
+
+        Consultation.objects.create(doctor=self.doctor, patient=self.patient, summary='Second')
+        response = self.client.get('/api/prescriptions/consultations/my/')
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual(response_cache.metrics.snapshot()['my_consultations'], {'hit': 1, 'miss': 2})
+
+    def test_entries_are_per_user(self):
+        other = CustomUser.objects.create_user(
+            email='other@test.com', password='Patient123!', first_name='O', last_name='T'
+        )
+        Consultation.objects.create(doctor=self.doctor, patient=self.patient, summary='Mine')
+        self.client.get('/api/prescriptions/consultations/my/')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get('/api/prescriptions/consultations/my/').data, [])
+
+    def test_status_update_invalidates_doctor_list(self):
+        appointment = Appointment.objects.create(
+            doctor=self.doctor, patient=self.patient, doctor_name='Dr Test', date='2030-01-01', time='09:00'
+        )
+        params = {'email': self.doctor.email}
+        self.assertEqual(len(self.client.get('/api/appointments/doctor-list/', params).data['appointments']), 1)
+        self.client.post(f'/api/appointments/status/{appointment.id}/', {'status': 'cancelled'})
+        response = self.client.get('/api/appointments/doctor-list/', params)
+        self.assertEqual(response.status_code, 204)
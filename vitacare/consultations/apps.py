@@ -3,3 +3,10 @@ from django.apps import AppConfig
 class ConsultationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'consultations'
+
+    def ready(self):
+        from common.cache import invalidate_owners
+        from common.sync import track_deletions
+        from .models import Consultation
+        track_deletions(Consultation)
+        invalidate_owners(Consultation)
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def merge_medical_consultations(apps, schema_editor):
+    """Copy ``medical.Consultation`` rows into this table, skipping rows that
+    were already written to both, and keep their original dates."""
+    Legacy = apps.get_model('medical', 'Consultation')
+    Consultation = apps.get_model('consultations', 'Consultation')
+    for name in ('date', 'created_at', 'updated_at'):
+        field = Consultation._meta.get_field(name)
+        field.auto_now = field.auto_now_add = False
+
+    seen = set(Consultation.objects.values_list('doctor_id', 'patient_id', 'appointment_id', 'summary', 'date'))
+    copies = []
+    for row in Legacy.objects.order_by('id').iterator():
+        key = (row.doctor_id, row.patient_id, row.appointment_id, row.summary, row.date)
+        if key in seen:
+            continue
+        seen.add(key)
+        copies.append(Consultation(
+            doctor_id=row.doctor_id,
+            patient_id=row.patient_id,
+            appointment_id=row.appointment_id,
+            summary=row.summary,
+            follow_up=row.follow_up,
+            date=row.date,
+            created_at=row.created_at,
+            updated_at=row.updated_at,
+        ))
+    Consultation.objects.bulk_create(copies, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0007_appointment_status'),
+        ('consultations', '0003_audit_timestamps'),
+        ('medical', '0003_audit_timestamps'),
+        ('users', '0009_alter_customuser_role'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='consultation',
+            name='notes',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AlterField(
+            model_name='consultation',
+            name='appointment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='consultations_appointments', to='appointments.appointment'),
+        ),
+        migrations.AddIndex(
+            model_name='consultation',
+            index=models.Index(fields=['patient', 'date'], name='consult_patient_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consultation',
+            index=models.Index(fields=['doctor', 'date'], name='consult_doctor_date_idx'),
+        ),
+        migrations.RunPython(merge_medical_consultations, migrations.RunPython.noop),
+    ]
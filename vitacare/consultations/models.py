@@ -5,10 +5,21 @@ from appointments.models import Appointment
 class Consultation(models.Model):
     doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='consultations_consultations')
     patient = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='consultations_patients')
-    appointment = models.ForeignKey(Appointment, on_delete=models.CASCADE, related_name='consultations_appointments', null=True, blank=True)
+    appointment = models.ForeignKey(Appointment, on_delete=models.SET_NULL, related_name='consultations_appointments', null=True, blank=True)
     summary = models.TextField()
+    notes = models.TextField(blank=True)
     date = models.DateField(auto_now_add=True)
     follow_up = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['patient', 'updated_at'], name='consult_pat_upd_idx'),
+            models.Index(fields=['doctor', 'updated_at'], name='consult_doc_upd_idx'),
+            models.Index(fields=['patient', 'date'], name='consult_patient_date_idx'),
+            models.Index(fields=['doctor', 'date'], name='consult_doctor_date_idx'),
+        ]
 
     def __str__(self):
         return f"Consultation {self.patient.email} with {self.doctor.full_name} on {self.date}"
\ No newline at end of file
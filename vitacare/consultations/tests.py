@@ -1 +1,64 @@
 from django.test import TestCase
+
+from common.testing import PatientClientMixin
+from users.models import Doctor
+from .models import Consultation
+
+
+class UnifiedConsultationStoreTest(PatientClientMixin, TestCase):
+    def test_writes_from_every_endpoint_share_one_table(self):
+        self.client.post('/api/medical/consultations/create/', {
+            'doctor_email': self.doctor.email, 'patient_id': self.patient.id, 'summary': 'Via medical',
+        })
+        self.client.post('/api/consultations/create/', {
+            'doctor_email': self.doctor.email, 'patient_id': self.patient.id, 'summary': 'Via consultations',
+        })
+        self.assertEqual(Consultation.objects.count(), 2)
+
+        for url in ('/api/medical/consultations/my/', '/api/consultations/my/'):
+            # version stamp, rows
+            with self.assertNumQueries(2):
+                response = self.client.get(url)
+            self.assertEqual({c['summary'] for c in response.data}, {'Via medical', 'Via consultations'})
+
+
+class ConsultationListQueryCountTest(PatientClientMixin, TestCase):
+    """List endpoints must cost the same number of queries for one row or
+    many; a per-row doctor lookup shows up as a failure here."""
+
+    # url -> queries (the ETag-aware endpoints add their version stamp)
+    ENDPOINTS = {
+        '/api/medical/consultations/my/': 2,
+        '/api/consultations/my/': 2,
+        '/api/prescriptions/consultations/my/': 1,
+    }
+
+    def consult(self, count):
+        for index in range(count):
+            doctor = Doctor.objects.create(
+                full_name=f'Dr {index}', email=f'doc{index}@test.com', license_number=f'LIC{index}',
+                password='Doctor123!',
+            )
+            Consultation.objects.create(doctor=doctor, patient=self.patient, summary='Checkup')
+
+    def test_query_count_is_independent_of_rows(self):
+        for rows in (1, 5):
+            Consultation.objects.all().delete()
+            Doctor.objects.all().delete()
+            self.consult(rows)
+            for url, queries in self.ENDPOINTS.items():
+                with self.subTest(url=url, rows=rows), self.assertNumQueries(queries):
+                    response = self.client.get(url)
+                self.assertEqual(len(response.data), rows)
+                self.assertEqual(
+                    sorted(c['doctor_name'] for c in response.data), sorted(f'Dr {i}' for i in range(rows))
+                )
+
+
+class ConsultationSyncTest(PatientClientMixin, TestCase):
+    def test_sync_rows_carry_doctor_name(self):
+        Consultation.objects.create(doctor=self.doctor, patient=self.patient, summary='Checkup')
+        for url in ('/api/consultations/sync/', '/api/medical/consultations/sync/'):
+            with self.subTest(url=url), self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual([c['doctor_name'] for c in response.data['changed']], ['Dr Test'])
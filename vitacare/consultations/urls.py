@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import PatientConsultationListView, DoctorCreateConsultationView
+from .views import PatientConsultationListView, DoctorCreateConsultationView, ConsultationSyncView
 
 urlpatterns = [
     path('my/', PatientConsultationListView.as_view(), name='patient_consultations'),
+    path('sync/', ConsultationSyncView.as_view(), name='consultations_sync'),
     path('create/', DoctorCreateConsultationView.as_view(), name='doctor_create_consultation'),
 ]
\ No newline at end of file
@@ -2,26 +2,31 @@ from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework import status
-from .serializers import ConsultationSerializer
+from common.cache import cached_response, patient_scopes
+from common.conditional import conditional_list
+from common.sync import SyncView
+from .serializers import ConsultationListSerializer, ConsultationSerializer
 from .models import Consultation
-from users.models import Doctor
+from users.models import Doctor, normalize_email
 from django.shortcuts import get_object_or_404
 from users.models import CustomUser
 
 class PatientConsultationListView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional_list(lambda request: Consultation.objects.filter(patient=request.user))
+    @cached_response('patient_consultations', patient_scopes)
     def get(self, request):
         patient = request.user
         consultations = Consultation.objects.filter(patient=patient).order_by('-date')
-        serializer = ConsultationSerializer(consultations, many=True)
+        serializer = ConsultationListSerializer(ConsultationListSerializer.optimize(consultations), many=True)
         return Response(serializer.data, status=200)
 
 class DoctorCreateConsultationView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        doctor_email = request.data.get('doctor_email')
+        doctor_email = normalize_email(request.data.get('doctor_email'))
         patient_id = request.data.get('patient_id')
         if not doctor_email or not patient_id or not request.data.get('summary'):
             return Response({"error":"doctor_email, patient_id and summary are required"}, status=400)
@@ -48,3 +53,8 @@ class DoctorCreateConsultationView(APIView):
             serializer.save()
             return Response({"message":"Consultation saved", "consultation": serializer.data}, status=201)
         return Response(serializer.errors, status=400)
+
+
+class ConsultationSyncView(SyncView):
+    queryset = ConsultationListSerializer.optimize(Consultation.objects.all())
+    serializer_class = ConsultationListSerializer
@@ -1,4 +1 @@
-from django.contrib import admin
-from .models import Prescription, Consultation
-admin.site.register(Prescription)
-admin.site.register(Consultation)
\ No newline at end of file
+# Prescription and Consultation are registered by their owning apps.
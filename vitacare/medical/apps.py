@@ -3,4 +3,4 @@ from django.apps import AppConfig
 
 class MedicalConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'medical'
\ No newline at end of file
+    name = 'medical'
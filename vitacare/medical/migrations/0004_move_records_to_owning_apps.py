@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:29
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medical', '0003_audit_timestamps'),
+        # Rows are copied out before the tables are dropped.
+        ('prescriptions', '0005_merge_medical_prescriptions'),
+        ('consultations', '0004_merge_medical_consultations'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='Consultation',
+        ),
+        migrations.DeleteModel(
+            name='Prescription',
+        ),
+    ]
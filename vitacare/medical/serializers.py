@@ -1,14 +1,4 @@
-from rest_framework import serializers
-from .models import Prescription, Consultation
+from consultations.serializers import ConsultationListSerializer, ConsultationSerializer
+from prescriptions.serializers import PrescriptionListSerializer, PrescriptionSerializer
 
-class PrescriptionSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Prescription
-        fields = '__all__'
-        read_only_fields = ('date_issued',)
-
-class ConsultationSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Consultation
-        fields = '__all__'
-        read_only_fields = ('date',)
\ No newline at end of file
+__all__ = ['ConsultationListSerializer', 'ConsultationSerializer', 'PrescriptionListSerializer', 'PrescriptionSerializer']
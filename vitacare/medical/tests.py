@@ -1 +1,85 @@
+from datetime import date, time
+
 from django.test import TestCase
+
+from appointments.models import Appointment
+from common.testing import PatientClientMixin
+from .models import Consultation, Prescription
+
+
+class ConditionalPrescriptionListTest(PatientClientMixin, TestCase):
+    url = '/api/medical/prescriptions/my/'
+
+    def setUp(self):
+        super().setUp()
+        self.prescribe('Amoxicillin')
+
+    def prescribe(self, medication):
+        return Prescription.objects.create(
+            doctor=self.doctor, patient=self.patient, medication=medication, dosage='1x daily'
+        )
+
+    def test_unchanged_list_is_not_modified(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        etag = first['ETag']
+
+        with self.assertNumQueries(1):
+            second = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second['ETag'], etag)
+
+    def test_new_row_changes_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.prescribe('Ibuprofen')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.data), 2)
+
+
+class PatientTimelineTest(PatientClientMixin, TestCase):
+    url = '/api/medical/timeline/'
+
+    def test_merges_sources_newest_first_across_pages(self):
+        for day in (1, 3):
+            Appointment.objects.create(
+                doctor=self.doctor, patient=self.patient, doctor_name=self.doctor.full_name,
+                date=date(2030, 1, day), time=time(9, 0), reason=f'Visit {day}',
+            )
+        consultation = Consultation.objects.create(doctor=self.doctor, patient=self.patient, summary='Checkup')
+        Consultation.objects.filter(pk=consultation.pk).update(date=date(2030, 1, 2))
+        Prescription.objects.create(doctor=self.doctor, patient=self.patient, medication='Aspirin', dosage='1x')
+        Prescription.objects.filter(medication='Aspirin').update(date_issued=date(2030, 1, 2))
+
+        seen, cursor = [], None
+        while True:
+            params = {'limit': 3}
+            if cursor:
+                params['cursor'] = cursor
+            with self.assertNumQueries(1 if cursor else 2):
+                response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 200)
+            seen.extend((entry['type'], entry['date']) for entry in response.data['entries'])
+            cursor = response.data['next_cursor']
+            if not cursor:
+                break
+
+        self.assertEqual(seen, [
+            ('appointment', '2030-01-03'),
+            ('prescription', '2030-01-02'),
+            ('consultation', '2030-01-02'),
+            ('appointment', '2030-01-01'),
+        ])
+
+    def test_first_page_carries_latest_appointment(self):
+        Appointment.objects.create(
+            doctor=self.doctor, patient=self.patient, doctor_name=self.doctor.full_name,
+            date=date(2030, 1, 1), time=time(9, 0),
+        )
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['latest_appointment']['date'], '2030-01-01')
+
+    def test_bad_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'nonsense'})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,107 @@
+"""Patient timeline: appointments, consultations and prescriptions merged
+newest first.
+
+The three sources are read with a single ``UNION ALL`` whose branches share
+the column layout ``(id, kind, at_date, at_time, title, detail, physician)``.
+Pages are keyset-paginated on ``(at_date, at_time, kind, id)``; ``kind``
+breaks ties between rows of different sources that share an id.
+"""
+import base64
+from datetime import date, time
+
+from django.db.models import CharField, F, IntegerField, Q, Value
+from django.db.models.functions import Coalesce, TruncTime
+
+from appointments.models import Appointment
+from consultations.models import Consultation
+from prescriptions.models import Prescription
+
+KINDS = ('appointment', 'consultation', 'prescription')
+ORDERING = ('-at_date', '-at_time', '-kind', '-id')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(row):
+    raw = f"{row['at_date'].isoformat()}|{row['at_time'].isoformat()}|{row['kind']}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        row_date, row_time, kind, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return date.fromisoformat(row_date), time.fromisoformat(row_time), int(kind), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursor("Invalid cursor")
+
+
+def _before(kind, cursor):
+    """``Q`` for rows of source ``kind`` that sort after ``cursor`` in the
+    descending timeline order."""
+    row_date, row_time, cursor_kind, row_id = cursor
+    earlier = Q(at_date__lt=row_date) | Q(at_date=row_date, at_time__lt=row_time)
+    same_moment = Q(at_date=row_date, at_time=row_time)
+    if kind < cursor_kind:
+        return earlier | same_moment
+    if kind == cursor_kind:
+        return earlier | (same_moment & Q(id__lt=row_id))
+    return earlier
+
+
+def _branch(queryset, kind, cursor, **columns):
+    queryset = queryset.annotate(kind=Value(kind, output_field=IntegerField()), **columns)
+    if cursor is not None:
+        queryset = queryset.filter(_before(kind, cursor))
+    return queryset.order_by().values('id', 'kind', 'at_date', 'at_time', 'title', 'detail', 'physician')
+
+
+def timeline_page(patient, cursor=None, limit=50):
+    """Return ``(entries, next_cursor)`` for one page of ``patient``'s
+    timeline."""
+    position = decode_cursor(cursor) if cursor else None
+    text = CharField()
+    appointments = _branch(
+        Appointment.objects.filter(patient=patient), KINDS.index('appointment'), position,
+        at_date=F('date'),
+        at_time=F('time'),
+        title=Coalesce('reason', Value(''), output_field=text),
+        detail=F('status'),
+        physician=F('doctor_name'),
+    )
+    consultations = _branch(
+        Consultation.objects.filter(patient=patient), KINDS.index('consultation'), position,
+        at_date=F('date'),
+        at_time=TruncTime('created_at'),
+        title=F('summary'),
+        detail=F('follow_up'),
+        physician=F('doctor__full_name'),
+    )
+    prescriptions = _branch(
+        Prescription.objects.filter(patient=patient), KINDS.index('prescription'), position,
+        at_date=F('date_issued'),
+        at_time=TruncTime('created_at'),
+        title=F('medication'),
+        detail=F('dosage'),
+        physician=F('doctor__full_name'),
+    )
+
+    rows = list(appointments.union(consultations, prescriptions, all=True).order_by(*ORDERING)[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1])
+    return [
+        {
+            'type': KINDS[row['kind']],
+            'id': row['id'],
+            'date': row['at_date'].isoformat(),
+            'time': row['at_time'].strftime('%H:%M:%S'),
+            'title': row['title'],
+            'detail': row['detail'],
+            'doctor_name': row['physician'],
+        }
+        for row in rows
+    ], next_cursor
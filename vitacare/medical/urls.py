@@ -1,12 +1,16 @@
 from django.urls import path
 from .views import (
     PatientPrescriptionsView, DoctorCreatePrescriptionView,
-    PatientConsultationsView, DoctorCreateConsultationView
+    PatientConsultationsView, DoctorCreateConsultationView,
+    PrescriptionSyncView, ConsultationSyncView, PatientTimelineView
 )
 
 urlpatterns = [
+    path('timeline/', PatientTimelineView.as_view(), name='patient_timeline'),
     path('prescriptions/my/', PatientPrescriptionsView.as_view(), name='patient_prescriptions'),
     path('prescriptions/create/', DoctorCreatePrescriptionView.as_view(), name='doctor_create_prescription'),
+    path('prescriptions/sync/', PrescriptionSyncView.as_view(), name='medical_prescriptions_sync'),
     path('consultations/my/', PatientConsultationsView.as_view(), name='patient_consultations'),
     path('consultations/create/', DoctorCreateConsultationView.as_view(), name='doctor_create_consultation'),
+    path('consultations/sync/', ConsultationSyncView.as_view(), name='medical_consultations_sync'),
 ]
\ No newline at end of file
@@ -1,25 +1,45 @@
-from django.shortcuts import render
+"""Patient record endpoints under ``/api/medical/``.
+
+The prescription and consultation endpoints read and write the same tables
+as the ``prescriptions`` and ``consultations`` apps; only the response
+shapes the Kivy client expects are kept here.
+"""
+import logging
+
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from .serializers import PrescriptionSerializer, ConsultationSerializer
+from common.cache import cached_response, patient_scopes
+from common.conditional import conditional_list
+from consultations.views import (
+    ConsultationSyncView, PatientConsultationListView as PatientConsultationsView
+)
+from prescriptions.views import PrescriptionSyncView
+from .serializers import PrescriptionListSerializer
 from .models import Prescription, Consultation
-from users.models import Doctor, CustomUser
+from users.models import Doctor, CustomUser, normalize_email
 from appointments.models import Appointment
+from appointments.pagination import page_size
+from appointments.views import latest_appointment
+from .timeline import InvalidCursor, timeline_page
+
+logger = logging.getLogger(__name__)
 
 class PatientPrescriptionsView(APIView):
     permission_classes = [IsAuthenticated]
+    @conditional_list(lambda request: Prescription.objects.filter(patient=request.user))
+    @cached_response('medical_prescriptions', patient_scopes)
     def get(self, request):
         patient = request.user
         qs = Prescription.objects.filter(patient=patient).order_by('-date_issued')
-        serializer = PrescriptionSerializer(qs, many=True)
+        serializer = PrescriptionListSerializer(PrescriptionListSerializer.optimize(qs), many=True)
         return Response(serializer.data, status=200)
 
 class DoctorCreatePrescriptionView(APIView):
     permission_classes = [IsAuthenticated]
     def post(self, request):
-        doctor_email = request.data.get('doctor_email')
+        doctor_email = normalize_email(request.data.get('doctor_email'))
         patient_id = request.data.get('patient_id')
         medication = request.data.get('medication')
         if not all([doctor_email, patient_id, medication]):
@@ -43,18 +63,10 @@ class DoctorCreatePrescriptionView(APIView):
         )
         return Response({'message':'created','prescription_id': obj.id}, status=201)
 
-class PatientConsultationsView(APIView):
-    permission_classes = [IsAuthenticated]
-    def get(self, request):
-        patient = request.user
-        qs = Consultation.objects.filter(patient=patient).order_by('-date')
-        serializer = ConsultationSerializer(qs, many=True)
-        return Response(serializer.data, status=200)
-
 class DoctorCreateConsultationView(APIView):
     permission_classes = [IsAuthenticated]
     def post(self, request):
-        doctor_email = request.data.get('doctor_email')
+        doctor_email = normalize_email(request.data.get('doctor_email'))
         patient_id = request.data.get('patient_id')
         summary = request.data.get('summary')
         if not all([doctor_email, patient_id, summary]):
@@ -76,3 +88,31 @@ class DoctorCreateConsultationView(APIView):
             summary=summary, follow_up=request.data.get('follow_up','')
         )
         return Response({'message':'created','consultation_id': obj.id}, status=201)
+
+
+class PatientTimelineView(APIView):
+    """Appointments, consultations and prescriptions newest first, one
+    query per page.  The first page also carries ``latest_appointment`` so
+    the home screen renders from a single request."""
+    permission_classes = [IsAuthenticated]
+
+    @cached_response('patient_timeline', patient_scopes)
+    def get(self, request):
+        try:
+            cursor = request.GET.get('cursor')
+            try:
+                limit = page_size(request.GET.get('limit'), default=50, maximum=200)
+            except ValueError:
+                return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                entries, next_cursor = timeline_page(request.user, cursor=cursor, limit=limit)
+            except InvalidCursor as exc:
+                return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+            data = {'entries': entries, 'next_cursor': next_cursor}
+            if not cursor:
+                data['latest_appointment'] = latest_appointment(request.user)
+            return Response(data, status=status.HTTP_200_OK)
+        except Exception as exc:
+            logger.exception("Error in PatientTimelineView.get")
+            return Response({"error": "Internal server error"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
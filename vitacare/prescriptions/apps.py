@@ -3,3 +3,10 @@ from django.apps import AppConfig
 class PrescriptionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'prescriptions'
+
+    def ready(self):
+        from common.cache import invalidate_owners
+        from common.sync import track_deletions
+        from .models import Prescription
+        track_deletions(Prescription)
+        invalidate_owners(Prescription)
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def merge_medical_prescriptions(apps, schema_editor):
+    """Copy ``medical.Prescription`` rows into this table, skipping rows that
+    were already written to both, and keep their original dates."""
+    Legacy = apps.get_model('medical', 'Prescription')
+    Prescription = apps.get_model('prescriptions', 'Prescription')
+    for name in ('date_issued', 'created_at', 'updated_at'):
+        field = Prescription._meta.get_field(name)
+        field.auto_now = field.auto_now_add = False
+
+    seen = set(Prescription.objects.values_list('doctor_id', 'patient_id', 'medication', 'dosage', 'date_issued'))
+    copies = []
+    for row in Legacy.objects.order_by('id').iterator():
+        key = (row.doctor_id, row.patient_id, row.medication, row.dosage, row.date_issued)
+        if key in seen:
+            continue
+        seen.add(key)
+        copies.append(Prescription(
+            doctor_id=row.doctor_id,
+            patient_id=row.patient_id,
+            medication=row.medication,
+            dosage=row.dosage,
+            notes=row.notes,
+            date_issued=row.date_issued,
+            created_at=row.created_at,
+            updated_at=row.updated_at,
+        ))
+    Prescription.objects.bulk_create(copies, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0007_appointment_status'),
+        ('medical', '0003_audit_timestamps'),
+        ('prescriptions', '0004_audit_timestamps'),
+        ('users', '0009_alter_customuser_role'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='prescription',
+            name='appointment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='prescriptions_appointments', to='appointments.appointment'),
+        ),
+        migrations.AddIndex(
+            model_name='prescription',
+            index=models.Index(fields=['patient', 'date_issued'], name='rx_patient_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prescription',
+            index=models.Index(fields=['doctor', 'date_issued'], name='rx_doctor_date_idx'),
+        ),
+        migrations.RunPython(merge_medical_prescriptions, migrations.RunPython.noop),
+    ]
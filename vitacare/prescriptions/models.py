@@ -5,11 +5,21 @@ from appointments.models import Appointment
 class Prescription(models.Model):
     doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name='prescriptions_doctors')
     patient = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='prescriptions_patients')
-    appointment = models.ForeignKey(Appointment, on_delete=models.CASCADE, related_name='prescriptions_appointments', null=True, blank=True)
+    appointment = models.ForeignKey(Appointment, on_delete=models.SET_NULL, related_name='prescriptions_appointments', null=True, blank=True)
     medication = models.CharField(max_length=255, blank=True, default="")
     dosage = models.CharField(max_length=255, blank=True)
     notes = models.TextField(blank=True)
     date_issued = models.DateField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['patient', 'updated_at'], name='rx_pat_upd_idx'),
+            models.Index(fields=['doctor', 'updated_at'], name='rx_doc_upd_idx'),
+            models.Index(fields=['patient', 'date_issued'], name='rx_patient_date_idx'),
+            models.Index(fields=['doctor', 'date_issued'], name='rx_doctor_date_idx'),
+        ]
 
     def __str__(self):
         return f"Prescription for {self.patient.email} by {self.doctor.full_name}"
\ No newline at end of file
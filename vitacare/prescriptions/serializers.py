@@ -1,3 +1,4 @@
+from django.db.models import F
 from rest_framework import serializers
 from .models import Prescription
 
@@ -5,4 +6,24 @@ class PrescriptionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Prescription
         fields = '__all__'
-        read_only_fields = ('date_issued',)
\ No newline at end of file
+        read_only_fields = ('date_issued',)
+
+class PrescriptionListSerializer(serializers.ModelSerializer):
+    """Read-only list shape with the prescribing doctor's name.
+
+    Pass a queryset through ``optimize`` so the name comes from the same
+    query instead of one doctor lookup per row.
+    """
+    doctor_name = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = Prescription
+        fields = (
+            'id', 'doctor', 'doctor_name', 'patient', 'appointment', 'medication', 'dosage', 'notes',
+            'date_issued', 'created_at', 'updated_at',
+        )
+        read_only_fields = fields
+
+    @staticmethod
+    def optimize(queryset):
+        return queryset.annotate(doctor_name=F('doctor__full_name'))
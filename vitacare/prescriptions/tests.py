@@ -1 +1,43 @@
 from django.test import TestCase
+
+from common.testing import PatientClientMixin
+from users.models import Doctor
+from .models import Prescription
+
+
+class PrescriptionListQueryCountTest(PatientClientMixin, TestCase):
+    """List endpoints must cost the same number of queries for one row or
+    many; a per-row doctor lookup shows up as a failure here."""
+
+    # url -> queries (the medical endpoint adds its ETag version stamp)
+    ENDPOINTS = {
+        '/api/medical/prescriptions/my/': 2,
+        '/api/prescriptions/prescriptions/my/': 1,
+    }
+
+    def prescribe(self, count):
+        for index in range(count):
+            doctor = Doctor.objects.create(
+                full_name=f'Dr {index}', email=f'doc{index}@test.com', license_number=f'LIC{index}',
+                password='Doctor123!',
+            )
+            Prescription.objects.create(doctor=doctor, patient=self.patient, medication='Aspirin', dosage='1x')
+
+    def test_query_count_is_independent_of_rows(self):
+        for rows in (1, 5):
+            Prescription.objects.all().delete()
+            Doctor.objects.all().delete()
+            self.prescribe(rows)
+            for url, queries in self.ENDPOINTS.items():
+                with self.subTest(url=url, rows=rows), self.assertNumQueries(queries):
+                    response = self.client.get(url)
+                self.assertEqual(len(response.data), rows)
+                self.assertEqual(
+                    sorted(p['doctor_name'] for p in response.data), sorted(f'Dr {i}' for i in range(rows))
+                )
+
+    def test_only_patients(self):
+        self.patient.role = 'doctor'
+        self.patient.save()
+        response = self.client.get('/api/prescriptions/prescriptions/my/')
+        self.assertEqual(response.status_code, 403)
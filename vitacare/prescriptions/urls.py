@@ -6,4 +6,5 @@ urlpatterns = [
     path('consultations/add/', views.add_consultation),
     path('prescriptions/my/', views.my_prescriptions),
     path('consultations/my/', views.my_consultations),
+    path('prescriptions/sync/', views.PrescriptionSyncView.as_view()),
 ]
\ No newline at end of file
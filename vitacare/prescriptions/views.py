@@ -6,14 +6,18 @@ from rest_framework import status
 from appointments.models import Appointment
 from prescriptions.models import Prescription
 from consultations.models import Consultation
-from users.models import CustomUser, Doctor
+from prescriptions.serializers import PrescriptionListSerializer
+from consultations.serializers import ConsultationListSerializer
+from users.models import CustomUser, Doctor, normalize_email
+from common.cache import cached_response, patient_scopes
+from common.sync import SyncView
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def add_prescription(request):
     try:
         appointment_id = request.data.get("appointment_id")
-        doctor_email = request.data.get("doctor_email")
+        doctor_email = normalize_email(request.data.get("doctor_email"))
         patient_id = request.data.get("patient_id")
         medication = request.data.get("medication")
         dosage = request.data.get("dosage")
@@ -47,7 +51,7 @@ def add_prescription(request):
 def add_consultation(request):
     try:
         appointment_id = request.data.get("appointment_id")
-        doctor_email = request.data.get("doctor_email")
+        doctor_email = normalize_email(request.data.get("doctor_email"))
         patient_id = request.data.get("patient_id")
         summary = request.data.get("summary")
         notes = request.data.get("notes", "")
@@ -78,41 +82,30 @@ def add_consultation(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_response('my_prescriptions', patient_scopes)
 def my_prescriptions(request):
     user = request.user
     if not user.is_patient:
         return Response({"error": "Only patients can access this endpoint."}, status=403)
 
     prescriptions = Prescription.objects.filter(patient=user).order_by("-date_issued")
-    data = []
-    for p in prescriptions:
-        data.append({
-            "id": p.id,
-            "doctor_name": getattr(p.doctor, "full_name", p.doctor.email),
-            "medication": p.medication,
-            "dosage": p.dosage,
-            "notes": p.notes,
-            "date_issued": getattr(p, "date_issued", ""),
-        })
+    data = PrescriptionListSerializer(PrescriptionListSerializer.optimize(prescriptions), many=True).data
     return Response(data, status=200)
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_response('my_consultations', patient_scopes)
 def my_consultations(request):
     user = request.user
     if not user.is_patient:
         return Response({"error": "Only patients can access this endpoint."}, status=403)
 
     consultations = Consultation.objects.filter(patient=user).order_by("-date")
-    data = []
-    for c in consultations:
-        data.append({
-            "id": c.id,
-            "doctor_name": getattr(c.doctor, "full_name", c.doctor.email),
-            "summary": c.summary,
-            "notes": c.notes,
-            "follow_up": getattr(c, "follow_up", ""),
-            "date": getattr(c, "date", "")
-        })
-    return Response(data, status=200)
\ No newline at end of file
+    data = ConsultationListSerializer(ConsultationListSerializer.optimize(consultations), many=True).data
+    return Response(data, status=200)
+
+
+class PrescriptionSyncView(SyncView):
+    queryset = PrescriptionListSerializer.optimize(Prescription.objects.all())
+    serializer_class = PrescriptionListSerializer
@@ -1,4 +1,9 @@
 from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'users'
\ No newline at end of file
+    name = 'users'
+
+    def ready(self):
+        from . import authentication, directory
+        authentication.connect_signals()
+        directory.connect_signals()
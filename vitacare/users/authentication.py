@@ -0,0 +1,165 @@
+"""JWT authentication that builds ``request.user`` from token claims.
+
+Access tokens issued by the login views carry the user's email, role and
+name, so most requests are authenticated without reading ``CustomUser``.
+The user object is a real model instance loaded with only those fields;
+touching any other field loads it lazily, and ``save()`` only writes the
+loaded fields.
+
+Tokens without the claims (issued before this module existed) fall back to
+a full row read through a small in-process LRU.  Revocation is recorded in
+the Django cache as "tokens issued up to this moment are invalid", so it
+reaches every worker when the cache is shared.  ``iat`` only has whole
+seconds, so tokens also carry a precise ``issued`` time; without it a login
+right after a password reset would be refused.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+# User fields copied into every token as claims of the same name.
+CLAIM_FIELDS = ('email', 'first_name', 'last_name', 'role')
+# Sub-second issue time, compared against revocations.
+ISSUED_CLAIM = 'issued'
+
+
+def issue_tokens(user, **claims):
+    """``RefreshToken`` for ``user`` carrying the profile claims; keyword
+    arguments add or override claims (e.g. ``role='doctor'``)."""
+    refresh = RefreshToken.for_user(user)
+    for field in CLAIM_FIELDS:
+        refresh[field] = getattr(user, field, '') or ''
+    refresh['name'] = f"{user.first_name} {user.last_name}".strip()
+    refresh[ISSUED_CLAIM] = time.time()
+    for claim, value in claims.items():
+        refresh[claim] = value
+    return refresh
+
+
+def _revocation_key(user_id):
+    return f"auth:revoked:{user_id}"
+
+
+def revoke_user_tokens(user_id):
+    """Invalidate every token issued to ``user_id`` up to now."""
+    lifetime = api_settings.REFRESH_TOKEN_LIFETIME.total_seconds()
+    cache.set(_revocation_key(user_id), time.time(), timeout=int(lifetime) + 60)
+    user_cache.evict(user_id)
+
+
+def is_revoked(token):
+    revoked_at = cache.get(_revocation_key(token.get(api_settings.USER_ID_CLAIM)))
+    if revoked_at is None:
+        return False
+    # Tokens without the precise claim fall back to whole-second ``iat``.
+    return token.get(ISSUED_CLAIM, token.get('iat', 0)) <= revoked_at
+
+
+class UserCache:
+    """Bounded LRU of full user rows with a short time-to-live."""
+
+    def __init__(self, size=None, ttl=None):
+        self.size = size
+        self.ttl = ttl
+        self._rows = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def _limits(self):
+        size = self.size or getattr(settings, 'AUTH_USER_CACHE_SIZE', 1024)
+        ttl = self.ttl if self.ttl is not None else getattr(settings, 'AUTH_USER_CACHE_TTL', 60)
+        return size, ttl
+
+    def get(self, user_id):
+        size, ttl = self._limits()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._rows.get(user_id)
+            if entry is not None and now - entry[0] < ttl:
+                self._rows.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        user = get_user_model().objects.filter(pk=user_id).first()
+        if user is not None:
+            with self._lock:
+                self._rows[user_id] = (now, user)
+                self._rows.move_to_end(user_id)
+                while len(self._rows) > size:
+                    self._rows.popitem(last=False)
+        return user
+
+    def evict(self, user_id):
+        with self._lock:
+            self._rows.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._rows.clear()
+
+
+user_cache = UserCache()
+
+
+def user_from_claims(token):
+    """A ``CustomUser`` with only the token's fields loaded."""
+    User = get_user_model()
+    known = {claim: token[claim] for claim in CLAIM_FIELDS}
+    known.update(id=token[api_settings.USER_ID_CLAIM], is_active=True)
+    # from_db expects values in field order; the rest stay deferred.
+    names = [f.attname for f in User._meta.concrete_fields if f.attname in known]
+    return User.from_db(User.objects.db, names, [known[name] for name in names])
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken("Token contained no recognizable user identification")
+        if is_revoked(validated_token):
+            raise AuthenticationFailed("Token has been revoked", code="token_revoked")
+
+        if all(claim in validated_token for claim in CLAIM_FIELDS):
+            return user_from_claims(validated_token)
+
+        user = user_cache.get(validated_token[api_settings.USER_ID_CLAIM])
+        if user is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        if not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return user
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refuse to refresh tokens that were revoked."""
+
+    def validate(self, attrs):
+        if is_revoked(self.token_class(attrs['refresh'])):
+            raise AuthenticationFailed("Token has been revoked", code="token_revoked")
+        return super().validate(attrs)
+
+
+def _user_saved(sender, instance, **kwargs):
+    user_cache.evict(instance.pk)
+    if not instance.is_active:
+        revoke_user_tokens(instance.pk)
+
+
+def _user_deleted(sender, instance, **kwargs):
+    revoke_user_tokens(instance.pk)
+
+
+def connect_signals():
+    User = get_user_model()
+    post_save.connect(_user_saved, sender=User, dispatch_uid='auth:user_saved')
+    post_delete.connect(_user_deleted, sender=User, dispatch_uid='auth:user_deleted')
@@ -0,0 +1,69 @@
+"""Doctor directory served from a versioned cache.
+
+The directory (every doctor's id, name, email, licence and specialisation)
+is cached under the version of the ``doctors`` scope from ``common.cache``.
+Saving or deleting a doctor bumps the scope, so the next read rebuilds the
+directory and stale copies simply expire.  The version doubles as the ETag
+source, so unchanged directories are answered with ``304`` without touching
+the database.  Writes through ``QuerySet.update()`` bypass the signals and
+are picked up when the cached copy expires (``DOCTOR_DIRECTORY_TTL``).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+
+from common.cache import bump, metrics, versions
+
+from .models import Doctor, normalize_email
+
+SCOPE = 'doctors'
+
+
+def current_version():
+    return versions([SCOPE])[0]
+
+
+def invalidate():
+    bump(SCOPE)
+
+
+def _build():
+    return [
+        {
+            'id': doctor['id'],
+            'name': doctor['full_name'],
+            'email': doctor['email'],
+            'license': doctor['license_number'],
+            'specialization': doctor['specialization'],
+        }
+        for doctor in Doctor.objects.order_by('full_name', 'id').values(
+            'id', 'full_name', 'email', 'license_number', 'specialization'
+        )
+    ]
+
+
+def directory():
+    """Return ``(version, entries)`` for the current directory."""
+    version = current_version()
+    key = f'doctors:directory:{version}'
+    entries = cache.get(key)
+    metrics.record('doctor_directory', 'miss' if entries is None else 'hit')
+    if entries is None:
+        entries = _build()
+        cache.set(key, entries, timeout=getattr(settings, 'DOCTOR_DIRECTORY_TTL', 3600))
+    return version, entries
+
+
+def doctor_id_for_email(email):
+    email = normalize_email(email)
+    _, entries = directory()
+    return next((entry['id'] for entry in entries if entry['email'] == email), None)
+
+
+def _doctor_changed(sender, **kwargs):
+    invalidate()
+
+
+def connect_signals():
+    post_save.connect(_doctor_changed, sender=Doctor, dispatch_uid='directory:doctor_saved')
+    post_delete.connect(_doctor_changed, sender=Doctor, dispatch_uid='directory:doctor_deleted')
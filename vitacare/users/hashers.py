@@ -0,0 +1,94 @@
+"""Password hashing policy and bounded verification.
+
+``PASSWORD_HASHERS`` puts the configured algorithm first (scrypt by default,
+Argon2 when ``argon2-cffi`` is installed and selected) and keeps the others
+for verifying older hashes, which are upgraded on the next successful login.
+
+Verification runs on a small shared thread pool.  scrypt, Argon2 and PBKDF2
+release the GIL while hashing, so the pool caps how many hashes burn CPU at
+once; when it is saturated new logins are refused straight away with
+``HashingBusy`` rather than queueing behind a login storm.  A check that
+does not finish within ``PASSWORD_VERIFY_TIMEOUT`` is reported the same way.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, check_password, identify_hasher, make_password
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Argon2id with the OWASP baseline cost (19 MiB, 2 passes, 1 lane)
+    instead of Django's 100 MiB / 8 lanes, which is too heavy to run many
+    logins side by side.  Hashes keep the ``argon2`` prefix, and ones made
+    with other parameters are rehashed on login."""
+    time_cost = 2
+    memory_cost = 19456
+    parallelism = 1
+
+
+class HashingBusy(Exception):
+    """Too many password checks are already running or queued."""
+
+
+def is_password_hash(value):
+    """True if ``value`` is an encoded hash from a configured hasher."""
+    try:
+        identify_hasher(value)
+    except ValueError:
+        return False
+    return True
+
+
+_pool = None
+_slots = None
+_pool_lock = threading.Lock()
+
+
+def _executor():
+    global _pool, _slots
+    with _pool_lock:
+        if _pool is None:
+            workers = getattr(settings, 'PASSWORD_VERIFY_WORKERS', 4)
+            queued = getattr(settings, 'PASSWORD_VERIFY_QUEUE', 32)
+            _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-verify')
+            _slots = threading.BoundedSemaphore(workers + queued)
+        return _pool, _slots
+
+
+def _run(func, *args):
+    pool, slots = _executor()
+    if not slots.acquire(blocking=False):
+        raise HashingBusy("Too many sign-in attempts in progress, please retry shortly.")
+    try:
+        future = pool.submit(func, *args)
+    except BaseException:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return future.result(timeout=getattr(settings, 'PASSWORD_VERIFY_TIMEOUT', 10))
+    except FutureTimeout:
+        future.cancel()  # frees the slot if it never left the queue
+        raise HashingBusy("Sign-in is taking too long, please retry shortly.")
+
+
+def verify_password(raw_password, encoded, rehash=None):
+    """Check ``raw_password`` against ``encoded`` on the verification pool.
+
+    ``rehash(new_encoded)`` is called after a successful check whenever the
+    stored hash uses an outdated algorithm or parameters.  With ``encoded``
+    of ``None`` a throwaway hash is still computed, so unknown accounts take
+    as long to reject as wrong passwords.
+    """
+    if encoded is None:
+        _run(make_password, raw_password)
+        return False
+    upgraded = []
+    valid = _run(check_password, raw_password, encoded, upgraded.append)
+    if valid and upgraded and rehash is not None:
+        try:
+            rehash(_run(make_password, raw_password))
+        except HashingBusy:
+            pass  # the next login will upgrade it
+    return valid
@@ -51,7 +51,8 @@ class Command(BaseCommand):
             defaults={
                 "full_name": self.DOCTOR_NAME,
                 "license_number": self.DOCTOR_LICENSE,
-                "password": make_password(self.DOCTOR_PASSWORD)
+                "password": make_password(self.DOCTOR_PASSWORD),
+                "user": doctor_user
             }
         )
         if doctor_created:
@@ -88,7 +89,8 @@ class Command(BaseCommand):
             time=appointment_time,
             defaults={
                 "doctor_name": doctor_profile.full_name,
-                "reason": "Demo consultation"
+                "reason": "Demo consultation",
+                "status": Appointment.BOOKED,
             }
         )
 
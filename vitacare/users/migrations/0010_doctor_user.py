@@ -0,0 +1,42 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import migrations, models
+
+
+def link_doctor_users(apps, schema_editor):
+    """Point every doctor at the account with the same email, creating an
+    account (with an unusable password) where none exists."""
+    Doctor = apps.get_model('users', 'Doctor')
+    CustomUser = apps.get_model('users', 'CustomUser')
+    users = {email.strip().lower(): pk for email, pk in CustomUser.objects.values_list('email', 'id')}
+    for doctor in Doctor.objects.filter(user__isnull=True).order_by('id').iterator():
+        user_id = users.get(doctor.email.strip().lower())
+        if user_id is None:
+            first_name, _, last_name = doctor.full_name.partition(' ')
+            user_id = CustomUser.objects.create(
+                email=doctor.email,
+                first_name=first_name,
+                last_name=last_name,
+                role='doctor',
+                password=make_password(None),
+            ).id
+        Doctor.objects.filter(pk=doctor.pk).update(user_id=user_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_alter_customuser_role'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='doctor',
+            name='user',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='doctor_profile', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(link_doctor_users, migrations.RunPython.noop),
+    ]
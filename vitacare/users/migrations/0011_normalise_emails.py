@@ -0,0 +1,43 @@
+from collections import defaultdict
+
+from django.db import migrations
+
+
+def normalise_emails(apps, schema_editor):
+    """Store every user and doctor email trimmed and lower-cased.
+
+    Sign-in and lookups only use the normalised address, so a row whose
+    normalised email collides with another row would become unreachable.
+    Nothing is changed in that case: the migration fails and lists the
+    conflicting rows, which have to be merged by hand before re-running it.
+    """
+    conflicts, updates = [], []
+    for model_name in ('CustomUser', 'Doctor'):
+        model = apps.get_model('users', model_name)
+        owners = defaultdict(list)
+        for pk, email in model.objects.order_by('id').values_list('id', 'email').iterator():
+            owners[(email or '').strip().lower()].append((pk, email))
+        for normalised, rows in owners.items():
+            if len(rows) > 1:
+                conflicts.extend(f"{model_name} {pk}: {email!r}" for pk, email in rows)
+            elif rows[0][1] != normalised:
+                updates.append((model, rows[0][0], normalised))
+
+    if conflicts:
+        raise RuntimeError(
+            "These accounts share an email once it is lower-cased and trimmed; merge or "
+            "rename them, then migrate again:\n  " + "\n  ".join(conflicts)
+        )
+    for model, pk, normalised in updates:
+        model.objects.filter(pk=pk).update(email=normalised)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_doctor_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalise_emails, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 16:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0011_normalise_emails'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='doctor',
+            name='specialization',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+    ]
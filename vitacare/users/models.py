@@ -4,12 +4,27 @@ from django.db import models
 from datetime import timedelta
 from django.utils import timezone
 from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+
+from .hashers import is_password_hash
+
+
+def normalize_email(email):
+    """Canonical stored form of an email address: trimmed and lower-case.
+
+    Emails are saved in this form, so lookups with a normalised value are
+    exact matches on the unique ``email`` index."""
+    return (email or '').strip().lower()
+
 
 class CustomUserManager(BaseUserManager):
+    def get_by_natural_key(self, username):
+        return self.get(**{self.model.USERNAME_FIELD: normalize_email(username)})
+
     def create_user(self, email, password=None, **extra_fields):
         if not email:
             raise ValueError('The Email field must be set')
-        email = self.normalize_email(email)
+        email = normalize_email(email)
         extra_fields.setdefault('is_active', True)
         user = self.model(email=email, **extra_fields)
         user.set_password(password)
@@ -47,9 +62,17 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
 
     objects = CustomUserManager()
 
+    def save(self, *args, **kwargs):
+        self.email = normalize_email(self.email)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.email
 
+    @property
+    def is_patient(self):
+        return self.role == 'patient'
+
 class PasswordResetCode(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     code = models.CharField(max_length=5)
@@ -65,11 +88,41 @@ class Doctor(models.Model):
     full_name = models.CharField(max_length=100)
     email = models.EmailField(unique=True)
     license_number = models.CharField(max_length=50, unique=True)
+    specialization = models.CharField(max_length=100, blank=True, default='')
     password = models.CharField(max_length=128)  # Will be hashed
+    # Account that tokens are issued to; linked once, when the doctor is saved.
+    user = models.OneToOneField(
+        CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='doctor_profile'
+    )
+
+    def link_user(self):
+        """Attach the ``CustomUser`` with this doctor's email, creating one
+        with an unusable password if none exists.
+
+        Raises ``ValidationError`` if that email belongs to a non-doctor
+        account, which must never gain the doctor's access.
+        """
+        first_name, _, last_name = self.full_name.partition(' ')
+        user, _ = CustomUser.objects.get_or_create(
+            email=self.email,
+            defaults={
+                'first_name': first_name,
+                'last_name': last_name,
+                'role': 'doctor',
+                'password': make_password(None),
+            },
+        )
+        if user.role != 'doctor':
+            raise ValidationError(f"{self.email} belongs to a {user.role} account, not a doctor's.")
+        self.user = user
+        return self.user
 
     def save(self, *args, **kwargs):
-        if not self.password.startswith('pbkdf2'):
+        self.email = normalize_email(self.email)
+        if not is_password_hash(self.password):
             self.password = make_password(self.password)
+        if self.user_id is None:
+            self.link_user()
         super().save(*args, **kwargs)
 
     def __str__(self):
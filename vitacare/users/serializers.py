@@ -6,7 +6,7 @@ from django.core.validators import validate_email
 from django.core.exceptions import ValidationError
 import re
 
-from .models import PasswordResetCode
+from .models import PasswordResetCode, normalize_email
 
 User = get_user_model()
 
@@ -33,10 +33,11 @@ class UserSignupSerializer(serializers.ModelSerializer):
         except ValidationError:
             raise serializers.ValidationError("Enter a valid email address.")
         
+        value = normalize_email(value)
         if User.objects.filter(email=value).exists():
             raise serializers.ValidationError("A user with this email already exists.")
         
-        return value.lower()  # Normalize email to lowercase
+        return value
 
     def validate_password(self, value):
         """
@@ -112,7 +113,7 @@ class ForgotPasswordSerializer(serializers.Serializer):
         """
         try:
             validate_email(value)
-            return value.lower()  # Normalize email
+            return normalize_email(value)
         except ValidationError:
             raise serializers.ValidationError("Enter a valid email address.")
 
@@ -124,7 +125,7 @@ class ResetCodeVerificationSerializer(serializers.Serializer):
     def validate_email(self, value):
         try:
             validate_email(value)
-            return value.lower()
+            return normalize_email(value)
         except ValidationError:
             raise serializers.ValidationError("Enter a valid email address.")
 
@@ -169,7 +170,7 @@ class NewPasswordSerializer(serializers.Serializer):
     def validate_email(self, value):
         try:
             validate_email(value)
-            return value.lower()
+            return normalize_email(value)
         except ValidationError:
             raise serializers.ValidationError("Enter a valid email address.")
 
@@ -1 +1,420 @@
-from django.test import TestCase
+import threading
+from datetime import time, timedelta
+from importlib import import_module
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from appointments.models import Appointment
+
+from .authentication import ClaimsTokenRefreshSerializer, is_revoked, issue_tokens, revoke_user_tokens, user_cache
+from . import hashers
+from .hashers import HashingBusy
+from . import throttling
+from .models import CustomUser, Doctor
+
+
+class ClaimsAuthenticationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        user_cache.clear()
+        throttling.reset()
+        self.user = CustomUser.objects.create_user(
+            email='patient@test.com', password='Patient123!', first_name='Pat', last_name='Test'
+        )
+        self.client = APIClient()
+
+    def login(self):
+        response = self.client.post('/api/users/login/', {'email': self.user.email, 'password': 'Patient123!'})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_me_is_served_from_claims(self):
+        access = self.login()['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/users/me/')
+        self.assertEqual(response.data['email'], self.user.email)
+        self.assertEqual(response.data['first_name'], 'Pat')
+        self.assertEqual(response.data['role'], 'patient')
+
+    def test_other_fields_load_lazily(self):
+        access = self.login()['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        response = self.client.get('/api/medical/timeline/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_legacy_token_uses_user_cache(self):
+        access = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        with self.assertNumQueries(1):
+            self.client.get('/api/users/me/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/users/me/')
+        self.assertEqual(response.data['email'], self.user.email)
+
+    def test_deactivation_revokes_tokens(self):
+        tokens = self.login()
+        self.user.is_active = False
+        self.user.save()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+
+    def test_revoked_refresh_token_is_refused(self):
+        tokens = self.login()
+        revoke_user_tokens(self.user.pk)
+        serializer = ClaimsTokenRefreshSerializer(data={'refresh': tokens['refresh']})
+        with self.assertRaises(AuthenticationFailed):
+            serializer.is_valid()
+        response = self.client.post('/api/users/token/refresh/', {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 401)
+
+    def test_revocation_splits_tokens_within_one_second(self):
+        with mock.patch('users.authentication.time') as clock:
+            clock.time.side_effect = [1000.1, 1000.2, 1000.4]
+            before = issue_tokens(self.user)
+            revoke_user_tokens(self.user.pk)
+            after = issue_tokens(self.user)
+        for token in (before, after):
+            token['iat'] = 1000  # whole seconds only
+        self.assertTrue(is_revoked(before))
+        self.assertFalse(is_revoked(after))
+
+    def test_login_right_after_revocation(self):
+        revoke_user_tokens(self.user.pk)
+        tokens = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+        response = self.client.post('/api/users/token/refresh/', {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 200)
+
+    def test_refreshed_access_token_keeps_claims(self):
+        tokens = self.login()
+        response = self.client.post('/api/users/token/refresh/', {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 200)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/users/me/')
+        self.assertEqual(response.data['email'], self.user.email)
+
+    def test_doctor_token_carries_doctor_role(self):
+        Doctor.objects.create(full_name='Dr Who', email='who@test.com', license_number='LIC9', password='Doctor123!')
+        response = self.client.post(
+            '/api/users/doctor/login/', {'email': 'who@test.com', 'license': 'LIC9', 'password': 'Doctor123!'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.assertEqual(self.client.get('/api/users/me/').data['role'], 'doctor')
+
+
+class DoctorAccountLinkTest(TestCase):
+    def setUp(self):
+        throttling.reset()
+        self.client = APIClient()
+
+    def test_saving_doctor_links_account(self):
+        existing = CustomUser.objects.create_user(
+            email='linked@test.com', password='x', first_name='Ann', last_name='Lee', role='doctor'
+        )
+        linked = Doctor.objects.create(
+            full_name='Ann Lee', email='linked@test.com', license_number='LIC1', password='Doctor123!'
+        )
+        self.assertEqual(linked.user, existing)
+
+        created = Doctor.objects.create(
+            full_name='Bo Tan', email='new@test.com', license_number='LIC2', password='Doctor123!'
+        )
+        self.assertEqual((created.user.first_name, created.user.role), ('Bo', 'doctor'))
+        self.assertFalse(created.user.has_usable_password())
+
+    def test_patient_account_is_never_linked(self):
+        CustomUser.objects.create_user(email='pat@test.com', password='x', first_name='Pat', last_name='T')
+        with self.assertRaises(ValidationError):
+            Doctor.objects.create(
+                full_name='Pat T', email='pat@test.com', license_number='LIC3', password='Doctor123!'
+            )
+        self.assertFalse(Doctor.objects.exists())
+
+        # Rows written with update()/bulk_create() are linked at login instead
+        Doctor.objects.bulk_create([Doctor(
+            full_name='Pat T', email='pat@test.com', license_number='LIC3', password=make_password('Doctor123!')
+        )])
+        response = self.client.post(
+            '/api/users/doctor/login/', {'email': 'pat@test.com', 'license': 'LIC3', 'password': 'Doctor123!'}
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertIsNone(Doctor.objects.get().user)
+
+    def test_login_is_a_single_read(self):
+        doctor = Doctor.objects.create(
+            full_name='Dr Who', email='who@test.com', license_number='LIC9', password='Doctor123!'
+        )
+        users_before = CustomUser.objects.count()
+        # One joined doctor/user read plus the next-appointment query.
+        with self.assertNumQueries(2):
+            response = self.client.post(
+                '/api/users/doctor/login/', {'email': 'who@test.com', 'license': 'LIC9', 'password': 'Doctor123!'}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['user']['id'], doctor.user_id)
+        self.assertEqual(CustomUser.objects.count(), users_before)
+
+
+class EmailNormalisationTest(TestCase):
+    def setUp(self):
+        throttling.reset()
+        self.client = APIClient()
+
+    def test_emails_are_stored_lower_case(self):
+        user = CustomUser.objects.create_user(
+            email=' Mixed.Case@Test.COM ', password='Patient123!', first_name='M', last_name='C'
+        )
+        doctor = Doctor.objects.create(
+            full_name='Dr Case', email='Dr.Case@Test.com', license_number='LIC5', password='Doctor123!'
+        )
+        self.assertEqual(user.email, 'mixed.case@test.com')
+        self.assertEqual(doctor.email, 'dr.case@test.com')
+        self.assertEqual(CustomUser.objects.get_by_natural_key('MIXED.case@test.com'), user)
+
+    def test_lookups_accept_any_case(self):
+        CustomUser.objects.create_user(email='pat@test.com', password='Patient123!', first_name='P', last_name='T')
+        doctor = Doctor.objects.create(
+            full_name='Dr Case', email='case@test.com', license_number='LIC5', password='Doctor123!'
+        )
+        response = self.client.post('/api/users/login/', {'email': 'Pat@Test.com', 'password': 'Patient123!'})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post(
+            '/api/users/doctor/login/', {'email': 'CASE@test.com', 'license': 'LIC5', 'password': 'Doctor123!'}
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/api/users/doctor-id/', {'email': 'Case@Test.com'})
+        self.assertEqual(response.data, {'doctor_id': doctor.id})
+
+
+    def test_migration_refuses_to_strand_colliding_accounts(self):
+        normalise_emails = import_module('users.migrations.0011_normalise_emails').normalise_emails
+        kept = CustomUser.objects.create_user(email='pat@test.com', password='x', first_name='P', last_name='T')
+        clash = CustomUser.objects.create_user(email='other@test.com', password='x', first_name='O', last_name='T')
+        mixed = CustomUser.objects.create_user(email='mixed@test.com', password='x', first_name='M', last_name='T')
+        CustomUser.objects.filter(pk=clash.pk).update(email=' Pat@Test.com')
+        CustomUser.objects.filter(pk=mixed.pk).update(email='Mixed@Test.com')
+
+        with self.assertRaisesMessage(RuntimeError, f"CustomUser {clash.pk}: ' Pat@Test.com'"):
+            normalise_emails(apps, None)
+        self.assertEqual(CustomUser.objects.get(pk=mixed.pk).email, 'Mixed@Test.com')
+
+        CustomUser.objects.filter(pk=clash.pk).update(email='clash@test.com')
+        normalise_emails(apps, None)
+        self.assertEqual(CustomUser.objects.get(pk=mixed.pk).email, 'mixed@test.com')
+        self.assertEqual(CustomUser.objects.get(pk=kept.pk).email, 'pat@test.com')
+
+
+class DoctorDirectoryTest(TestCase):
+    url = '/api/users/doctors/'
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.doctor = Doctor.objects.create(
+            full_name='Dr Who', email='who@test.com', license_number='LIC9',
+            specialization='Cardiology', password='Doctor123!'
+        )
+
+    def test_directory_is_cached_and_revalidated(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['doctors'], [{
+            'id': self.doctor.id, 'name': 'Dr Who', 'email': 'who@test.com',
+            'license': 'LIC9', 'specialization': 'Cardiology',
+        }])
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/users/doctor-id/', {'email': 'who@test.com'})
+        self.assertEqual(response.data, {'doctor_id': self.doctor.id})
+
+    def test_saving_a_doctor_invalidates(self):
+        etag = self.client.get(self.url)['ETag']
+        self.doctor.specialization = 'Neurology'
+        self.doctor.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['doctors'][0]['specialization'], 'Neurology')
+
+        self.doctor.delete()
+        self.assertEqual(self.client.get(self.url).data['doctors'], [])
+
+
+class SessionDocumentTest(TestCase):
+    KEYS = {'access', 'refresh', 'role', 'user', 'profile', 'active_appointment'}
+
+    def setUp(self):
+        cache.clear()
+        throttling.reset()
+        self.client = APIClient()
+        self.patient = CustomUser.objects.create_user(
+            email='pat@test.com', password='Patient123!', first_name='Pat', last_name='Test'
+        )
+        self.doctor = Doctor.objects.create(
+            full_name='Dr Who', email='who@test.com', license_number='LIC9', password='Doctor123!'
+        )
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        Appointment.objects.create(
+            patient=self.patient, doctor=self.doctor, doctor_name='Dr Who',
+            date=tomorrow, time=time(10, 0), reason='Checkup'
+        )
+
+    def test_patient_login_includes_active_appointment(self):
+        response = self.client.post('/api/users/login/', {'email': 'pat@test.com', 'password': 'Patient123!'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(self.KEYS <= set(response.data))
+        self.assertEqual(response.data['role'], 'patient')
+        self.assertEqual(response.data['profile']['email'], 'pat@test.com')
+        self.assertEqual(response.data['active_appointment']['doctor_name'], 'Dr Who')
+
+    def test_doctor_login_has_same_shape(self):
+        response = self.client.post(
+            '/api/users/doctor/login/', {'email': 'who@test.com', 'license': 'LIC9', 'password': 'Doctor123!'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(self.KEYS <= set(response.data))
+        self.assertEqual(response.data['role'], 'doctor')
+        self.assertEqual(response.data['user']['role'], 'doctor')
+        self.assertEqual(response.data['profile']['license'], 'LIC9')
+        self.assertEqual(response.data['doctor'], response.data['profile'])
+        self.assertEqual(response.data['active_appointment']['patient_name'], 'Pat Test')
+
+
+class PasswordHashingTest(TestCase):
+    def setUp(self):
+        throttling.reset()
+        self.client = APIClient()
+
+    def test_legacy_hash_is_upgraded_on_login(self):
+        user = CustomUser.objects.create_user(email='old@test.com', password='x', first_name='O', last_name='L')
+        CustomUser.objects.filter(pk=user.pk).update(password=make_password('Patient123!', hasher='pbkdf2_sha256'))
+        response = self.client.post('/api/users/login/', {'email': user.email, 'password': 'Patient123!'})
+        self.assertEqual(response.status_code, 200)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('scrypt$'))
+        self.assertTrue(user.check_password('Patient123!'))
+
+    def test_doctor_hash_upgrade_and_save_detection(self):
+        doctor = Doctor.objects.create(
+            full_name='Dr Old', email='old@doc.com', license_number='LIC7', password='Doctor123!'
+        )
+        self.assertTrue(doctor.password.startswith('scrypt$'))
+        hashed = doctor.password
+        doctor.save()
+        self.assertEqual(doctor.password, hashed)
+
+        Doctor.objects.filter(pk=doctor.pk).update(password=make_password('Doctor123!', hasher='pbkdf2_sha256'))
+        response = self.client.post(
+            '/api/users/doctor/login/', {'email': doctor.email, 'license': 'LIC7', 'password': 'Doctor123!'}
+        )
+        self.assertEqual(response.status_code, 200)
+        doctor.refresh_from_db()
+        self.assertTrue(doctor.password.startswith('scrypt$'))
+
+    def test_wrong_password_and_unknown_user(self):
+        CustomUser.objects.create_user(email='pat@test.com', password='Patient123!', first_name='P', last_name='T')
+        response = self.client.post('/api/users/login/', {'email': 'pat@test.com', 'password': 'nope'})
+        self.assertEqual(response.status_code, 401)
+        response = self.client.post('/api/users/login/', {'email': 'ghost@test.com', 'password': 'nope'})
+        self.assertEqual(response.status_code, 401)
+
+    def test_saturated_pool_sheds_load(self):
+        with mock.patch('users.views.verify_password', side_effect=HashingBusy('busy')):
+            response = self.client.post('/api/users/login/', {'email': 'a@test.com', 'password': 'x'})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+    @override_settings(PASSWORD_VERIFY_TIMEOUT=0.01)
+    def test_slow_check_is_reported_busy(self):
+        release = threading.Event()
+        try:
+            with self.assertRaises(HashingBusy):
+                hashers._run(release.wait, 5)
+        finally:
+            release.set()
+
+
+@override_settings(THROTTLE_BUCKETS={'login': {'ip': (5, 1), 'email': (2, 1)}, 'verify_code': {'email': (3, 1)}})
+class ThrottlingTest(TestCase):
+    def setUp(self):
+        throttling.reset()
+        self.client = APIClient()
+
+    def test_email_bucket_limits_guessing(self):
+        for _ in range(2):
+            response = self.client.post('/api/users/login/', {'email': 'Target@test.com', 'password': 'guess'})
+            self.assertEqual(response.status_code, 401)
+        response = self.client.post('/api/users/login/', {'email': 'target@test.com', 'password': 'guess'})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        response = self.client.post('/api/users/login/', {'email': 'other@test.com', 'password': 'guess'})
+        self.assertEqual(response.status_code, 401)
+
+    def test_ip_bucket_covers_rotating_emails(self):
+        statuses = [
+            self.client.post('/api/users/login/', {'email': f'user{i}@test.com', 'password': 'x'}).status_code
+            for i in range(6)
+        ]
+        self.assertEqual(statuses, [401] * 5 + [429])
+
+    def test_forwarded_for_cannot_dodge_the_ip_bucket(self):
+        statuses = [
+            self.client.post(
+                '/api/users/login/', {'email': f'user{i}@test.com', 'password': 'x'},
+                HTTP_X_FORWARDED_FOR=f'203.0.113.{i}',
+            ).status_code
+            for i in range(6)
+        ]
+        self.assertEqual(statuses, [401] * 5 + [429])
+
+    def test_reset_code_enumeration_is_throttled(self):
+        statuses = [
+            self.client.post('/api/users/verify-code/', {'email': 'pat@test.com', 'code': f'{i:05d}'}).status_code
+            for i in range(4)
+        ]
+        self.assertEqual(statuses[-1], 429)
+
+    def test_metrics(self):
+        for _ in range(3):
+            self.client.post('/api/users/login/', {'email': 'target@test.com', 'password': 'guess'})
+        self.assertEqual(throttling.metrics.snapshot()['login'], {
+            'allowed': 2, 'throttled': 1, 'throttled_email': 1,
+        })
+        admin = CustomUser.objects.create_superuser(
+            email='admin@test.com', password='Admin123!', first_name='A', last_name='D'
+        )
+        self.client.force_authenticate(admin)
+        response = self.client.get('/api/users/throttle-metrics/')
+        self.assertEqual(response.data['login']['throttled'], 1)
+
+
+class TokenBucketTest(TestCase):
+    def test_refill(self):
+        store = throttling.MemoryBucketStore()
+        with mock.patch('users.throttling.time.monotonic', side_effect=[0, 0, 0, 30]):
+            self.assertTrue(store.take('k', 2, 1 / 30)[0])
+            self.assertTrue(store.take('k', 2, 1 / 30)[0])
+            allowed, wait = store.take('k', 2, 1 / 30)
+            self.assertFalse(allowed)
+            self.assertAlmostEqual(wait, 30)
+            self.assertTrue(store.take('k', 2, 1 / 30)[0])
+
+    def test_memory_store_is_bounded(self):
+        store = throttling.MemoryBucketStore(max_keys=3)
+        for i in range(10):
+            store.take(f'k{i}', 1, 1)
+        self.assertEqual(list(store._buckets), ['k7', 'k8', 'k9'])
@@ -0,0 +1,166 @@
+"""Token-bucket throttling for the unauthenticated account endpoints.
+
+Each request spends one token from a bucket per dimension (client IP and
+submitted email) of its scope; buckets refill continuously up to their
+burst size.  ``THROTTLE_BUCKETS`` maps scope -> dimension ->
+``(burst, per_minute)``.  A check is a constant number of dictionary or
+cache operations regardless of traffic.
+
+``THROTTLE_STORE`` picks where buckets live: ``memory`` keeps them in the
+worker process, ``cache`` in the default Django cache so every worker shares
+them.  The cache store does a plain read-modify-write, so concurrent
+requests can occasionally spend the same token; it never lets a client run
+far past its rate.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+
+def _spend(state, now, capacity, rate):
+    """Apply one request to a ``(tokens, stamp)`` bucket.
+
+    Returns ``(allowed, wait_seconds, new_state)``.
+    """
+    tokens, stamp = state if state is not None else (capacity, now)
+    tokens = min(capacity, tokens + max(0.0, now - stamp) * rate)
+    if tokens >= 1:
+        return True, 0.0, (tokens - 1, now)
+    return False, (1 - tokens) / rate, (tokens, now)
+
+
+class MemoryBucketStore:
+    """Buckets in a per-process LRU; the oldest idle buckets are dropped
+    first when ``max_keys`` is reached."""
+
+    def __init__(self, max_keys=100_000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate):
+        now = time.monotonic()
+        with self._lock:
+            allowed, wait, state = _spend(self._buckets.pop(key, None), now, capacity, rate)
+            self._buckets[key] = state
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBucketStore:
+    """Buckets in the default Django cache, shared by every worker."""
+
+    def take(self, key, capacity, rate):
+        now = time.time()
+        allowed, wait, state = _spend(cache.get(key), now, capacity, rate)
+        # Once a bucket has had time to refill it is equivalent to a new one.
+        cache.set(key, state, timeout=int(capacity / rate) + 1)
+        return allowed, wait
+
+    def clear(self):
+        """Nothing to do: cached buckets expire once they have refilled."""
+
+
+class ThrottleMetrics:
+    """Allowed / throttled counters per scope and dimension."""
+
+    def __init__(self):
+        self._counts = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, scope, outcome):
+        with self._lock:
+            self._counts[(scope, outcome)] += 1
+
+    def snapshot(self):
+        with self._lock:
+            counts = dict(self._counts)
+        result = defaultdict(dict)
+        for (scope, outcome), count in sorted(counts.items()):
+            result[scope][outcome] = count
+        return dict(result)
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+
+
+metrics = ThrottleMetrics()
+_stores = {}
+
+
+def get_store():
+    name = getattr(settings, 'THROTTLE_STORE', 'memory')
+    if name not in _stores:
+        _stores[name] = CacheBucketStore() if name == 'cache' else MemoryBucketStore()
+    return _stores[name]
+
+
+def reset():
+    """Forget every bucket and counter (for tests and maintenance)."""
+    get_store().clear()
+    metrics.clear()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """DRF throttle spending one token per configured dimension."""
+    scope = None
+
+    def idents(self, request):
+        yield 'ip', self.get_ident(request)
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        if email:
+            yield 'email', str(email).strip().lower()
+
+    def allow_request(self, request, view):
+        buckets = getattr(settings, 'THROTTLE_BUCKETS', {}).get(self.scope)
+        self._wait = 0.0
+        if not buckets:
+            return True
+
+        store = get_store()
+        allowed = True
+        for dimension, ident in self.idents(request):
+            if dimension not in buckets:
+                continue
+            burst, per_minute = buckets[dimension]
+            ok, wait = store.take(f"throttle:{self.scope}:{dimension}:{ident}", burst, per_minute / 60)
+            if not ok:
+                allowed = False
+                self._wait = max(self._wait, wait)
+                metrics.record(self.scope, f"throttled_{dimension}")
+        metrics.record(self.scope, 'allowed' if allowed else 'throttled')
+        if not allowed:
+            logger.info("Throttled %s request from %s", self.scope, self.get_ident(request))
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class LoginThrottle(TokenBucketThrottle):
+    scope = 'login'
+
+
+class DoctorLoginThrottle(TokenBucketThrottle):
+    scope = 'doctor_login'
+
+
+class ForgotPasswordThrottle(TokenBucketThrottle):
+    scope = 'forgot_password'
+
+
+class VerifyResetCodeThrottle(TokenBucketThrottle):
+    scope = 'verify_code'
@@ -1,4 +1,5 @@
 from django.urls import path
+from rest_framework_simplejwt.views import TokenRefreshView
 from .views import DoctorLoginView
 from .views import get_doctor_id
 from .views import (
@@ -7,16 +8,23 @@ from .views import (
     ForgotPasswordView,
     VerifyResetCodeView,
     ResetPasswordView,
-    MeView
+    MeView,
+    DoctorDirectoryView,
+    CacheMetricsView,
+    ThrottleMetricsView
 )
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
     path('login/', LoginAPIView.as_view(), name='login'),
+    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('forgot-password/', ForgotPasswordView.as_view(), name='forgot-password'),
     path('verify-code/', VerifyResetCodeView.as_view(), name='verify-code'),
     path('reset-password/', ResetPasswordView.as_view(), name='reset-password'),
     path('me/', MeView.as_view(), name='me'),
     path('doctor/login/', DoctorLoginView.as_view(), name='doctor-login'),
     path('doctor-id/', get_doctor_id),
+    path('doctors/', DoctorDirectoryView.as_view(), name='doctor-directory'),
+    path('throttle-metrics/', ThrottleMetricsView.as_view(), name='throttle-metrics'),
+    path('cache-metrics/', CacheMetricsView.as_view(), name='cache-metrics'),
 ]
\ No newline at end of file
@@ -1,16 +1,21 @@
 import random
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework_simplejwt.tokens import RefreshToken
-from django.contrib.auth.hashers import make_password, check_password
-from django.contrib.auth import get_user_model, authenticate
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from django.core.mail import send_mail
 from rest_framework.decorators import api_view, permission_classes
 
 # Fixed import - removed duplicate Doctor import
-from .models import PasswordResetCode, Doctor
+from .models import PasswordResetCode, Doctor, normalize_email
+from .authentication import issue_tokens, revoke_user_tokens
+from .hashers import HashingBusy, verify_password
+from . import directory, throttling
+from common.cache import metrics as cache_metrics
+from common.conditional import etag_matches, make_etag
+from appointments.views import latest_appointment, next_doctor_appointment
 from .serializers import (
     UserSignupSerializer,
     ForgotPasswordSerializer,
@@ -20,6 +25,31 @@ from .serializers import (
 
 User = get_user_model()
 
+def _session_document(refresh, role, user, profile, active_appointment):
+    """The payload every login route returns, so clients need no follow-up
+    ``/me`` or appointment request."""
+    return {
+        "refresh": str(refresh),
+        "access": str(refresh.access_token),
+        "role": role,
+        "user": {
+            "id": user.id,
+            "email": user.email,
+            "first_name": user.first_name,
+            "last_name": user.last_name,
+            "role": role,
+        },
+        "profile": profile,
+        "active_appointment": active_appointment,
+    }
+
+
+def _busy_response(exc):
+    response = Response({"error": str(exc)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    response['Retry-After'] = '1'
+    return response
+
+
 class RegisterView(APIView):
     permission_classes = [AllowAny]
 
@@ -42,46 +72,49 @@ class RegisterView(APIView):
 
 class LoginAPIView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [throttling.LoginThrottle]
 
     def post(self, request):
-        email = request.data.get("email")
+        email = normalize_email(request.data.get("email"))
         password = request.data.get("password")
 
         if not email or not password:
             return Response({"error": "Email and password are required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Use username field for authentication if your custom user model uses email as username
-        user = authenticate(request, username=email, password=password)
-        
-        # Alternative: If above doesn't work, try this approach:
-        # try:
-        #     user = User.objects.get(email=email)
-        #     if user.check_password(password):
-        #         # User is authenticated
-        #     else:
-        #         user = None
-        # except User.DoesNotExist:
-        #     user = None
+        user = User.objects.filter(email=email).first()
+        try:
+            valid = verify_password(
+                password,
+                user.password if user else None,
+                rehash=lambda encoded: User.objects.filter(pk=user.pk).update(password=encoded),
+            )
+        except HashingBusy as exc:
+            return _busy_response(exc)
+        if not (valid and user.is_active):
+            user = None
 
         if user is not None:
-            refresh = RefreshToken.for_user(user)
-            return Response({
-                "refresh": str(refresh),
-                "access": str(refresh.access_token),
-                "user": {
-                    "id": user.id,
-                    "email": user.email,
-                    "first_name": user.first_name,
-                    "last_name": user.last_name,
-                    "role": getattr(user, 'role', 'patient')  # Safe attribute access
-                }
-            }, status=status.HTTP_200_OK)
+            role = getattr(user, 'role', 'patient')  # Safe attribute access
+            profile = {
+                "id": user.id,
+                "email": user.email,
+                "first_name": user.first_name,
+                "last_name": user.last_name,
+                "phone": user.phone,
+                "address": user.address,
+            }
+            active = latest_appointment(user) if role == 'patient' else None
+            return Response(
+                _session_document(issue_tokens(user), role, user, profile, active),
+                status=status.HTTP_200_OK,
+            )
 
         return Response({"error": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
 
 
 class ForgotPasswordView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [throttling.ForgotPasswordThrottle]
 
     def post(self, request):
         serializer = ForgotPasswordSerializer(data=request.data)
@@ -119,6 +152,7 @@ class ForgotPasswordView(APIView):
 
 class VerifyResetCodeView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [throttling.VerifyResetCodeThrottle]
 
     def post(self, request):
         serializer = ResetCodeVerificationSerializer(data=request.data)
@@ -159,6 +193,7 @@ class ResetPasswordView(APIView):
                 user = User.objects.get(email=email)
                 user.set_password(new_password)  # Use set_password instead of make_password
                 user.save()
+                revoke_user_tokens(user.pk)
                 
                 # Delete used reset codes
                 PasswordResetCode.objects.filter(user=user).delete()
@@ -189,71 +224,119 @@ class MeView(APIView):
 
 class DoctorLoginView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [throttling.DoctorLoginThrottle]
 
     def post(self, request):
-        email = request.data.get("email")
+        email = normalize_email(request.data.get("email"))
         license_number = request.data.get("license")
         password = request.data.get("password")
 
         if not all([email, license_number, password]):
             return Response({"error": "All fields are required."}, status=status.HTTP_400_BAD_REQUEST)
 
+        doctor = (
+            Doctor.objects.select_related('user')
+            .filter(email=email, license_number=license_number)
+            .first()
+        )
         try:
-            doctor = Doctor.objects.get(email=email, license_number=license_number)
-        except Doctor.DoesNotExist:
+            valid = verify_password(
+                password,
+                doctor.password if doctor else None,
+                rehash=lambda encoded: Doctor.objects.filter(pk=doctor.pk).update(password=encoded),
+            )
+        except HashingBusy as exc:
+            return _busy_response(exc)
+
+        if doctor is None:
             return Response({"error": "Doctor not found or license mismatch."}, status=status.HTTP_401_UNAUTHORIZED)
-
-        if not check_password(password, doctor.password):
+        if not valid:
             return Response({"error": "Incorrect password."}, status=status.HTTP_401_UNAUTHORIZED)
 
-        # Get or create a proper user for token generation
-        user, created = User.objects.get_or_create(
-            email=email,
-            defaults={
-                'username': email,
-                'first_name': getattr(doctor, 'first_name', ''),
-                'last_name': getattr(doctor, 'last_name', ''),
-                'password': make_password(str(random.randint(100000, 999999)))  # Random password
-            }
+        # Doctors are linked to their account when saved; rows written with
+        # update()/bulk_create() are linked here once.
+        user = doctor.user
+        if user is None:
+            try:
+                user = doctor.link_user()
+            except ValidationError:
+                user = None
+            else:
+                Doctor.objects.filter(pk=doctor.pk).update(user=user)
+        if user is None or user.role != 'doctor':
+            return Response({"error": "This email belongs to a non-doctor account."}, status=status.HTTP_403_FORBIDDEN)
+        if not user.is_active:
+            return Response({"error": "Account is disabled."}, status=status.HTTP_401_UNAUTHORIZED)
+
+        refresh = issue_tokens(
+            user,
+            role='doctor',
+            name=doctor.full_name,
+            doctor_email=doctor.email,
+            license=doctor.license_number,
+            doctor_id=doctor.id,
         )
 
-        refresh = RefreshToken.for_user(user)
-        
-        # Add custom claims
-        refresh['doctor_email'] = doctor.email
-        refresh['license'] = doctor.license_number
-        refresh['role'] = 'doctor'
-        refresh['doctor_id'] = doctor.id
+        profile = {
+            "id": doctor.id,
+            "name": doctor.full_name,
+            "email": doctor.email,
+            "license": doctor.license_number,
+            "specialization": doctor.specialization
+        }
+        session = _session_document(refresh, 'doctor', user, profile, next_doctor_appointment(doctor))
+        session["doctor"] = profile  # older clients read the profile from here
+        return Response(session, status=status.HTTP_200_OK)
 
-        return Response({
-            "refresh": str(refresh),
-            "access": str(refresh.access_token),
-            "doctor": {
-                "id": doctor.id,
-                "name": doctor.full_name,
-                "email": doctor.email,
-                "license": doctor.license_number,
-                "specialization": getattr(doctor, 'specialization', '')
-            }
-        }, status=status.HTTP_200_OK)
+
+class CacheMetricsView(APIView):
+    """Response cache hit / miss counters for this worker."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(cache_metrics.snapshot(), status=status.HTTP_200_OK)
+
+
+class ThrottleMetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(throttling.metrics.snapshot(), status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_doctor_id(request):
-    email = request.GET.get('email')
+    email = normalize_email(request.GET.get('email'))
     if not email:
         return Response({'error': 'Email parameter is required'}, status=400)
     
     try:
-        doctor = Doctor.objects.get(email=email)
-        return Response({'doctor_id': doctor.id})
-    except Doctor.DoesNotExist:
-        return Response({'error': 'Doctor not found'}, status=404)
+        doctor_id = directory.doctor_id_for_email(email)
+        if doctor_id is None:
+            return Response({'error': 'Doctor not found'}, status=404)
+        return Response({'doctor_id': doctor_id})
     except Exception as e:
         return Response({'error': str(e)}, status=500)
 
 
+class DoctorDirectoryView(APIView):
+    """All doctors, for clients to resolve doctors locally; revalidate with
+    ``If-None-Match``."""
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        version, entries = directory.directory()
+        etag = make_etag(request, version)
+        if etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response({"doctors": entries}, status=status.HTTP_200_OK)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'public, no-cache'
+        return response
+
+
 # Additional useful endpoint
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -1,6 +1,8 @@
-
+import os
 from pathlib import Path
 
+from common.database import database_from_env
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = 'django-insecure-4g_39*jjw+j!3@jc3c&rm2t*lnzz1t%0jge71b+c^r!t3ft=6s'
@@ -23,6 +25,7 @@ INSTALLED_APPS = [
     'prescriptions',
     'consultations',
     'medical',
+    'common',
 
 ]
 
@@ -55,16 +58,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'vitacare_backend.wsgi.application'
 
+# SQLite unless VITACARE_DB_ENGINE=postgres; see common/database.py.
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR/'vitacare_db',
-        
-        #'USER': 'postgres',
-        #'PASSWORD': 'unclebobb@13',
-        #'HOST': 'localhost',
-        #'PORT': '5432',
-    }
+    'default': database_from_env(BASE_DIR/'vitacare_db'),
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -82,6 +78,36 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing: the first hasher hashes new passwords, the others only
+# verify existing hashes, which are upgraded on the next successful login.
+# 'argon2' requires the argon2-cffi package.
+PASSWORD_HASHER = os.environ.get('VITACARE_PASSWORD_HASHER', 'scrypt')
+_HASHERS = {
+    'argon2': 'users.hashers.TunedArgon2PasswordHasher',
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHERS = [_HASHERS[PASSWORD_HASHER]] + [
+    hasher for name, hasher in _HASHERS.items() if name != PASSWORD_HASHER
+] + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+
+# Bounded pool for password verification (see users.hashers).
+PASSWORD_VERIFY_WORKERS = os.cpu_count() or 2
+PASSWORD_VERIFY_QUEUE = 32
+PASSWORD_VERIFY_TIMEOUT = 10  # seconds
+
+# Token-bucket throttles for the sign-in endpoints (see users.throttling):
+# scope -> dimension -> (burst, refills per minute).  THROTTLE_STORE is
+# 'memory' (per worker) or 'cache' (shared through the default cache).
+THROTTLE_STORE = os.environ.get('VITACARE_THROTTLE_STORE', 'memory')
+THROTTLE_BUCKETS = {
+    'login': {'ip': (30, 20), 'email': (5, 5)},
+    'doctor_login': {'ip': (30, 20), 'email': (5, 5)},
+    'forgot_password': {'ip': (10, 5), 'email': (3, 1)},
+    # Reset codes live two minutes; this allows a handful of guesses at most.
+    'verify_code': {'ip': (10, 5), 'email': (5, 2)},
+}
+
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
 USE_I18N = True
@@ -91,12 +117,58 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'users.CustomUser'
 
+# Appointment slot grid used by appointments.availability
+APPOINTMENT_DAY_START = '06:00'
+APPOINTMENT_DAY_END = '20:00'
+APPOINTMENT_SLOT_MINUTES = 90
+APPOINTMENT_SEARCH_DAYS = 14
+APPOINTMENT_BOOKING_ATTEMPTS = 5
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.ClaimsJWTAuthentication',
     ),
+    # Reverse proxies in front of the app.  Throttles key on the client IP,
+    # so X-Forwarded-For is only trusted this many hops deep; 0 uses
+    # REMOTE_ADDR and ignores the header.
+    'NUM_PROXIES': int(os.environ.get('VITACARE_NUM_PROXIES', '0')),
 }
 
+SIMPLE_JWT = {
+    'TOKEN_REFRESH_SERIALIZER': 'users.authentication.ClaimsTokenRefreshSerializer',
+}
+
+# Full user rows for tokens without profile claims; token revocation lives in
+# the default cache, which must be shared when running several workers.
+AUTH_USER_CACHE_SIZE = 1024
+AUTH_USER_CACHE_TTL = 60  # seconds
+
+# Default cache: an in-process LRU, or with VITACARE_CACHE=file a directory
+# shared by every worker on the host (token revocation, throttles and cached
+# responses then apply across workers).
+if os.environ.get('VITACARE_CACHE', 'memory') == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('VITACARE_CACHE_DIR', str(BASE_DIR / '.cache')),
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'vitacare',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+# Cached doctor directory; rebuilt whenever a doctor is saved or deleted.
+DOCTOR_DIRECTORY_TTL = 3600  # seconds
+# Upper bound on how long a cached list response can lag data it borrows
+# from other records (see common.cache).
+CACHE_RESPONSE_TTL = 60  # seconds
+
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
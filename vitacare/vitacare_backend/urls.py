@@ -1,7 +1,6 @@
 from django.contrib import admin
 from django.urls import path, include
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from users.views import RegisterView  # Import your actual register view
+from users.views import RegisterView, LoginAPIView  # Import your actual register view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -13,6 +12,6 @@ urlpatterns = [
     
     # JWT Authentication endpoints
     path('api/users/register/', RegisterView.as_view(), name='register'),  # Fixed this line
-    path('api/users/login/', TokenObtainPairView.as_view(), name='login'),  # Fixed this line
-    path('api/users/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),  # Fixed this line
+    path('api/users/login/', LoginAPIView.as_view(), name='login'),  # Same session payload as users.urls
+    # Token refresh is served by users.urls at api/users/token/refresh/
 ]
\ No newline at end of file
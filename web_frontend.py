@@ -32,20 +32,13 @@ def patient_login():
                 session['access_token'] = result.get('access')
                 session['refresh_token'] = result.get('refresh')
                 
-                # Get user info
-                headers = {"Authorization": f"Bearer {session['access_token']}"}
-                me_response = requests.get(f"{BACKEND_URL}/api/users/me/", 
-                                         headers=headers, timeout=10)
-                
-                if me_response.status_code == 200:
-                    user_data = me_response.json()
-                    if user_data.get('role') == 'patient':
-                        session['user'] = user_data
-                        return redirect(url_for('patient_home'))
-                    else:
-                        flash('Access denied. Please use doctor login.', 'error')
+                # The login response already carries the role and profile
+                if result.get('role') == 'patient':
+                    session['user'] = result.get('user')
+                    session['active_appointment'] = result.get('active_appointment')
+                    return redirect(url_for('patient_home'))
                 else:
-                    flash('Failed to fetch user information.', 'error')
+                    flash('Access denied. Please use doctor login.', 'error')
             elif response.status_code == 401:
                 flash('Invalid email or password.', 'error')
             else:
@@ -76,20 +69,13 @@ def doctor_login():
                 session['access_token'] = result.get('access')
                 session['refresh_token'] = result.get('refresh')
                 
-                # Get user info
-                headers = {"Authorization": f"Bearer {session['access_token']}"}
-                me_response = requests.get(f"{BACKEND_URL}/api/users/me/", 
-                                         headers=headers, timeout=10)
-                
-                if me_response.status_code == 200:
-                    user_data = me_response.json()
-                    if user_data.get('role') == 'doctor':
-                        session['user'] = user_data
-                        return redirect(url_for('doctor_home'))
-                    else:
-                        flash('Access denied. Please use patient login.', 'error')
+                # The login response already carries the role and profile
+                if result.get('role') == 'doctor':
+                    session['user'] = result.get('user')
+                    session['active_appointment'] = result.get('active_appointment')
+                    return redirect(url_for('doctor_home'))
                 else:
-                    flash('Failed to fetch user information.', 'error')
+                    flash('Access denied. Please use patient login.', 'error')
             elif response.status_code == 401:
                 flash('Invalid email or password.', 'error')
             else: